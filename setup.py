@@ -23,16 +23,19 @@ def get_version():
 setup(
     name="telemetree",
     version=get_version(),
-    packages=find_packages(where="src"),
+    packages=find_packages(where="src", exclude=["benchmarks", "benchmarks.*"]),
     package_dir={"": "src"},
     install_requires=[
         "setuptools",
         "requests",
+        "httpx",
         "pydantic",
         "pycryptodome",
         "rsa",
         "telethon",
     ],
+    extras_require={"zstd": ["zstandard"], "http2": ["h2"]},
+    entry_points={"console_scripts": ["telemetree = telemetree.cli:main"]},
     author="Chris Cherniakov",
     author_email="chris@ton.solutions",
     description="Python SDK for Telegram event tracking and analytics.",
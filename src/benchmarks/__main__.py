@@ -0,0 +1,97 @@
+"""
+Benchmarks for the track pipeline, run against a local stand-in pipeline.
+
+    PYTHONPATH=src python -m benchmarks            # compare with the baseline
+    PYTHONPATH=src python -m benchmarks --save     # store a new baseline
+    PYTHONPATH=src python -m benchmarks -k encrypt # run matching cases only
+    PYTHONPATH=src python -m benchmarks --runs 3   # take medians of 3 runs
+
+Timings are compared relative to a reference workload timed in the same run,
+so the committed baseline is meaningful on other machines. Results slower than
+the baseline by more than the tolerance are flagged, and the exit status is 1
+if there are any. Ratios still shift somewhat between CPUs and Python builds:
+for tight tolerances, save a baseline on the machine you compare on.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+
+from benchmarks.cases import CASES, normalize, run
+from telemetree.testing import MockPipeline
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def is_regression(
+    value: float, baseline: float, higher_is_better: bool, tolerance: float
+) -> bool:
+    if higher_is_better:
+        return value < baseline / (1 + tolerance)
+    return value > baseline * (1 + tolerance)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "-k", dest="pattern", default="", help="run matching cases only"
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="store the results as the baseline"
+    )
+    parser.add_argument("--baseline", default=BASELINE, help="the baseline file")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 is 25%%"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=1, help="run the suite this many times"
+    )
+    args = parser.parse_args()
+
+    runs = []
+    with MockPipeline() as pipeline:
+        for _ in range(args.runs):
+            runs.append(run(pipeline, args.pattern))
+    results = {name: statistics.median(r[name].value for r in runs) for name in runs[0]}
+    relative = {
+        c.name: statistics.median(normalize(c, *r[c.name]) for r in runs)
+        for c in CASES
+        if c.name in results
+    }
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if "relative" in stored:
+            baseline = stored["relative"]
+        else:
+            print(f"Ignoring {args.baseline}, it holds absolute timings: save it again")
+
+    regressions = 0
+    for c in CASES:
+        if c.name not in results:
+            continue
+        line = f"{c.name:<32} {results[c.name]:>14.6g} {c.unit}"
+        if c.name in baseline:
+            value, previous = relative[c.name], baseline[c.name]
+            line += f"  ({value / previous - 1:+.0%} against the baseline)"
+            if is_regression(value, previous, c.higher_is_better, args.tolerance):
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+
+    if args.save:
+        baseline.update(relative)
+        with open(args.baseline, "w") as f:
+            json.dump({"relative": baseline}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved the baseline to {args.baseline}")
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
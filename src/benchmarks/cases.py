@@ -0,0 +1,367 @@
+import asyncio
+import gc
+import json
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple
+
+from telemetree.async_client import AsyncTelemetree
+from telemetree.client import Telemetree
+from telemetree.concurrency import AdaptiveLimiter
+from telemetree.encryption import EncryptionService
+from telemetree.export import BulkUploader, FileSink
+from telemetree.http_client import HttpClient, encode_body
+from telemetree.schemas import EncryptedEvent, Event, TrustedEvent
+from telemetree.sessions import SessionTracker
+from telemetree.testing import MockPipeline
+
+API_KEY = "a1b2c3d4-e5f6-4a7b-8c9d-0e1f2a3b4c5d"
+PROJECT_ID = "f0e1d2c3-b4a5-4968-8776-655443322110"
+
+EVENT = {
+    "event_type": "message",
+    "telegram_id": 714862471,
+    "is_premium": True,
+    "username": "candyflipline",
+    "firstname": "Chris",
+    "language": "en",
+}
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[MockPipeline], float]
+    unit: str
+    higher_is_better: bool
+    repeat: int
+
+
+CASES: List[Case] = []
+
+
+def case(
+    name: str, unit: str = "s/op", higher_is_better: bool = False, repeat: int = 1
+):
+    """Registers a benchmark, its result being the median of `repeat` runs."""
+
+    def register(run: Callable[[MockPipeline], float]):
+        CASES.append(Case(name, run, unit, higher_is_better, repeat))
+        return run
+
+    return register
+
+
+_REFERENCE_PAYLOAD = json.dumps(EVENT)
+# Reference timings taken between the runs of the current case
+_reference_samples: List[float] = []
+
+
+def _reference_work() -> int:
+    """A fixed mix of interpreter and JSON work, the unit timings are stored in."""
+    total = 0
+    for i in range(100):
+        total += i * i
+    return total + len(json.dumps(json.loads(_REFERENCE_PAYLOAD)))
+
+
+def _time(fn: Callable[[], object], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def per_op(fn: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """
+    Returns the median time of one call over `repeat` runs of `number` calls.
+
+    Each run is followed by a run of the reference work, so the case and the
+    reference see the machine at the same speed.
+    """
+    fn()
+    timings = []
+    for _ in range(repeat):
+        timings.append(_time(fn, number))
+        _reference_samples.append(_time(_reference_work, 200))
+    return statistics.median(timings)
+
+
+def reference() -> float:
+    """
+    Returns the median time of the reference work, so a baseline carries over
+    between machines of different speeds.
+    """
+    _reference_work()
+    return statistics.median(_time(_reference_work, 200) for _ in range(15))
+
+
+def normalize(c: Case, value: float, reference_seconds: float) -> float:
+    """Returns a result relative to the reference: timings in reference runs and
+    rates per reference run. Memory results are left as they are."""
+    if c.unit.startswith("s/"):
+        return value / reference_seconds
+    if c.unit.endswith("/s"):
+        return value * reference_seconds
+    return value
+
+
+def make_client(pipeline: MockPipeline, **kwargs) -> Telemetree:
+    return Telemetree(
+        API_KEY,
+        PROJECT_ID,
+        config_url=pipeline.config_url,
+        config_cache=None,
+        **kwargs,
+    )
+
+
+@case("event.validate")
+def event_validate(pipeline: MockPipeline) -> float:
+    return per_op(lambda: Event(**EVENT), 20_000)
+
+
+@case("event.trusted")
+def event_trusted(pipeline: MockPipeline) -> float:
+    return per_op(lambda: TrustedEvent.from_dict(EVENT), 20_000)
+
+
+@case("event.model_dump_json")
+def event_dump(pipeline: MockPipeline) -> float:
+    event = Event(**EVENT)
+    return per_op(event.model_dump_json, 20_000)
+
+
+@case("event.to_json")
+def event_to_json(pipeline: MockPipeline) -> float:
+    event = Event(**EVENT)
+    return per_op(event.to_json, 20_000)
+
+
+@case("encrypt.fresh_key")
+def encrypt_fresh_key(pipeline: MockPipeline) -> float:
+    service = EncryptionService(pipeline.config["public_key"])
+    payload = Event(**EVENT).model_dump_json()
+    return per_op(lambda: service.encrypt(payload), 300)
+
+
+@case("encrypt.reused_key")
+def encrypt_reused_key(pipeline: MockPipeline) -> float:
+    service = EncryptionService(pipeline.config["public_key"], key_reuse_events=100)
+    payload = Event(**EVENT).model_dump_json()
+    return per_op(lambda: service.encrypt(payload), 3_000)
+
+
+@case("http.encode_body")
+def http_encode_body(pipeline: MockPipeline) -> float:
+    service = EncryptionService(pipeline.config["public_key"])
+    encrypted = EncryptedEvent(**service.encrypt(Event(**EVENT).to_json()))
+    return per_op(lambda: encode_body(encrypted), 20_000)
+
+
+@case("http.post")
+def http_post(pipeline: MockPipeline) -> float:
+    encrypted = EncryptedEvent(key="k" * 344, iv="i" * 344, body="b" * 512)
+    with HttpClient(API_KEY, PROJECT_ID, url=pipeline.events_url) as http_client:
+        result = per_op(lambda: http_client.post(encrypted), 300)
+    pipeline.reset()
+    return result
+
+
+@case("http.config")
+def http_config(pipeline: MockPipeline) -> float:
+    with HttpClient(API_KEY, PROJECT_ID) as http_client:
+        return per_op(lambda: http_client.get(pipeline.config_url), 300)
+
+
+def track_many_throughput(pipeline: MockPipeline, batch_size: int) -> float:
+    events = [dict(EVENT, telegram_id=i + 1) for i in range(2_000)]
+    with make_client(pipeline, batch_max_events=batch_size) as client:
+        start = time.perf_counter()
+        client.track_many(events)
+        elapsed = time.perf_counter() - start
+    pipeline.reset()
+    return len(events) / elapsed
+
+
+for _batch_size in (1, 10, 100):
+    case(f"e2e.track_many.batch_{_batch_size}", "events/s", True, repeat=3)(
+        lambda pipeline, batch_size=_batch_size: track_many_throughput(
+            pipeline, batch_size
+        )
+    )
+
+
+def track_threads_throughput(pipeline: MockPipeline, threads: int) -> float:
+    per_thread = 200
+    with make_client(pipeline, pool_maxsize=threads) as client:
+
+        def worker() -> None:
+            for i in range(per_thread):
+                client.track(dict(EVENT, telegram_id=i + 1))
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    pipeline.reset()
+    return threads * per_thread / elapsed
+
+
+for _threads in (1, 4):
+    case(f"e2e.track.threads_{_threads}", "events/s", True, repeat=3)(
+        lambda pipeline, threads=_threads: track_threads_throughput(pipeline, threads)
+    )
+
+
+def async_throughput(pipeline: MockPipeline, concurrency: int) -> float:
+    events = [dict(EVENT, telegram_id=i + 1) for i in range(2_000)]
+
+    async def run() -> float:
+        client = await AsyncTelemetree.create(
+            API_KEY,
+            PROJECT_ID,
+            max_concurrency=concurrency,
+            batch_max_events=50,
+            config_url=pipeline.config_url,
+            config_cache=None,
+        )
+        async with client:
+            start = time.perf_counter()
+            await client.track_many(events)
+            return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+    pipeline.reset()
+    return len(events) / elapsed
+
+
+for _concurrency in (1, 8):
+    case(f"e2e.async.concurrency_{_concurrency}", "events/s", True, repeat=3)(
+        lambda pipeline, concurrency=_concurrency: async_throughput(
+            pipeline, concurrency
+        )
+    )
+
+
+def batching_throughput(pipeline: MockPipeline, adaptive: bool) -> float:
+    events = [dict(EVENT, telegram_id=i + 1) for i in range(2_000)]
+    limiter = AdaptiveLimiter() if adaptive else None
+    # A few milliseconds per request, as over a network
+    pipeline.latency = 0.005
+    try:
+        with make_client(
+            pipeline,
+            batching=True,
+            flush_size=20,
+            max_queue_size=len(events),
+            overflow_policy="block",
+            concurrency_limiter=limiter,
+        ) as client:
+            start = time.perf_counter()
+            for event in events:
+                client.track(event)
+            client.flush()
+            elapsed = time.perf_counter() - start
+    finally:
+        pipeline.latency = 0.0
+    pipeline.reset()
+    return len(events) / elapsed
+
+
+for _adaptive in (False, True):
+    case(
+        f"e2e.batching.{'adaptive' if _adaptive else 'sequential'}",
+        "events/s",
+        True,
+        repeat=3,
+    )(lambda pipeline, adaptive=_adaptive: batching_throughput(pipeline, adaptive))
+
+
+@case("memory.queued_event", "bytes/event")
+def memory_per_queued_event(pipeline: MockPipeline) -> float:
+    count = 10_000
+    client = make_client(
+        pipeline,
+        batching=True,
+        max_queue_size=count,
+        flush_size=count + 1,
+        flush_interval=3600,
+    )
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        client.track(dict(EVENT, telegram_id=i + 1))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    client.dispatcher.close(0)
+    client.http_client.close()
+    pipeline.reset()
+    return (after - before) / count
+
+
+@case("e2e.bulk_upload", "events/s", True, repeat=3)
+def bulk_upload_throughput(pipeline: MockPipeline) -> float:
+    count = 10_000
+    with tempfile.TemporaryDirectory() as directory:
+        with FileSink(directory) as sink:
+            sink.send(
+                TrustedEvent("message", i + 1, datetime="2024-01-01T00:00:00").to_json()
+                for i in range(count)
+            )
+        with make_client(pipeline, concurrency_limiter=AdaptiveLimiter()) as client:
+            start = time.perf_counter()
+            BulkUploader(client, directory).upload()
+            elapsed = time.perf_counter() - start
+    pipeline.reset()
+    return count / elapsed
+
+
+@case("sessions.session_id")
+def sessions_session_id(pipeline: MockPipeline) -> float:
+    tracker = SessionTracker()
+    users = iter(range(1, 10**9))
+    return per_op(lambda: tracker.session_id(next(users) % 50_000 + 1), 50_000)
+
+
+@case("memory.session_user", "bytes/user")
+def memory_per_session_user(pipeline: MockPipeline) -> float:
+    count = 100_000
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracker = SessionTracker()
+    for telegram_id in range(1, count + 1):
+        tracker.session_id(telegram_id)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+class Result(NamedTuple):
+    value: float
+    # The reference time measured alongside the case, as the machine's speed
+    # drifts during a run
+    reference_seconds: float
+
+
+def run(pipeline: MockPipeline, pattern: str = "") -> Dict[str, Result]:
+    results = {}
+    for c in CASES:
+        if pattern in c.name:
+            _reference_samples.clear()
+            value = statistics.median([c.run(pipeline) for _ in range(c.repeat)])
+            # Cases not timed with per_op are compared with a reference taken after them
+            reference_seconds = (
+                statistics.median(_reference_samples)
+                if _reference_samples
+                else reference()
+            )
+            results[c.name] = Result(value, reference_seconds)
+    return results
@@ -1,7 +1,60 @@
-from .logging_config import configure_logging
-from .client import Telemetree
-from .schemas import Event
+import logging
+from importlib import import_module
 
-configure_logging()
+# Logging is left to the application; call configure_logging() for the SDK's
+# console output
+logging.getLogger("telemetree").addHandler(logging.NullHandler())
 
-__all__ = ["Telemetree", "Event"]
+# Public names are imported on first access, so `import telemetree` does not
+# load pydantic, requests or the crypto libraries
+_exports = {
+    "Telemetree": ".client",
+    "AsyncTelemetree": ".async_client",
+    "Event": ".schemas",
+    "TrustedEvent": ".schemas",
+    "RetryPolicy": ".retry",
+    "CircuitBreaker": ".retry",
+    "AdaptiveLimiter": ".concurrency",
+    "ExecutorKind": ".executors",
+    "TransportKind": ".transport",
+    "ConfigCache": ".config",
+    "Metrics": ".metrics",
+    "OpenTelemetrySink": ".metrics",
+    "Deduplicator": ".dedup",
+    "BulkUploader": ".export",
+    "Sampler": ".sampling",
+    "SamplingRule": ".sampling",
+    "configure_logging": ".logging_config",
+}
+
+__all__ = [
+    "Telemetree",
+    "AsyncTelemetree",
+    "Event",
+    "TrustedEvent",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "AdaptiveLimiter",
+    "ExecutorKind",
+    "TransportKind",
+    "ConfigCache",
+    "Metrics",
+    "OpenTelemetrySink",
+    "Deduplicator",
+    "BulkUploader",
+    "Sampler",
+    "SamplingRule",
+    "configure_logging",
+]
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,287 @@
+from typing import Any, Iterable, Iterator, List, Optional, BinaryIO
+import argparse
+import json
+import logging
+import os
+import re
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import threading
+
+from telemetree.constants import AGENT_FRAME_MAX_BYTES, AGENT_SOCKET_TIMEOUT
+from telemetree.schemas import PROCESS_SESSION_ID
+
+logger = logging.getLogger("telemetree.agent")
+
+# Each frame is one serialized event, prefixed with its length in bytes
+_FRAME_HEADER = struct.Struct(">I")
+
+# The session ID of events a worker leaves to the agent to assign
+UNASSIGNED_SESSION_ID = 0
+# Matches the field wherever it is in the object, followed by another or the end
+_UNASSIGNED = re.compile(rb'"session_id":\s*0\s*[,}]')
+
+
+def encode_frames(payloads: Iterable[bytes]) -> bytes:
+    """Frames serialized events for the agent."""
+    frames = []
+    for payload in payloads:
+        frames.append(_FRAME_HEADER.pack(len(payload)))
+        frames.append(payload)
+    return b"".join(frames)
+
+
+def read_frames(
+    stream: BinaryIO, max_bytes: int = AGENT_FRAME_MAX_BYTES
+) -> Iterator[bytes]:
+    """
+    Reads frames until the stream ends.
+
+    Raises:
+        ValueError: If a frame is larger than `max_bytes` or is cut short.
+    """
+    while True:
+        header = stream.read(_FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) < _FRAME_HEADER.size:
+            raise ValueError("Truncated frame header")
+        (length,) = _FRAME_HEADER.unpack(header)
+        if length > max_bytes:
+            raise ValueError(f"Frame of {length} bytes exceeds {max_bytes} bytes")
+        data = stream.read(length)
+        if len(data) < length:
+            raise ValueError("Truncated frame")
+        yield data
+
+
+class RawEvent:
+    """An event serialized by a worker, forwarded by the agent as is."""
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: bytes) -> None:
+        self.payload = payload
+
+    def model_dump_json(self) -> str:
+        return self.payload.decode("utf-8")
+
+    def to_json(self) -> bytes:
+        return self.payload
+
+
+class AgentClient:
+    """
+    Hands serialized events to a delivery agent over its Unix socket.
+
+    The connection is opened on first use and reopened once if the agent
+    restarted. Events are not acknowledged: once written, delivering them is up
+    to the agent.
+
+    Args:
+        socket_path (str): The path of the agent's socket.
+        timeout (float): The timeout of connecting and writing in seconds.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = AGENT_SOCKET_TIMEOUT) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._socket: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def send(self, payloads: List[bytes]) -> None:
+        """
+        Writes serialized events to the agent.
+
+        Raises:
+            ConnectionError: If the agent cannot be reached.
+        """
+        data = encode_frames(payloads)
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._socket is None:
+                        self._socket = self._connect()
+                    self._socket.sendall(data)
+                    return
+                except OSError as e:
+                    self._close()
+                    if attempt:
+                        raise ConnectionError(
+                            f"Telemetree agent at {self.socket_path} is unreachable: {e}"
+                        ) from e
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class _FrameHandler(socketserver.StreamRequestHandler):
+    server: "_AgentServer"
+
+    def handle(self) -> None:
+        submit = self.server.agent.submit
+        try:
+            for frame in read_frames(self.rfile, self.server.agent.max_frame_bytes):
+                submit(frame)
+        except ValueError as e:
+            logger.warning("Closing a worker connection after a bad frame: %s", e)
+        except OSError as e:
+            logger.debug("Worker connection lost: %s", e)
+
+
+class _AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    agent: "Agent"
+
+
+class Agent:
+    """
+    A local delivery agent shared by the worker processes of one host.
+
+    Workers created with `agent_socket` validate, sample and serialize their
+    events, then write them to the agent's Unix socket. The agent queues them
+    in its client's dispatcher, which batches, encrypts and uploads the events
+    of all workers over one connection pool, and spools them if configured.
+
+    Sessions are assigned here rather than in the workers, by the client's
+    session tracker, so a user whose events reach several workers keeps one
+    session. Events given a session ID of their own keep it.
+
+    Args:
+        socket_path (str): The path of the Unix socket to listen on.
+        client: A Telemetree client created with `batching=True`, which
+            delivers the events.
+        max_frame_bytes (int): The largest event accepted, in bytes.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        client: Any,
+        max_frame_bytes: int = AGENT_FRAME_MAX_BYTES,
+    ) -> None:
+        if client.dispatcher is None:
+            raise ValueError("The agent's client must be created with batching=True")
+
+        self.socket_path = socket_path
+        self.client = client
+        self.max_frame_bytes = max_frame_bytes
+        self.received = 0
+        self._server: Optional[_AgentServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, frame: bytes) -> None:
+        self.received += 1
+        if _UNASSIGNED.search(frame):
+            frame = self._assign_session(frame)
+        self.client.dispatcher.submit(RawEvent(frame))
+
+    def _assign_session(self, frame: bytes) -> bytes:
+        try:
+            event = json.loads(frame)
+            if event["session_id"] != UNASSIGNED_SESSION_ID:
+                return frame
+            sessions = self.client.sessions
+            event["session_id"] = (
+                sessions.session_id(event["telegram_id"])
+                if sessions is not None
+                else PROCESS_SESSION_ID
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Forwarding an event without a session: %s", e)
+            return frame
+        return json.dumps(event, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def start(self) -> "Agent":
+        """Starts listening in a background thread."""
+        self._remove_stale_socket()
+        self._server = _AgentServer(self.socket_path, _FrameHandler)
+        self._server.agent = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="telemetree-agent", daemon=True
+        )
+        self._thread.start()
+        logger.info("Telemetree agent listening on %s", self.socket_path)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops listening, then sends the queued events and closes the client."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._remove_stale_socket()
+        self.client.close(timeout)
+
+    def __enter__(self) -> "Agent":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _remove_stale_socket(self) -> None:
+        try:
+            if stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+                os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Runs an agent until it is interrupted or terminated."""
+    from telemetree.client import Telemetree
+    from telemetree.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(
+        prog="python -m telemetree.agent",
+        description="Forwards the events of local workers to Telemetree.",
+    )
+    parser.add_argument("--socket", required=True, help="the Unix socket to listen on")
+    parser.add_argument(
+        "--api-key", default=os.environ.get("TELEMETREE_API_KEY"), required=False
+    )
+    parser.add_argument(
+        "--project-id", default=os.environ.get("TELEMETREE_PROJECT_ID"), required=False
+    )
+    parser.add_argument("--spool-dir", help="spool events to this directory")
+    args = parser.parse_args(argv)
+    if not args.api_key or not args.project_id:
+        parser.error(
+            "--api-key and --project-id, or TELEMETREE_API_KEY and "
+            "TELEMETREE_PROJECT_ID, are required"
+        )
+
+    configure_logging()
+    client = Telemetree(
+        args.api_key, args.project_id, batching=True, spool_dir=args.spool_dir
+    )
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    with Agent(args.socket, client):
+        try:
+            stopped.wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
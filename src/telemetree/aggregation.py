@@ -0,0 +1,188 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import copy
+import logging
+import threading
+import time
+
+from telemetree.constants import AGGREGATION_MAX_KEYS, AGGREGATION_WINDOW
+from telemetree.schemas import Event, TrustedEvent
+
+logger = logging.getLogger("telemetree.aggregation")
+
+AnyEvent = Union[Event, TrustedEvent]
+
+# Fields that differ between otherwise identical events and are not compared
+_UNCOMPARED_FIELDS = (
+    "event_type",
+    "telegram_id",
+    "datetime",
+    "session_id",
+    "count",
+    "event_id",
+)
+
+# By default events are folded only when all their other fields are equal
+DEFAULT_DIMENSIONS = tuple(
+    name for name in Event.model_fields if name not in _UNCOMPARED_FIELDS
+)
+
+
+class Aggregator:
+    """
+    Folds identical counter events into one event with a count.
+
+    Events of the aggregated types with the same event type, Telegram ID and
+    dimension values are merged within a time window: the first one is kept,
+    with its `count` raised by each repeat. When the window closes, or earlier
+    once `max_keys` distinct events are held, the folded events are handed to
+    `send` from a background thread.
+
+    Args:
+        send (Callable[[List[AnyEvent]], Any]): Receives the folded events.
+        event_types (Iterable[str]): The event types to aggregate.
+        window (float): The length of a window in seconds, from its first event.
+        max_keys (int): The maximum number of distinct events held at once.
+        dimensions (Sequence[str]): The Event fields that must also be equal for
+            events to be folded. Defaults to all other fields.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[AnyEvent]], Any],
+        event_types: Iterable[str],
+        window: float = AGGREGATION_WINDOW,
+        max_keys: int = AGGREGATION_MAX_KEYS,
+        dimensions: Sequence[str] = DEFAULT_DIMENSIONS,
+    ) -> None:
+        if window <= 0:
+            raise ValueError("window must be positive")
+        if max_keys <= 0:
+            raise ValueError("max_keys must be positive")
+        unknown = set(dimensions) - set(Event.model_fields)
+        if unknown:
+            raise ValueError(f"Unknown event fields: {', '.join(sorted(unknown))}")
+
+        self.send = send
+        self.event_types = frozenset(event_types)
+        self.window = window
+        self.max_keys = max_keys
+        self.dimensions = tuple(dimensions)
+
+        self._table: Dict[Tuple, AnyEvent] = {}
+        self._window_end: Optional[float] = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._sending = 0
+
+        self._worker = threading.Thread(
+            target=self._run, name="telemetree-aggregator", daemon=True
+        )
+        self._worker.start()
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def accepts(self, event: AnyEvent) -> bool:
+        """Returns True if events of this type are aggregated."""
+        return event.event_type in self.event_types
+
+    def add(self, event: AnyEvent) -> None:
+        """
+        Folds an event into the current window.
+
+        Args:
+            event (AnyEvent): The event, which is copied, not modified.
+
+        Raises:
+            RuntimeError: If the aggregator is closed.
+        """
+        key = (event.event_type, event.telegram_id) + tuple(
+            [getattr(event, name) for name in self.dimensions]
+        )
+        count = event.count or 1
+        full = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Aggregator is closed")
+
+            existing = self._table.get(key)
+            if existing is not None:
+                existing.count += count
+                return
+
+            if len(self._table) >= self.max_keys:
+                full = self._take()
+            event = copy.copy(event)
+            event.count = count
+            self._table[key] = event
+            if self._window_end is None:
+                self._window_end = time.monotonic() + self.window
+                self._cond.notify_all()
+
+        if full:
+            self._send(full)
+
+    def flush(self) -> None:
+        """Sends the events of the current window now, and waits for other sends."""
+        with self._cond:
+            events = self._take()
+        if events:
+            self._send(events)
+        with self._cond:
+            self._cond.wait_for(lambda: not self._sending)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops accepting events, sends the current window and stops the worker.
+
+        Args:
+            timeout (Optional[float]): The maximum time to wait for the worker in seconds.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+
+    def _take(self) -> List[AnyEvent]:
+        events = list(self._table.values())
+        self._table = {}
+        self._window_end = None
+        if events:
+            self._sending += 1
+        return events
+
+    def _send(self, events: List[AnyEvent]) -> None:
+        try:
+            self.send(events)
+        except Exception as e:
+            logger.exception("Failed to send %s aggregated events: %s", len(events), e)
+        finally:
+            with self._cond:
+                self._sending -= 1
+                self._cond.notify_all()
+
+    def _next_window(self) -> Optional[List[AnyEvent]]:
+        """Blocks until the window closes. Returns None once closed and drained."""
+        with self._cond:
+            while not self._closed:
+                if self._window_end is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._window_end - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            events = self._take()
+            if not events and self._closed:
+                return None
+            return events
+
+    def _run(self) -> None:
+        while True:
+            events = self._next_window()
+            if events is None:
+                return
+            if events:
+                self._send(events)
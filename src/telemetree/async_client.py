@@ -0,0 +1,352 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Iterable, List, Optional, Union
+
+from telemetree.client import build_event
+from telemetree.compression import Compression, negotiate
+from telemetree.config import Config, ConfigCache, default_config_cache
+from telemetree.constants import (
+    ASYNC_MAX_CONCURRENCY,
+    BATCH_MAX_BYTES,
+    BATCH_MAX_EVENTS,
+    SESSION_MAX_USERS,
+    SESSION_TIMEOUT,
+)
+from telemetree.encryption import EncryptionService
+from telemetree.event_builder import EventBuilder
+from telemetree.http_client import AsyncHttpClient
+from telemetree.metrics import Metrics, resolve_metrics
+from telemetree.retry import CircuitBreaker, RetryPolicy
+from telemetree.sampling import Sampler
+from telemetree.dedup import Deduplicator
+from telemetree.sessions import SessionTracker
+from telemetree.schemas import EncryptedEvent, Event, TelemetreeConfig, TrustedEvent
+from telemetree.utils import chunk_payloads, serialize_batch, validate_uuid
+
+if TYPE_CHECKING:
+    import httpx
+
+
+logger = logging.getLogger("telemetree.async_client")
+
+
+class AsyncTelemetree:
+    """
+    Asynchronous Telemetree client for bots running on an asyncio event loop.
+
+    Construction does no I/O. The configuration is fetched on first use, by
+    `initialize()` or by the `create()` factory. Encryption runs in an executor
+    so it never blocks the event loop.
+
+    Args:
+        api_key (str): The API key for authentication.
+        project_id (str): The project ID for the Telemetree service.
+        http_client (Optional[httpx.AsyncClient]): A preconfigured httpx client to use.
+        executor (Optional[Executor]): The executor encryption runs in.
+            Defaults to the event loop's default executor.
+        max_concurrency (int): The maximum number of concurrent requests in `track_many`.
+        key_reuse_events (Optional[int]): The number of events encrypted with one
+            RSA wrapped AES key. See EncryptionService.
+        key_reuse_seconds (Optional[float]): The maximum age of an RSA wrapped
+            AES key in seconds. See EncryptionService.
+        batch_max_events (int): The maximum number of events sent in one request.
+        batch_max_bytes (int): The maximum size in bytes of the serialized events
+            sent in one request.
+        retry_policy (Optional[RetryPolicy]): When and how failed requests are retried.
+        circuit_breaker (Optional[CircuitBreaker]): Fails requests fast while the host is down.
+        config_cache (Optional[ConfigCache]): Serves the remote configuration and
+            refreshes it in the background, so key rotations and host changes are
+            picked up. Defaults to a cache shared by the clients of the process.
+            None fetches the configuration once.
+        validate_events (bool): Validate dictionary events with pydantic. See
+            `Telemetree`.
+        payload_compression (bool): Compress events before encryption with the
+            best compression the pipeline accepts.
+        gzip_requests (bool): Send request bodies gzip compressed.
+        sampler (Optional[Sampler]): Samples and rate limits events by type.
+        metrics (Optional[Metrics]): Collects per-stage latencies, bytes sent,
+            retries and errors. Disabled by default.
+        config_url (Optional[str]): The configuration endpoint. Defaults to
+            Config.CONFIG_URL.
+        deduplicator (Optional[Deduplicator]): Drops events whose event ID was
+            already tracked, giving the others an ID sent with them.
+        session_timeout (Optional[float]): The inactivity in seconds that ends a
+            user's session. None leaves events on the process session.
+        session_max_users (int): The maximum number of users whose sessions are
+            tracked at once.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        project_id: str,
+        http_client: Optional["httpx.AsyncClient"] = None,
+        executor: Optional[Executor] = None,
+        max_concurrency: int = ASYNC_MAX_CONCURRENCY,
+        key_reuse_events: Optional[int] = 1,
+        key_reuse_seconds: Optional[float] = None,
+        batch_max_events: int = BATCH_MAX_EVENTS,
+        batch_max_bytes: int = BATCH_MAX_BYTES,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        config_cache: Optional[ConfigCache] = default_config_cache,
+        validate_events: bool = True,
+        payload_compression: bool = True,
+        gzip_requests: bool = False,
+        sampler: Optional[Sampler] = None,
+        metrics: Optional[Metrics] = None,
+        config_url: Optional[str] = None,
+        deduplicator: Optional[Deduplicator] = None,
+        session_timeout: Optional[float] = SESSION_TIMEOUT,
+        session_max_users: int = SESSION_MAX_USERS,
+    ):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be positive")
+
+        self.api_key = validate_uuid(api_key)
+        self.project_id = validate_uuid(project_id)
+        self.application_id = self.project_id
+        self.metrics = resolve_metrics(metrics)
+
+        self.http_client = AsyncHttpClient(
+            self.api_key,
+            self.project_id,
+            client=http_client,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            gzip=gzip_requests,
+            metrics=self.metrics,
+        )
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.config_cache = config_cache
+        self.config_url = config_url
+        self.key_reuse_events = key_reuse_events
+        self.key_reuse_seconds = key_reuse_seconds
+        self.batch_max_events = batch_max_events
+        self.batch_max_bytes = batch_max_bytes
+        self.validate_events = validate_events
+        self.sampler = sampler
+        self.deduplicator = deduplicator
+        self.sessions = (
+            SessionTracker(session_timeout, session_max_users)
+            if session_timeout is not None
+            else None
+        )
+        self.payload_compression = payload_compression
+
+        self.config: Optional[Config] = None
+        self.public_key: Optional[str] = None
+        self.host: Optional[str] = None
+        self.encryption_service: Optional[EncryptionService] = None
+        self.event_builder: Optional[EventBuilder] = None
+
+        # Created on first use, so it binds to the loop the client runs on
+        self._init_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    async def create(cls, api_key: str, project_id: str, **kwargs) -> "AsyncTelemetree":
+        """
+        Creates a client and fetches its configuration.
+
+        Args:
+            api_key (str): The API key for authentication.
+            project_id (str): The project ID for the Telemetree service.
+            **kwargs: Passed to the constructor.
+
+        Returns:
+            AsyncTelemetree: The initialized client.
+        """
+        client = cls(api_key, project_id, **kwargs)
+        await client.initialize()
+        return client
+
+    async def initialize(self) -> None:
+        """Fetches the configuration and sets up encryption. Safe to call repeatedly."""
+        if self.encryption_service is not None:
+            return
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self.encryption_service is not None:
+                return
+
+            self.config = await Config.create_async(
+                self.http_client, cache=self.config_cache, url=self.config_url
+            )
+            self.public_key = self.config.get_public_key()
+            self.host = self.config.get_host()
+            self.http_client.url = self.host
+            self.event_builder = EventBuilder(self.config.config, self.application_id)
+
+            self.encryption_service = EncryptionService(
+                self.public_key,
+                key_reuse_events=self.key_reuse_events,
+                key_reuse_seconds=self.key_reuse_seconds,
+                compression=self._negotiate_compression(self.config.config),
+                metrics=self.metrics,
+            )
+
+    async def track(self, event: Union[Event, TrustedEvent, dict]) -> Optional[dict]:
+        """Tracks a single event. See `Telemetree.track` for the event fields.
+
+        Args:
+            event (Union[Event, TrustedEvent, dict]): The event to track.
+
+        Raises:
+            ValueError: If the event is invalid.
+
+        Returns:
+            Optional[dict]: The response from the server, or None if the sampler
+                drops the event or it is a duplicate.
+        """
+        with self.metrics.time("validate_seconds"):
+            event = build_event(event, self.application_id, self.validate_events)
+        self.metrics.increment("events_tracked")
+        if self.deduplicator is None:
+            return await self._track_event(event)
+        if self.deduplicator.is_duplicate(event):
+            return None
+        with self.deduplicator.tracking((event,)):
+            return await self._track_event(event)
+
+    async def _track_event(self, event: Union[Event, TrustedEvent]) -> Optional[dict]:
+        if self.sessions is not None:
+            self.sessions.apply(event)
+        if self.sampler is not None and not self.sampler.apply(event):
+            return None
+        await self._prepare()
+        return await self._send(event)
+
+    async def track_many(
+        self, events: Iterable[Union[Event, TrustedEvent, dict]]
+    ) -> List[dict]:
+        """Tracks several events with as few requests as possible.
+
+        The events are serialized into JSON arrays of at most `batch_max_events`
+        events and `batch_max_bytes` bytes, and each array is encrypted once and
+        sent in a single request. Requests run concurrently up to
+        `max_concurrency`. All events are validated before anything is sent.
+
+        Args:
+            events (Iterable[Union[Event, TrustedEvent, dict]]): The events to track.
+
+        Raises:
+            ValueError: If any of the events is invalid.
+
+        Returns:
+            List[dict]: The responses from the server, one per request.
+        """
+        with self.metrics.time("validate_seconds"):
+            built = [
+                build_event(event, self.application_id, self.validate_events)
+                for event in events
+            ]
+        self.metrics.increment("events_tracked", len(built))
+        if self.deduplicator is None:
+            return await self._track_events(built)
+        built = [event for event in built if not self.deduplicator.is_duplicate(event)]
+        with self.deduplicator.tracking(built):
+            return await self._track_events(built)
+
+    async def _track_events(
+        self, built: List[Union[Event, TrustedEvent]]
+    ) -> List[dict]:
+        if self.sessions is not None:
+            for event in built:
+                self.sessions.apply(event)
+        if self.sampler is not None:
+            built = [event for event in built if self.sampler.apply(event)]
+        await self._prepare()
+
+        with self.metrics.time("serialize_seconds"):
+            payloads = [event.to_json() for event in built]
+        chunks = chunk_payloads(payloads, self.batch_max_events, self.batch_max_bytes)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def send(payload: str) -> dict:
+            async with semaphore:
+                return await self._send_payload(payload)
+
+        return list(
+            await asyncio.gather(*(send(serialize_batch(chunk)) for chunk in chunks))
+        )
+
+    async def track_update(self, update: dict) -> Optional[dict]:
+        """Tracks a raw Telegram update, if the auto-capture settings select it.
+
+        Args:
+            update (dict): The update, as received by a webhook.
+
+        Returns:
+            Optional[dict]: The response from the server, or None if the update
+                is not tracked, is dropped by the sampler or is a duplicate.
+        """
+        await self._prepare()
+        event = self.event_builder.parse_telegram_update(update)
+        if event is None:
+            return None
+        return await self.track(event)
+
+    async def track_updates(self, updates: Iterable[dict]) -> List[dict]:
+        """Tracks the selected updates of a batch, e.g. the result of getUpdates.
+
+        Args:
+            updates (Iterable[dict]): The updates.
+
+        Returns:
+            List[dict]: The responses from the server, one per request.
+        """
+        await self._prepare()
+        return await self.track_many(self.event_builder.parse_telegram_updates(updates))
+
+    async def aclose(self) -> None:
+        """Closes the underlying HTTP connections."""
+        await self.http_client.aclose()
+
+    async def __aenter__(self) -> "AsyncTelemetree":
+        await self.initialize()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _prepare(self) -> None:
+        """Initializes the client if needed and applies configuration changes."""
+        await self.initialize()
+        config = await self.config.config_async()
+        compression = self._negotiate_compression(config)
+        if (
+            config.public_key == self.public_key
+            and config.host == self.host
+            and compression is self.encryption_service.compression
+        ):
+            return
+
+        logger.info("Telemetree configuration changed, applying the new settings")
+        self.host = config.host
+        self.http_client.url = config.host
+        self.public_key = config.public_key
+        if config.public_key != self.encryption_service.rsa_public_key:
+            self.encryption_service.rsa_public_key = config.public_key
+        self.encryption_service.compression = compression
+        self.event_builder = EventBuilder(config, self.application_id)
+
+    def _negotiate_compression(self, config: TelemetreeConfig) -> Compression:
+        if not self.payload_compression:
+            return Compression.NONE
+        return negotiate(config.compression)
+
+    async def _send(self, event: Union[Event, TrustedEvent]) -> dict:
+        with self.metrics.time("serialize_seconds"):
+            payload = event.to_json()
+        return await self._send_payload(payload)
+
+    async def _send_payload(self, payload: bytes) -> dict:
+        loop = asyncio.get_running_loop()
+        encrypted_event = await loop.run_in_executor(
+            self.executor, self.encryption_service.encrypt, payload
+        )
+
+        return await self.http_client.post(EncryptedEvent(**encrypted_event))
@@ -0,0 +1,390 @@
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from telemetree.transport import TransportKind
+
+logger = logging.getLogger("telemetree.cli")
+
+# Credentials of the local stand-in pipeline, which accepts any well formed ones
+MOCK_API_KEY = "00000000-0000-4000-8000-000000000000"
+MOCK_PROJECT_ID = "00000000-0000-4000-8000-000000000001"
+
+# Subcommands implemented by the modules' own entry points
+_DELEGATED = {
+    "agent": ("telemetree.agent", "Runs the delivery agent."),
+    "upload": ("telemetree.export", "Uploads exported events."),
+}
+
+
+class ReplayReport(NamedTuple):
+    events: int
+    calls: int
+    errors: int
+    elapsed: float
+    cpu: float
+    latencies: List[float]
+    metrics: Dict[str, Any]
+
+    @property
+    def throughput(self) -> float:
+        return self.events / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.calls if self.calls else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Returns a latency percentile by nearest rank, q between 0 and 1."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "events": self.events,
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": self.error_rate,
+            "elapsed_seconds": self.elapsed,
+            "events_per_second": self.throughput,
+            "cpu_seconds_per_event": self.cpu / self.events if self.events else 0.0,
+            "latency_seconds": {
+                "p50": self.percentile(0.5),
+                "p90": self.percentile(0.9),
+                "p99": self.percentile(0.99),
+                "max": max(self.latencies, default=0.0),
+            },
+            "http_requests": self.metrics.get("http_requests", 0),
+            "http_retries": self.metrics.get("http_retries", 0),
+            "http_errors": self.metrics.get("http_errors", 0),
+            "send_errors": self.metrics.get("send_errors", 0),
+        }
+
+
+def load_records(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Reads events or Telegram updates from a JSON Lines file, skipping blank lines.
+
+    Raises:
+        ValueError: If a line is not a JSON object.
+    """
+    records = []
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {number} of {path} is not a JSON object")
+            records.append(record)
+            if limit is not None and len(records) >= limit:
+                break
+    return records
+
+
+def is_update(record: Dict[str, Any]) -> bool:
+    """Returns True if the record is a Telegram update rather than an event."""
+    return "update_id" in record
+
+
+def synthesize_events(
+    records: Sequence[Dict[str, Any]], event_type: str
+) -> List[Dict[str, Any]]:
+    """
+    Replaces records that are neither events nor updates with events of the
+    given type, one per record, from user IDs counting up from 1. This turns
+    any JSON Lines file into load of the same shape.
+    """
+    return [
+        (
+            record
+            if is_update(record) or "event_type" in record
+            else {"event_type": event_type, "telegram_id": number}
+        )
+        for number, record in enumerate(records, 1)
+    ]
+
+
+def replay(
+    client: Any,
+    records: Sequence[Dict[str, Any]],
+    rate: Optional[float] = None,
+    threads: int = 1,
+    batch_size: int = 1,
+    repeat: int = 1,
+) -> ReplayReport:
+    """
+    Replays records through a client and measures it.
+
+    Records are tracked one at a time with `track` and `track_update`, or in
+    groups of `batch_size` with `track_many` and `track_updates`. Calls are
+    paced to start at `rate` events per second overall, whatever the latency,
+    so a slow client falls behind instead of lowering the load. The run ends
+    with a flush, so queued events count towards the elapsed time.
+
+    Args:
+        client (Telemetree): The client to replay through.
+        records (Sequence[Dict[str, Any]]): The events and updates.
+        rate (Optional[float]): The target events per second. None sends as
+            fast as the client allows.
+        threads (int): The number of threads calling the client.
+        batch_size (int): The number of records per call.
+        repeat (int): The number of passes over the records.
+
+    Returns:
+        ReplayReport: The measurements.
+    """
+    if threads <= 0 or batch_size <= 0 or repeat <= 0:
+        raise ValueError("threads, batch_size and repeat must be positive")
+    if rate is not None and rate <= 0:
+        raise ValueError("rate must be positive")
+
+    passes = itertools.chain.from_iterable(itertools.repeat(records, repeat))
+    batches: Iterator[List[Dict[str, Any]]] = iter(
+        lambda: list(itertools.islice(passes, batch_size)), []
+    )
+    lock = threading.Lock()
+    latencies: List[float] = []
+    totals = {"events": 0, "calls": 0, "errors": 0}
+
+    start = time.perf_counter()
+
+    def next_batch():
+        with lock:
+            batch = next(batches, None)
+            if batch is None:
+                return None, 0.0
+            due = start + totals["events"] / rate if rate else 0.0
+            totals["events"] += len(batch)
+            totals["calls"] += 1
+            return batch, due
+
+    def worker() -> None:
+        while True:
+            batch, due = next_batch()
+            if batch is None:
+                return
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            started = time.perf_counter()
+            try:
+                _track(client, batch, batch_size)
+            except Exception as e:
+                logger.debug("Tracking failed: %s", e)
+                with lock:
+                    totals["errors"] += 1
+            latency = time.perf_counter() - started
+            with lock:
+                latencies.append(latency)
+
+    cpu_start = time.process_time()
+    workers = [
+        threading.Thread(target=worker, name=f"telemetree-replay-{n}")
+        for n in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    client.flush()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    metrics = client.metrics.snapshot() if client.metrics.enabled else {}
+    return ReplayReport(
+        totals["events"],
+        totals["calls"],
+        totals["errors"],
+        elapsed,
+        cpu,
+        latencies,
+        metrics,
+    )
+
+
+def _track(client: Any, batch: List[Dict[str, Any]], batch_size: int) -> None:
+    if batch_size == 1:
+        (record,) = batch
+        if is_update(record):
+            client.track_update(record)
+        else:
+            client.track(dict(record))
+        return
+    updates = [record for record in batch if is_update(record)]
+    events = [dict(record) for record in batch if not is_update(record)]
+    if events:
+        client.track_many(events)
+    if updates:
+        client.track_updates(updates)
+
+
+def format_report(report: ReplayReport) -> str:
+    values = report.to_dict()
+    latency = values["latency_seconds"]
+    lines = [
+        f"events          {values['events']}",
+        f"elapsed         {values['elapsed_seconds']:.3f} s",
+        f"throughput      {values['events_per_second']:.1f} events/s",
+        "latency         p50 {:.2f} ms, p90 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms".format(
+            *(latency[key] * 1000 for key in ("p50", "p90", "p99", "max"))
+        ),
+        f"cpu             {values['cpu_seconds_per_event'] * 1e6:.1f} us/event",
+        f"errors          {values['errors']} of {values['calls']} calls "
+        f"({values['error_rate']:.2%})",
+        f"http            {values['http_requests']} requests, "
+        f"{values['http_retries']} retries, {values['http_errors']} errors",
+    ]
+    return "\n".join(lines)
+
+
+def _replay_parser(subparsers: Any) -> None:
+    parser = subparsers.add_parser(
+        "replay",
+        help="replays events or Telegram updates and reports the performance",
+        description=(
+            "Replays a JSON Lines file of events or Telegram updates through "
+            "Telemetree at a target rate, and reports the throughput, latency "
+            "percentiles, CPU time per event and error rate."
+        ),
+    )
+    parser.add_argument("file", help="a JSON Lines file of events or updates")
+    parser.add_argument("--rate", type=float, help="target events per second")
+    parser.add_argument("--threads", type=int, default=1, help="calling threads")
+    parser.add_argument(
+        "--batch-size", type=int, default=1, help="records per track_many call"
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the file")
+    parser.add_argument("--limit", type=int, help="replay the first records only")
+    parser.add_argument(
+        "--event-type",
+        help="send records that are neither events nor updates as this event",
+    )
+    parser.add_argument(
+        "--batching", action="store_true", help="queue events in the background"
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="deliver concurrently with an adaptive concurrency limit",
+    )
+    parser.add_argument(
+        "--transport",
+        default=TransportKind.REQUESTS.value,
+        choices=[kind.value for kind in TransportKind],
+    )
+    parser.add_argument(
+        "--config-url", help="the configuration endpoint, which names the host"
+    )
+    parser.add_argument(
+        "--mock",
+        action="store_true",
+        help="replay against a local stand-in pipeline",
+    )
+    parser.add_argument(
+        "--mock-latency",
+        type=float,
+        default=0.0,
+        help="seconds the stand-in pipeline waits before answering",
+    )
+    parser.add_argument(
+        "--mock-key-bits", type=int, default=2048, help=argparse.SUPPRESS
+    )
+    parser.add_argument(
+        "--api-key", default=os.environ.get("TELEMETREE_API_KEY"), required=False
+    )
+    parser.add_argument(
+        "--project-id", default=os.environ.get("TELEMETREE_PROJECT_ID"), required=False
+    )
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.set_defaults(run=_run_replay, parser=parser)
+
+
+def _run_replay(args: argparse.Namespace) -> int:
+    from telemetree.client import Telemetree
+    from telemetree.concurrency import AdaptiveLimiter
+    from telemetree.metrics import Metrics
+    from telemetree.testing import MockPipeline
+
+    pipeline = None
+    config_url = args.config_url
+    api_key, project_id = args.api_key, args.project_id
+    if args.mock:
+        pipeline = MockPipeline(latency=args.mock_latency, key_bits=args.mock_key_bits)
+        pipeline.start()
+        config_url = pipeline.config_url
+        api_key, project_id = api_key or MOCK_API_KEY, project_id or MOCK_PROJECT_ID
+    elif not api_key or not project_id:
+        args.parser.error(
+            "--api-key and --project-id, or TELEMETREE_API_KEY and "
+            "TELEMETREE_PROJECT_ID, are required without --mock"
+        )
+
+    try:
+        records = load_records(args.file, args.limit)
+        if args.event_type:
+            records = synthesize_events(records, args.event_type)
+        client = Telemetree(
+            api_key,
+            project_id,
+            batching=args.batching,
+            config_url=config_url,
+            config_cache=None,
+            metrics=Metrics(),
+            transport=args.transport,
+            concurrency_limiter=AdaptiveLimiter() if args.adaptive else None,
+        )
+        with client:
+            report = replay(
+                client,
+                records,
+                rate=args.rate,
+                threads=args.threads,
+                batch_size=args.batch_size,
+                repeat=args.repeat,
+            )
+    finally:
+        if pipeline is not None:
+            pipeline.stop()
+
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        print(format_report(report))
+    return 1 if report.errors else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """The `telemetree` command."""
+    from importlib import import_module
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] in _DELEGATED:
+        module = import_module(_DELEGATED[argv[0]][0])
+        module.main(argv[1:])
+        return 0
+
+    parser = argparse.ArgumentParser(
+        prog="telemetree", description="Telemetree SDK tools."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    _replay_parser(subparsers)
+    for name, (module, description) in _DELEGATED.items():
+        subparsers.add_parser(name, help=description.lower().rstrip("."))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    run: Callable[[argparse.Namespace], int] = args.run
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
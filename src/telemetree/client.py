@@ -1,45 +1,439 @@
+import atexit
 import json
 import logging
-from typing import Optional, Union
+import threading
+from typing import Iterable, List, Optional, Sequence, Union
 
 from pydantic import ValidationError
 
-from telemetree.config import Config
+from telemetree.aggregation import DEFAULT_DIMENSIONS, Aggregator
+from telemetree.concurrency import AdaptiveLimiter, DeliveryScheduler
+from telemetree.compression import Compression, negotiate
+from telemetree.config import Config, ConfigCache, default_config_cache
+from telemetree.constants import (
+    AGGREGATION_MAX_KEYS,
+    AGGREGATION_WINDOW,
+    BATCH_MAX_BYTES,
+    BATCH_MAX_EVENTS,
+    DISPATCHER_CLOSE_TIMEOUT,
+    DISPATCHER_FLUSH_INTERVAL,
+    DISPATCHER_FLUSH_SIZE,
+    DISPATCHER_QUEUE_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_READ_TIMEOUT,
+    SESSION_MAX_USERS,
+    SESSION_TIMEOUT,
+    SPOOL_MAX_AGE,
+    SPOOL_MAX_BYTES,
+)
+from telemetree.dispatcher import BatchDispatcher, OverflowPolicy
 from telemetree.http_client import HttpClient
-from telemetree.schemas import EncryptedEvent, Event
+from telemetree.metrics import Metrics, resolve_metrics
+from telemetree.schemas import (
+    PROCESS_SESSION_ID,
+    EncryptedEvent,
+    Event,
+    TelemetreeConfig,
+    TrustedEvent,
+)
 from telemetree.encryption import EncryptionService
 from telemetree.event_builder import EventBuilder
-from telemetree.utils import validate_uuid
+from telemetree.executors import EncryptionExecutor, ExecutorKind
+from telemetree.retry import CircuitBreaker, RetryPolicy
+from telemetree.sampling import Sampler
+from telemetree.dedup import Deduplicator
+from telemetree.sessions import SessionTracker
+from telemetree.agent import UNASSIGNED_SESSION_ID, AgentClient
+from telemetree.export import ExportFormat, FileSink
+from telemetree.transport import Transport, TransportKind
+from telemetree.spool import Spool, SpoolDrainer
+from telemetree.utils import chunk_payloads, serialize_batch, validate_uuid
 
 
 logger = logging.getLogger("telemetree.client")
 
 
+def build_event(
+    event: Union[Event, TrustedEvent, dict],
+    application_id: Optional[str],
+    validate: bool = True,
+) -> Union[Event, TrustedEvent]:
+    """
+    Validates a raw event and converts it to an Event.
+
+    Args:
+        event (Union[Event, TrustedEvent, dict]): The event to validate.
+            Events are returned as they are, timestamped now unless they
+            were given a datetime.
+        application_id (Optional[str]): The application ID added to dictionary events.
+        validate (bool): Validate dictionary events with pydantic. When False,
+            they are converted to a TrustedEvent, which only checks field names.
+
+    Raises:
+        ValueError: If the event is invalid.
+
+    Returns:
+        Union[Event, TrustedEvent]: The event.
+    """
+    if isinstance(event, (Event, TrustedEvent)):
+        event.stamp()
+        return event
+    if not isinstance(event, dict):
+        logger.error("Invalid type: expected Event type or dictionary")
+        raise ValueError("Invalid type: expected Event type or dictionary")
+    if not validate:
+        event = TrustedEvent.from_dict(event)
+        event.application_id = application_id
+        return event
+    try:
+        event["application_id"] = application_id
+        return Event(**event)
+    except ValidationError as e:
+        logger.error("Invalid event: %s", e)
+        raise ValueError(f"Invalid event: {e}") from e
+
+
 class Telemetree:
-    def __init__(self, api_key: str, project_id: str):
+    def __init__(
+        self,
+        api_key: str,
+        project_id: str,
+        batching: bool = False,
+        max_queue_size: int = DISPATCHER_QUEUE_SIZE,
+        flush_size: int = DISPATCHER_FLUSH_SIZE,
+        flush_interval: float = DISPATCHER_FLUSH_INTERVAL,
+        overflow_policy: Union[OverflowPolicy, str] = OverflowPolicy.DROP_OLDEST,
+        pool_connections: int = HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        key_reuse_events: Optional[int] = 1,
+        key_reuse_seconds: Optional[float] = None,
+        batch_max_events: int = BATCH_MAX_EVENTS,
+        batch_max_bytes: int = BATCH_MAX_BYTES,
+        spool_dir: Optional[str] = None,
+        spool_max_bytes: int = SPOOL_MAX_BYTES,
+        spool_max_age: float = SPOOL_MAX_AGE,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        encryption_executor: Union[ExecutorKind, str] = ExecutorKind.INLINE,
+        encryption_workers: Optional[int] = None,
+        config_cache: Optional[ConfigCache] = default_config_cache,
+        lazy: bool = False,
+        warmup: bool = False,
+        validate_events: bool = True,
+        payload_compression: bool = True,
+        gzip_requests: bool = False,
+        sampler: Optional[Sampler] = None,
+        aggregate: Optional[Iterable[str]] = None,
+        aggregation_window: float = AGGREGATION_WINDOW,
+        aggregation_max_keys: int = AGGREGATION_MAX_KEYS,
+        aggregation_dimensions: Sequence[str] = DEFAULT_DIMENSIONS,
+        metrics: Optional[Metrics] = None,
+        config_url: Optional[str] = None,
+        deduplicator: Optional[Deduplicator] = None,
+        agent_socket: Optional[str] = None,
+        transport: Union[TransportKind, str, Transport] = TransportKind.REQUESTS,
+        concurrency_limiter: Optional[AdaptiveLimiter] = None,
+        session_timeout: Optional[float] = SESSION_TIMEOUT,
+        session_max_users: int = SESSION_MAX_USERS,
+        export_dir: Optional[str] = None,
+        export_format: Union[ExportFormat, str] = ExportFormat.PLAINTEXT,
+    ):
         """
         Initializes the TelemetreeClient with the provided API key and project ID.
 
         Args:
             api_key (str): The API key for authentication.
             project_id (str): The project ID for the Telemetree service.
+            batching (bool): Queue events and send them from a background thread.
+            max_queue_size (int): The maximum number of queued events in batching mode.
+            flush_size (int): The number of queued events that triggers a send.
+            flush_interval (float): The maximum time in seconds an event stays queued.
+            overflow_policy (Union[OverflowPolicy, str]): What to do with new events
+                when the queue is full: drop_oldest, drop_newest or block.
+            pool_connections (int): The number of hosts to keep connection pools for.
+            pool_maxsize (int): The maximum number of keep-alive connections per host.
+            connect_timeout (float): The HTTP connection timeout in seconds.
+            read_timeout (float): The HTTP read timeout in seconds.
+            key_reuse_events (Optional[int]): The number of events encrypted with one
+                RSA wrapped AES key. See EncryptionService.
+            key_reuse_seconds (Optional[float]): The maximum age of an RSA wrapped
+                AES key in seconds. See EncryptionService.
+            batch_max_events (int): The maximum number of events sent in one request.
+            batch_max_bytes (int): The maximum size in bytes of the serialized events
+                sent in one request.
+            spool_dir (Optional[str]): A directory to persist encrypted events in before
+                sending. Spooled events are delivered by a background thread and
+                replayed after a restart.
+            spool_max_bytes (int): The maximum size of the spool on disk.
+            spool_max_age (float): The maximum age of spooled events in seconds.
+            retry_policy (Optional[RetryPolicy]): When and how failed requests are retried.
+            circuit_breaker (Optional[CircuitBreaker]): Fails requests fast while the
+                host is down. Combined with `spool_dir`, events wait in the spool
+                until the host recovers.
+            encryption_executor (Union[ExecutorKind, str]): Where events are encrypted:
+                inline, thread or process. A process pool encrypts the batches of
+                `track_many` and the background dispatcher on several cores.
+            encryption_workers (Optional[int]): The size of the encryption pool.
+                Defaults to the number of CPUs.
+            config_cache (Optional[ConfigCache]): Serves the remote configuration and
+                refreshes it in the background. Defaults to a cache shared by the
+                clients of the process. None fetches the configuration once.
+            lazy (bool): Return immediately and fetch the configuration, parse the
+                key and set up encryption and the spool on first use.
+            warmup (bool): In lazy mode, initialize in a background thread right away.
+            validate_events (bool): Validate dictionary events with pydantic. Turn it
+                off when the events come from trusted code to build them several
+                times faster. See TrustedEvent.
+            payload_compression (bool): Compress events before encryption with the
+                best compression the pipeline accepts, according to its configuration.
+            gzip_requests (bool): Send request bodies gzip compressed.
+            sampler (Optional[Sampler]): Samples and rate limits events by type
+                before they are queued, encrypted or sent.
+            aggregate (Optional[Iterable[str]]): Counter event types to fold: identical
+                events within a window are sent once, with a count. See Aggregator.
+            aggregation_window (float): The aggregation window in seconds.
+            aggregation_max_keys (int): The maximum number of distinct events held
+                before a window is sent early.
+            aggregation_dimensions (Sequence[str]): The fields that must be equal,
+                besides the event type and Telegram ID, for events to be folded.
+            metrics (Optional[Metrics]): Collects per-stage latencies, queue depth,
+                bytes sent, retries, drops and errors. Disabled by default.
+            config_url (Optional[str]): The configuration endpoint, for staging or
+                local test servers. Defaults to Config.CONFIG_URL.
+            deduplicator (Optional[Deduplicator]): Drops events whose event ID was
+                already tracked, giving the others an ID sent with them.
+            agent_socket (Optional[str]): Hand events to the delivery agent
+                listening on this Unix socket instead of encrypting and sending
+                them. The agent fetches the configuration, so Telegram updates
+                are selected with the default auto-capture settings, and assigns
+                the sessions, so a user keeps one session across workers.
+            transport (Union[TransportKind, str, Transport]): How requests are sent:
+                "requests" for pooled HTTP/1.1 connections, "http2" to multiplex
+                concurrent requests over one HTTP/2 connection (needs the h2
+                package), "memory" to keep them in memory in tests, or a
+                Transport instance.
+            concurrency_limiter (Optional[AdaptiveLimiter]): Bounds the requests
+                in flight and adapts the bound to the host's latency and 429 and
+                5xx responses. Batches and the chunks of `track_many` are then
+                delivered from a pool of threads instead of one at a time.
+            session_timeout (Optional[float]): The inactivity in seconds that ends a
+                user's session. Events are given the session ID of their user
+                when they are tracked. None leaves them on the process session.
+                Ignored with `agent_socket`, where the agent's client sets it.
+            session_max_users (int): The maximum number of users whose sessions are
+                tracked at once. See SessionTracker.
+            export_dir (Optional[str]): Write events to rotated, compressed files in
+                this directory instead of sending them, for a later upload with
+                BulkUploader. See FileSink.
+            export_format (Union[ExportFormat, str]): "plaintext" to write events
+                as they are, without fetching the configuration, to be encrypted
+                in large batches when uploaded, or "encrypted" to encrypt them
+                before writing them, keeping user data out of the files.
         """
         self.api_key = validate_uuid(api_key)
         self.project_id = validate_uuid(project_id)
+        self.application_id = self.project_id
+        self.batch_max_events = batch_max_events
+        self.batch_max_bytes = batch_max_bytes
+        self.validate_events = validate_events
+        self.sampler = sampler
+        self.deduplicator = deduplicator
+        self.sessions = (
+            SessionTracker(session_timeout, session_max_users)
+            if session_timeout is not None and agent_socket is None
+            else None
+        )
+        if export_dir is not None and (
+            agent_socket is not None or spool_dir is not None
+        ):
+            raise ValueError(
+                "export_dir cannot be combined with agent_socket or spool_dir"
+            )
+        self.agent = AgentClient(agent_socket) if agent_socket is not None else None
+        self.export = (
+            FileSink(export_dir, ExportFormat(export_format))
+            if export_dir is not None
+            else None
+        )
+        # Events handed off serialized, to be encrypted elsewhere
+        self._handoff = self.agent
+        if self.export is not None and self.export.format is ExportFormat.PLAINTEXT:
+            self._handoff = self.export
+        self.metrics = resolve_metrics(metrics)
+
+        self.http_client = HttpClient(
+            self.api_key,
+            self.project_id,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            gzip=gzip_requests,
+            metrics=self.metrics,
+            transport=transport,
+            limiter=concurrency_limiter,
+        )
+        self.concurrency_limiter = concurrency_limiter
+        # Spooled events are posted by the drainer, so only direct posts are scheduled
+        self.scheduler: Optional[DeliveryScheduler] = None
+        if concurrency_limiter is not None and spool_dir is None and export_dir is None:
+            self.scheduler = DeliveryScheduler(concurrency_limiter)
+
+        self.config_cache = config_cache
+        self.config_url = config_url
+        self.payload_compression = payload_compression
+        self.key_reuse_events = key_reuse_events
+        self.key_reuse_seconds = key_reuse_seconds
+        self.encryption_executor_kind = ExecutorKind(encryption_executor)
+        self.encryption_workers = encryption_workers
+        self.spool_dir = spool_dir
+        self.spool_max_bytes = spool_max_bytes
+        self.spool_max_age = spool_max_age
+
+        self.config: Optional[Config] = None
+        self.public_key: Optional[str] = None
+        self.host: Optional[str] = None
+        self.encryption_service: Optional[EncryptionService] = None
+        self.encryption_executor: Optional[EncryptionExecutor] = None
+        self.spool: Optional[Spool] = None
+        self.drainer: Optional[SpoolDrainer] = None
+        self._event_builder: Optional[EventBuilder] = None
+
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+        self.dispatcher: Optional[BatchDispatcher] = None
+        if batching:
+            self.dispatcher = BatchDispatcher(
+                self._send_batch,
+                max_queue_size=max_queue_size,
+                flush_size=flush_size,
+                flush_interval=flush_interval,
+                overflow_policy=OverflowPolicy(overflow_policy),
+            )
+
+        self.aggregator: Optional[Aggregator] = None
+        if aggregate is not None:
+            self.aggregator = Aggregator(
+                self._track_built,
+                aggregate,
+                window=aggregation_window,
+                max_keys=aggregation_max_keys,
+                dimensions=aggregation_dimensions,
+            )
+
+        self._register_gauges()
+
+        if (
+            self.dispatcher is not None
+            or self.aggregator is not None
+            or spool_dir is not None
+            or export_dir is not None
+        ):
+            atexit.register(self.close)
+
+        if not lazy:
+            self.initialize()
+        elif warmup:
+            threading.Thread(
+                target=self._warmup, name="telemetree-warmup", daemon=True
+            ).start()
+
+    def initialize(self) -> None:
+        """
+        Fetches the configuration and sets up encryption and the spool.
+
+        Called by the constructor unless the client is lazy, in which case it
+        runs on first use. Safe to call repeatedly.
+        """
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+
+            if self._handoff is not None:
+                # The agent or the uploader fetches the configuration and encrypts
+                self._initialized = True
+                return
+
+            self.config = Config(
+                self.http_client, cache=self.config_cache, url=self.config_url
+            )
+            self.public_key = self.config.get_public_key()
+            self.host = self.config.get_host()
+            self.http_client.url = self.host
+
+            self.encryption_service = EncryptionService(
+                self.public_key,
+                key_reuse_events=self.key_reuse_events,
+                key_reuse_seconds=self.key_reuse_seconds,
+                compression=self._negotiate_compression(self.config.config),
+                metrics=self.metrics,
+            )
+            self.encryption_executor = EncryptionExecutor(
+                self.encryption_service,
+                kind=self.encryption_executor_kind,
+                max_workers=self.encryption_workers,
+            )
 
-        self.http_client = HttpClient(self.api_key, self.project_id)
+            if self.spool_dir is not None:
+                self.spool = Spool(
+                    self.spool_dir,
+                    max_bytes=self.spool_max_bytes,
+                    max_age=self.spool_max_age,
+                )
+                self.drainer = SpoolDrainer(
+                    self.spool, self._post, metrics=self.metrics
+                )
 
-        self.config = Config(self.http_client)
-        self.public_key = self.config.get_public_key()
-        self.host = self.config.get_host()
+            self._initialized = True
 
-        self.encryption_service = EncryptionService(self.public_key)
+    def _register_gauges(self) -> None:
+        metrics = self.metrics
+        if self.dispatcher is not None:
+            metrics.register_gauge("queue_depth", lambda: len(self.dispatcher))
+            metrics.register_gauge("queue_dropped", lambda: self.dispatcher.dropped)
+        if self.aggregator is not None:
+            metrics.register_gauge("aggregated_events", lambda: len(self.aggregator))
+        if self.deduplicator is not None:
+            metrics.register_gauge(
+                "duplicates_dropped", lambda: self.deduplicator.dropped
+            )
+        if self.sessions is not None:
+            metrics.register_gauge("session_users", lambda: len(self.sessions))
+        if self.concurrency_limiter is not None:
+            limiter = self.concurrency_limiter
+            metrics.register_gauge("concurrency_limit", lambda: limiter.limit)
+            metrics.register_gauge("requests_in_flight", lambda: limiter.in_flight)
+        if self.sampler is not None:
+            metrics.register_gauge(
+                "sampled_out", lambda: sum(self.sampler.dropped.values())
+            )
+        if self.spool_dir is not None:
+            metrics.register_gauge(
+                "spool_bytes", lambda: self.spool.size_bytes if self.spool else 0
+            )
 
-    def track(self, event: Union[Event, dict]) -> dict:
+    def _warmup(self) -> None:
+        try:
+            self.initialize()
+        except Exception as e:
+            logger.warning(
+                "Background initialization failed, retrying on first use: %s", e
+            )
+
+    def track(self, event: Union[Event, TrustedEvent, dict]) -> Optional[dict]:
         """Key function to track events.
 
         Args:
-            event (Union[Event, dict]): The event to track.
+            event (Union[Event, TrustedEvent, dict]): The event to track.
 
         Required:
             - event_type (str): The type of event to track.
@@ -57,20 +451,319 @@ class Telemetree:
             ValueError: If the event is invalid.
 
         Returns:
-            dict: The response from the server.
+            Optional[dict]: The response from the server, or None in batching,
+                spool or agent mode, where the event is sent in the background, in
+                export mode, when the sampler drops the event, when it is a
+                duplicate and when it is aggregated.
         """
-        if not isinstance(event, Event) and not isinstance(event, dict):
-            logger.error("Invalid type: expected Event type or dictionary")
-            raise ValueError("Invalid type: expected Event type or dictionary")
-        if isinstance(event, dict):
-            try:
-                event["application_id"] = self.application_id
-                event = Event(**event)
-            except ValidationError as e:
-                logger.error("Invalid event: %s", e)
-                raise ValueError(f"Invalid event: {e}") from e
+        with self.metrics.time("validate_seconds"):
+            event = build_event(event, self.application_id, self.validate_events)
+        self.metrics.increment("events_tracked")
+        if self.deduplicator is None:
+            return self._track_event(event)
+        if self.deduplicator.is_duplicate(event):
+            return None
+        with self.deduplicator.tracking((event,)):
+            return self._track_event(event)
+
+    def _track_event(self, event: Union[Event, TrustedEvent]) -> Optional[dict]:
+        if self.sessions is not None:
+            self.sessions.apply(event)
+        if self.sampler is not None and not self.sampler.apply(event):
+            return None
+        if self._aggregate(event):
+            return None
+
+        if self.dispatcher is not None:
+            self.dispatcher.submit(event)
+            return None
+
+        return self._send(event)
+
+    def track_many(
+        self, events: Iterable[Union[Event, TrustedEvent, dict]]
+    ) -> Optional[List[dict]]:
+        """Tracks several events with as few requests as possible.
+
+        The events are serialized into JSON arrays of at most `batch_max_events`
+        events and `batch_max_bytes` bytes, and each array is encrypted once and
+        sent in a single request. All events are validated before anything is sent.
+
+        Args:
+            events (Iterable[Union[Event, TrustedEvent, dict]]): The events to track.
+
+        Raises:
+            ValueError: If any of the events is invalid.
+
+        Returns:
+            Optional[List[dict]]: The responses from the server, one per request, or
+                None in batching, spool or agent mode, where the events are sent in the
+                background, and in export mode.
+        """
+        with self.metrics.time("validate_seconds"):
+            built = [
+                build_event(event, self.application_id, self.validate_events)
+                for event in events
+            ]
+        self.metrics.increment("events_tracked", len(built))
+        if self.deduplicator is None:
+            return self._track_events(built)
+        built = [event for event in built if not self.deduplicator.is_duplicate(event)]
+        with self.deduplicator.tracking(built):
+            return self._track_events(built)
+
+    def _track_events(
+        self, built: List[Union[Event, TrustedEvent]]
+    ) -> Optional[List[dict]]:
+        if self.sessions is not None:
+            for event in built:
+                self.sessions.apply(event)
+        if self.sampler is not None:
+            built = [event for event in built if self.sampler.apply(event)]
+        if self.aggregator is not None:
+            built = [event for event in built if not self._aggregate(event)]
+        return self._track_built(built)
+
+    def _aggregate(self, event: Union[Event, TrustedEvent]) -> bool:
+        """Hands counter events to the aggregator. Returns True if it took the event."""
+        if self.aggregator is None or not self.aggregator.accepts(event):
+            return False
+        self.aggregator.add(event)
+        return True
+
+    def _track_built(
+        self, built: List[Union[Event, TrustedEvent]]
+    ) -> Optional[List[dict]]:
+        if self.dispatcher is not None:
+            for event in built:
+                self.dispatcher.submit(event)
+            return None
+
+        if self._handoff is not None:
+            self._forward(built)
+            return None
+
+        self._prepare()
+        encrypted_events = self.encryption_executor.map(self._batch_payloads(built))
+        if self.scheduler is not None:
+            futures = [
+                self.scheduler.submit(self._deliver, encrypted)
+                for encrypted in encrypted_events
+            ]
+            return [future.result() for future in futures]
+        responses = [self._deliver(encrypted) for encrypted in encrypted_events]
+        if self.spool is not None or self.export is not None:
+            return None
+        return responses
+
+    def track_update(self, update: dict) -> Optional[dict]:
+        """Tracks a raw Telegram update, if the auto-capture settings select it.
+
+        Args:
+            update (dict): The update, as received by a webhook.
+
+        Returns:
+            Optional[dict]: The response from the server, or None if the update is
+                not tracked or is sent in the background.
+        """
+        event = self.event_builder.parse_telegram_update(update)
+        if event is None:
+            return None
+        return self.track(event)
+
+    def track_updates(self, updates: Iterable[dict]) -> Optional[List[dict]]:
+        """Tracks the selected updates of a batch, e.g. the result of getUpdates.
+
+        Args:
+            updates (Iterable[dict]): The updates.
+
+        Returns:
+            Optional[List[dict]]: The responses from the server, as for `track_many`.
+        """
+        return self.track_many(self.event_builder.parse_telegram_updates(updates))
+
+    @property
+    def event_builder(self) -> EventBuilder:
+        """The converter of Telegram updates, following the remote auto-capture settings."""
+        self._prepare()
+        settings = self.config.config if self.config is not None else None
+        if self._event_builder is None or (
+            settings is not None and self._event_builder.settings is not settings
+        ):
+            self._event_builder = EventBuilder(settings, self.application_id)
+        return self._event_builder
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sends all queued and spooled events and waits for the sends to finish.
+
+        Args:
+            timeout (Optional[float]): The maximum time to wait in seconds.
+
+        Returns:
+            bool: True if everything was sent within the timeout.
+        """
+        if self.aggregator is not None:
+            self.aggregator.flush()
+        if self.dispatcher is not None and not self.dispatcher.flush(timeout):
+            return False
+        if self.scheduler is not None and not self.scheduler.wait(timeout):
+            return False
+        if self.drainer is not None:
+            return self.drainer.flush(timeout)
+        return True
+
+    def close(self, timeout: Optional[float] = DISPATCHER_CLOSE_TIMEOUT) -> None:
+        """
+        Sends all queued events, stops the background workers and closes the
+        pooled HTTP connections. Spooled events that could not be delivered
+        within the timeout stay on disk for the next run.
+
+        Args:
+            timeout (Optional[float]): The maximum time to wait for queued events in seconds.
+        """
+        atexit.unregister(self.close)
+        if self.aggregator is not None:
+            self.aggregator.close(timeout)
+        if self.dispatcher is not None:
+            self.dispatcher.close(timeout)
+        if self.scheduler is not None:
+            self.scheduler.shutdown(timeout)
+        if self.drainer is not None:
+            self.drainer.flush(timeout)
+            self.drainer.close(timeout)
+            self.spool.close()
+        if self.encryption_executor is not None:
+            self.encryption_executor.shutdown()
+        if self.agent is not None:
+            self.agent.close()
+        if self.export is not None:
+            self.export.close()
+        self.http_client.close()
+
+    def __enter__(self) -> "Telemetree":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _prepare(self) -> None:
+        """Initializes the client if needed and applies configuration changes."""
+        self.initialize()
+        if self._handoff is None:
+            self._sync_config()
+
+    def _negotiate_compression(self, config: TelemetreeConfig) -> Compression:
+        if not self.payload_compression:
+            return Compression.NONE
+        return negotiate(config.compression)
+
+    def _sync_config(self) -> None:
+        """
+        Picks up a rotated public key, a moved host or a new compression from the
+        refreshed configuration.
+        """
+        config = self.config.config
+        compression = self._negotiate_compression(config)
+        if (
+            config.public_key == self.public_key
+            and config.host == self.host
+            and compression is self.encryption_service.compression
+        ):
+            return
+
+        logger.info("Telemetree configuration changed, applying the new settings")
+        self.host = config.host
+        self.http_client.url = config.host
+        if (
+            config.public_key != self.public_key
+            or compression is not self.encryption_service.compression
+        ):
+            self.public_key = config.public_key
+            if config.public_key != self.encryption_service.rsa_public_key:
+                self.encryption_service.rsa_public_key = config.public_key
+            self.encryption_service.compression = compression
+            if self.encryption_executor.kind is ExecutorKind.PROCESS:
+                # Worker processes hold a copy of the encryption service
+                previous = self.encryption_executor
+                self.encryption_executor = EncryptionExecutor(
+                    self.encryption_service,
+                    kind=self.encryption_executor_kind,
+                    max_workers=self.encryption_workers,
+                )
+                previous.shutdown(wait=False)
+
+    def _send(self, event: Union[Event, TrustedEvent]) -> Optional[dict]:
+        if self._handoff is not None:
+            self._forward([event])
+            return None
 
-        stringified_event = event.model_dump_json()
-        encrypted_event = self.encryption_service.encrypt(stringified_event)
+        self._prepare()
+        with self.metrics.time("serialize_seconds"):
+            payload = event.to_json()
+        return self._send_payload(payload)
 
+    def _send_payload(self, payload: bytes) -> Optional[dict]:
+        with self.metrics.time("encrypt_seconds"):
+            encrypted = self.encryption_executor.encrypt(payload)
+        return self._deliver(encrypted)
+
+    def _deliver(self, encrypted: dict) -> Optional[dict]:
+        encrypted_event = EncryptedEvent(**encrypted)
+
+        if self.spool is not None:
+            self.spool.append(encrypted_event)
+            self.drainer.notify()
+            return None
+
+        return self._post(encrypted_event)
+
+    def _post(self, encrypted_event: EncryptedEvent) -> Optional[dict]:
+        if self.export is not None:
+            return self.export.post(encrypted_event)
         return self.http_client.post(encrypted_event)
+
+    def _batch_payloads(self, events: List[Event]) -> Iterable[bytes]:
+        with self.metrics.time("serialize_seconds"):
+            payloads = [event.to_json() for event in events]
+        chunks = chunk_payloads(payloads, self.batch_max_events, self.batch_max_bytes)
+        return (serialize_batch(chunk) for chunk in chunks)
+
+    def _forward(self, events: List[Union[Event, TrustedEvent]]) -> None:
+        """Hands serialized events to the delivery agent or the plaintext export."""
+        if self._handoff is self.agent:
+            # Sessions are assigned by the agent, which sees the events of all workers
+            for event in events:
+                if event.session_id == PROCESS_SESSION_ID:
+                    event.session_id = UNASSIGNED_SESSION_ID
+        with self.metrics.time("serialize_seconds"):
+            payloads = [event.to_json() for event in events]
+        self._handoff.send(payloads)
+
+    def _send_batch(self, events: List[Event]) -> None:
+        if self._handoff is not None:
+            try:
+                self._forward(events)
+            except OSError as e:
+                self.metrics.increment("send_errors")
+                logger.error("Failed to hand off a batch of events: %s", e)
+            return
+
+        self._prepare()
+        encrypted_events = self.encryption_executor.map(self._batch_payloads(events))
+        try:
+            for encrypted in encrypted_events:
+                if self.scheduler is not None:
+                    self.scheduler.submit(self._deliver_batch, encrypted)
+                else:
+                    self._deliver_batch(encrypted)
+        except Exception as e:
+            self.metrics.increment("encrypt_errors")
+            logger.error("Failed to encrypt a batch of events: %s", e)
+
+    def _deliver_batch(self, encrypted: dict) -> None:
+        try:
+            self._deliver(encrypted)
+        except Exception as e:
+            self.metrics.increment("send_errors")
+            logger.error("Failed to send a batch of events: %s", e)
@@ -0,0 +1,124 @@
+from enum import Enum
+from typing import Iterable, List
+import logging
+import threading
+import zlib
+
+from telemetree.constants import ZLIB_COMPRESS_LEVEL, ZSTD_COMPRESS_LEVEL
+
+# zstandard is an optional dependency, imported on first use
+
+logger = logging.getLogger("telemetree.compression")
+
+
+class Compression(Enum):
+    NONE = "none"
+    ZLIB = "zlib"
+    ZSTD = "zstd"
+
+
+# Shared with the pipeline, which decompresses with the same dictionary. It holds
+# the keys and common values of serialized events, ending with the start of the
+# next event of a batch, and must never change: a new dictionary needs new
+# compression names.
+EVENT_DICTIONARY = (
+    b'"is_premium":true,"username":null,"firstname":null,"lastname":null,'
+    b'"language":"ru","referrer_type":"backend","referrer":0,'
+    b'"event_source":"python_SDK","datetime":"2024-01-01T00:00:00.000000",'
+    b'"session_id":1700000000000,"application_id":null}'
+    b'"/start","/help","message","callback_query","inline_query",'
+    b'"is_premium":false,"username":"","firstname":"","lastname":"",'
+    b'"language":"en","referrer_type":"backend","referrer":0,'
+    b'"event_source":"python_SDK","datetime":"2024-01-01T00:00:00.000000",'
+    b'"session_id":1700000000000,'
+    b'"application_id":"00000000-0000-0000-0000-000000000000"},'
+    b'{"event_type":"message","telegram_id":'
+)
+
+_zstd_local = threading.local()
+
+
+def _zstd():
+    """Returns this thread's zstd compressor and decompressor, creating them once."""
+    codecs = getattr(_zstd_local, "codecs", None)
+    if codecs is None:
+        import zstandard
+
+        dictionary = zstandard.ZstdCompressionDict(
+            EVENT_DICTIONARY, dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+        codecs = (
+            zstandard.ZstdCompressor(level=ZSTD_COMPRESS_LEVEL, dict_data=dictionary),
+            zstandard.ZstdDecompressor(dict_data=dictionary),
+        )
+        _zstd_local.codecs = codecs
+    return codecs
+
+
+def available_compressions() -> List[Compression]:
+    """
+    Returns the compressions this installation supports, best first.
+
+    zstd needs the optional zstandard package.
+    """
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return [Compression.ZLIB]
+    return [Compression.ZSTD, Compression.ZLIB]
+
+
+def negotiate(accepted: Iterable[str]) -> Compression:
+    """
+    Picks the first compression the pipeline accepts that is available here.
+
+    Args:
+        accepted (Iterable[str]): The compression names the pipeline accepts,
+            in order of preference.
+
+    Returns:
+        Compression: The compression to use, NONE if there is no common one.
+    """
+    available = {compression.value for compression in available_compressions()}
+    for name in accepted:
+        if name in available:
+            return Compression(name)
+    return Compression.NONE
+
+
+def compress(data: bytes, compression: Compression) -> bytes:
+    """
+    Compresses data with the shared event dictionary.
+
+    Args:
+        data (bytes): The data to compress.
+        compression (Compression): The compression to use.
+
+    Returns:
+        bytes: The compressed data, or the data itself for NONE.
+    """
+    if compression is Compression.ZLIB:
+        compressor = zlib.compressobj(ZLIB_COMPRESS_LEVEL, zdict=EVENT_DICTIONARY)
+        return compressor.compress(data) + compressor.flush()
+    if compression is Compression.ZSTD:
+        return _zstd()[0].compress(data)
+    return data
+
+
+def decompress(data: bytes, compression: Compression) -> bytes:
+    """
+    Decompresses data compressed by `compress`.
+
+    Args:
+        data (bytes): The compressed data.
+        compression (Compression): The compression that was used.
+
+    Returns:
+        bytes: The original data.
+    """
+    if compression is Compression.ZLIB:
+        decompressor = zlib.decompressobj(zdict=EVENT_DICTIONARY)
+        return decompressor.decompress(data) + decompressor.flush()
+    if compression is Compression.ZSTD:
+        return _zstd()[1].decompress(data)
+    return data
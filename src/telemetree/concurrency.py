@@ -0,0 +1,203 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+import logging
+import threading
+import time
+
+from telemetree.constants import (
+    CONCURRENCY_BACKOFF,
+    CONCURRENCY_INITIAL_LIMIT,
+    CONCURRENCY_LATENCY_BACKOFF,
+    CONCURRENCY_LATENCY_TOLERANCE,
+    CONCURRENCY_MAX_LIMIT,
+    CONCURRENCY_MIN_LIMIT,
+)
+
+logger = logging.getLogger("telemetree.concurrency")
+
+
+class AdaptiveLimiter:
+    """
+    Bounds the number of requests in flight, adapting the bound to what the
+    ingestion host accepts (AIMD).
+
+    Each request that succeeds at the usual latency raises the limit by one
+    request per limit's worth of requests, about one per round trip. A 429 or
+    5xx response, a timeout or a connection failure cuts the limit by
+    `backoff`; a latency above `latency_tolerance` times the lowest recently
+    seen one means requests queue at the host, and cuts it by
+    `latency_backoff`. Requests started before the last cut do not cut it
+    again, so a burst of failures counts once.
+
+    Args:
+        initial_limit (int): The limit to start from.
+        min_limit (int): The lowest limit.
+        max_limit (int): The highest limit.
+        backoff (float): The factor the limit is multiplied by on overload.
+        latency_backoff (float): The factor the limit is multiplied by when
+            the latency rises.
+        latency_tolerance (float): The latency, as a multiple of the lowest
+            recent latency, above which the host is considered congested.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = CONCURRENCY_INITIAL_LIMIT,
+        min_limit: int = CONCURRENCY_MIN_LIMIT,
+        max_limit: int = CONCURRENCY_MAX_LIMIT,
+        backoff: float = CONCURRENCY_BACKOFF,
+        latency_backoff: float = CONCURRENCY_LATENCY_BACKOFF,
+        latency_tolerance: float = CONCURRENCY_LATENCY_TOLERANCE,
+    ) -> None:
+        if min_limit <= 0:
+            raise ValueError("min_limit must be positive")
+        if not min_limit <= initial_limit <= max_limit:
+            raise ValueError("initial_limit must be between min_limit and max_limit")
+        if not 0 < backoff < 1 or not 0 < latency_backoff < 1:
+            raise ValueError("Backoff factors must be between 0 and 1")
+        if latency_tolerance <= 1:
+            raise ValueError("latency_tolerance must be greater than 1")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._min_latency: Optional[float] = None
+        self._decreased_at = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The current number of requests allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Waits until a request may be sent.
+
+        Args:
+            timeout (Optional[float]): The maximum time to wait in seconds.
+
+        Returns:
+            Optional[float]: The start time to pass to `release`, or None if the
+                timeout expired.
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._in_flight < int(self._limit), timeout
+            ):
+                return None
+            self._in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, overloaded: bool = False) -> None:
+        """
+        Ends a request and adapts the limit to its outcome.
+
+        Args:
+            started (float): The time returned by `acquire`.
+            overloaded (bool): Whether the host rejected or failed the request
+                because it is overloaded or down.
+        """
+        latency = time.monotonic() - started
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                self._decrease(started, self.backoff)
+            elif self._observe(latency):
+                self._decrease(started, self.latency_backoff)
+            elif self._limit < self.max_limit:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+    def _observe(self, latency: float) -> bool:
+        """Tracks the lowest recent latency. Returns True if the latency is too high."""
+        if self._min_latency is None or latency < self._min_latency:
+            self._min_latency = latency
+            return False
+        congested = latency > self._min_latency * self.latency_tolerance
+        # Let the baseline drift up slowly, so a host that became slower for
+        # good is not penalized forever
+        self._min_latency += (latency - self._min_latency) * 0.01
+        return congested
+
+    def _decrease(self, started: float, factor: float) -> None:
+        if started < self._decreased_at:
+            return
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * factor)
+        self._decreased_at = time.monotonic()
+        if self.limit != previous:
+            logger.info(
+                "Lowered the concurrency limit from %s to %s", previous, self.limit
+            )
+
+
+class DeliveryScheduler:
+    """
+    Runs deliveries on worker threads, so several requests can be in flight
+    while the caller moves on.
+
+    At most the limiter's current limit of deliveries are queued or running at
+    once; `submit` blocks beyond that, pushing back on the caller.
+
+    Args:
+        limiter (AdaptiveLimiter): Bounds the number of pending deliveries.
+        max_workers (Optional[int]): The number of threads. Defaults to the
+            limiter's `max_limit`.
+    """
+
+    def __init__(
+        self, limiter: AdaptiveLimiter, max_workers: Optional[int] = None
+    ) -> None:
+        self.limiter = limiter
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or limiter.max_limit,
+            thread_name_prefix="telemetree-delivery",
+        )
+        self._pending = 0
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def submit(self, deliver: Callable[..., Any], *args: Any) -> Future:
+        """Schedules a delivery, waiting while too many are pending."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending < self.limiter.limit)
+            self._pending += 1
+        try:
+            future = self._pool.submit(deliver, *args)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for the pending deliveries.
+
+        Returns:
+            bool: True if none are pending.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Waits for the pending deliveries and stops the threads."""
+        self.wait(timeout)
+        self._pool.shutdown(wait=False)
+
+    def _done(self, future: Optional[Future]) -> None:
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
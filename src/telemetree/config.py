@@ -1,23 +1,322 @@
+import asyncio
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
 
+from pydantic import ValidationError
+
+from telemetree.constants import (
+    CONFIG_CACHE_RETRY_INTERVAL,
+    CONFIG_CACHE_STALE_TTL,
+    CONFIG_CACHE_TTL,
+)
 from telemetree.schemas import TelemetreeConfig
-from telemetree.http_client import HttpClient
+from telemetree.http_client import AsyncHttpClient, HttpClient
 
 logger = logging.getLogger("telemetree.config")
 
+# A cached configuration and the wall clock time it was fetched at
+CacheEntry = Tuple[TelemetreeConfig, float]
+
+
+def cache_key(project_id: str, url: Optional[str] = None) -> str:
+    """
+    Returns the cache key of a project's configuration from an endpoint.
+
+    Args:
+        project_id (str): The project ID.
+        url (Optional[str]): The configuration endpoint. Defaults to Config.CONFIG_URL.
+
+    Returns:
+        str: The project ID for the default endpoint, else the project ID
+            followed by a hash of the endpoint.
+    """
+    if url is None or url == Config.CONFIG_URL:
+        return project_id
+    return f"{project_id}-{hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]}"
+
+
+class ConfigCache:
+    """
+    Caches remote configurations per project and endpoint, in memory and
+    optionally on disk.
+
+    A cached configuration is served as is for `ttl` seconds. For the following
+    `stale_ttl` seconds it is still served, while a background thread fetches a
+    new one. Past that it is fetched synchronously, falling back to the stale
+    copy if the configuration service is unreachable. After a failed fetch the
+    service is not asked again for `retry_interval` seconds, so an outage does
+    not make every `track` wait for a timeout.
+
+    With a `directory`, configurations are also written to JSON files there, so
+    worker processes and restarts on the same host share one fetch.
+
+    Args:
+        ttl (float): How long a configuration is fresh, in seconds.
+        stale_ttl (float): How long a configuration is served after it expires, in seconds.
+        directory (Optional[str]): A directory to share cached configurations through.
+        retry_interval (float): The wait after a failed fetch, in seconds.
+    """
+
+    def __init__(
+        self,
+        ttl: float = CONFIG_CACHE_TTL,
+        stale_ttl: float = CONFIG_CACHE_STALE_TTL,
+        directory: Optional[str] = None,
+        retry_interval: float = CONFIG_CACHE_RETRY_INTERVAL,
+    ) -> None:
+        if ttl < 0 or stale_ttl < 0:
+            raise ValueError("Cache TTLs must not be negative")
+        if retry_interval < 0:
+            raise ValueError("retry_interval must not be negative")
+
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.directory = directory
+        self.retry_interval = retry_interval
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self._entries: Dict[str, CacheEntry] = {}
+        self._refreshing: Set[str] = set()
+        # Monotonic time of the last failed fetch per key
+        self._failures: Dict[str, float] = {}
+        self._tasks: Set["asyncio.Task"] = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, fetch: Callable[[], TelemetreeConfig]) -> TelemetreeConfig:
+        """
+        Returns a configuration, fetching it if needed.
+
+        Args:
+            key (str): The cache key, the project ID or see `cache_key`.
+            fetch (Callable[[], TelemetreeConfig]): Fetches the configuration.
+
+        Returns:
+            TelemetreeConfig: The configuration.
+        """
+        entry = self._lookup(key)
+        servable, refresh = self._plan(key, entry)
+        if servable:
+            if refresh:
+                self._refresh_in_background(key, fetch)
+            return entry[0]
+
+        try:
+            return self._store(key, fetch())
+        except Exception as e:
+            return self._fall_back(key, entry, e)
+
+    async def get_async(
+        self, key: str, fetch: Callable[[], Awaitable[TelemetreeConfig]]
+    ) -> TelemetreeConfig:
+        """
+        Returns a configuration like `get`, fetching it on the running event loop.
+
+        Args:
+            key (str): The cache key, the project ID or see `cache_key`.
+            fetch (Callable[[], Awaitable[TelemetreeConfig]]): Fetches the configuration.
+
+        Returns:
+            TelemetreeConfig: The configuration.
+        """
+        entry = self._lookup(key)
+        servable, refresh = self._plan(key, entry)
+        if servable:
+            if refresh:
+                self._refresh_as_task(key, fetch)
+            return entry[0]
+
+        try:
+            return self._store(key, await fetch())
+        except Exception as e:
+            return self._fall_back(key, entry, e)
+
+    def peek(self, key: str) -> Optional[TelemetreeConfig]:
+        """
+        Returns a cached configuration if it is fresh or stale, without fetching.
+
+        Args:
+            key (str): The cache key, the project ID or see `cache_key`.
+
+        Returns:
+            Optional[TelemetreeConfig]: The configuration, or None.
+        """
+        entry = self._lookup(key)
+        if entry is None or time.time() - entry[1] >= self.ttl + self.stale_ttl:
+            return None
+        return entry[0]
+
+    def put(self, key: str, config: TelemetreeConfig) -> None:
+        """
+        Stores a freshly fetched configuration.
+
+        Args:
+            key (str): The cache key, the project ID or see `cache_key`.
+            config (TelemetreeConfig): The configuration.
+        """
+        entry = (config, time.time())
+        with self._lock:
+            self._entries[key] = entry
+            self._failures.pop(key, None)
+        self._write(key, entry)
+
+    def invalidate(self, key: str) -> None:
+        """Drops a cached configuration, from memory and disk."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.directory is not None:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry[1] >= self.ttl:
+            # Another process may have refreshed the shared copy already
+            stored = self._read(key)
+            if stored is not None and (entry is None or stored[1] > entry[1]):
+                with self._lock:
+                    self._entries[key] = stored
+                entry = stored
+        return entry
+
+    def _plan(self, key: str, entry: Optional[CacheEntry]) -> Tuple[bool, bool]:
+        """Returns whether the entry is served without fetching, and whether it is
+        refreshed in the background."""
+        if entry is None:
+            return False, False
+        age = time.time() - entry[1]
+        if age < self.ttl:
+            return True, False
+        failed = self._failures.get(key)
+        backing_off = (
+            failed is not None and time.monotonic() - failed < self.retry_interval
+        )
+        if age < self.ttl + self.stale_ttl:
+            return True, not backing_off
+        return backing_off, False
+
+    def _store(self, key: str, config: TelemetreeConfig) -> TelemetreeConfig:
+        self.put(key, config)
+        return config
+
+    def _record_failure(self, key: str) -> None:
+        with self._lock:
+            self._failures[key] = time.monotonic()
+
+    def _fall_back(
+        self, key: str, entry: Optional[CacheEntry], error: Exception
+    ) -> TelemetreeConfig:
+        self._record_failure(key)
+        if entry is None:
+            raise error
+        logger.warning("Failed to fetch the config, using a cached copy: %s", error)
+        return entry[0]
+
+    def _refresh_in_background(
+        self, key: str, fetch: Callable[[], TelemetreeConfig]
+    ) -> None:
+        if not self._start_refresh(key):
+            return
+
+        def refresh() -> None:
+            try:
+                self._store(key, fetch())
+            except Exception as e:
+                self._record_failure(key)
+                logger.warning("Failed to refresh the config: %s", e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(
+            target=refresh, name="telemetree-config-refresh", daemon=True
+        ).start()
+
+    def _refresh_as_task(
+        self, key: str, fetch: Callable[[], Awaitable[TelemetreeConfig]]
+    ) -> None:
+        if not self._start_refresh(key):
+            return
+
+        async def refresh() -> None:
+            try:
+                self._store(key, await fetch())
+            except Exception as e:
+                self._record_failure(key)
+                logger.warning("Failed to refresh the config: %s", e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        # The loop only keeps weak references to its tasks
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _start_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"telemetree-config-{key}.json")
+
+    def _read(self, key: str) -> Optional[CacheEntry]:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as file:
+                stored = json.load(file)
+            return TelemetreeConfig(**stored["config"]), float(stored["fetched_at"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError, ValidationError) as e:
+            logger.warning("Ignoring corrupt cached config: %s", e)
+            return None
+
+    def _write(self, key: str, entry: CacheEntry) -> None:
+        if self.directory is None:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(
+                    {"config": entry[0].model_dump(), "fetched_at": entry[1]}, file
+                )
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to write the config cache: %s", e)
+
+
+# Shared by all clients of the process unless they are given their own cache
+default_config_cache = ConfigCache()
+
 
 class Config:
     """
     Represents the configuration for Telemetree.
 
     Args:
-        project_id (str): The project ID.
-        api_key (str): The API key.
+        http_client (HttpClient): The client used to fetch the configuration.
+        config (Optional[TelemetreeConfig]): A configuration to start from instead
+            of fetching one.
+        cache (Optional[ConfigCache]): A cache to serve and refresh the
+            configuration through. The configuration is fetched once and never
+            refreshed without one.
+        url (Optional[str]): The configuration endpoint. Defaults to CONFIG_URL.
 
     Attributes:
-        project_id (str): The project ID.
-        api_key (str): The API key.
-        encryption_keys (dict): The encryption keys obtained from the Telemetree configuration service.
+        config (TelemetreeConfig): The current configuration, refreshed through the cache.
 
     """
 
@@ -26,9 +325,76 @@ class Config:
     def __init__(
         self,
         http_client: HttpClient,
+        config: Optional[TelemetreeConfig] = None,
+        cache: Optional[ConfigCache] = None,
+        url: Optional[str] = None,
     ) -> None:
         self.http_client = http_client
-        self.config = self.__get_config()
+        self.url = url or self.CONFIG_URL
+        self.cache = cache
+        self.key = cache_key(http_client.project_id, self.url)
+        # Set by create_async: the configuration is then refreshed by config_async
+        self._asynchronous = False
+        if config is not None:
+            self._config = config
+        elif cache is not None:
+            self._config = cache.get(self.key, self.__get_config)
+        else:
+            self._config = self.__get_config()
+
+    @property
+    def config(self) -> TelemetreeConfig:
+        if self.cache is not None and not self._asynchronous:
+            self._config = self.cache.get(self.key, self.__get_config)
+        return self._config
+
+    async def config_async(self) -> TelemetreeConfig:
+        """
+        Returns the current configuration of a config made by `create_async`,
+        refreshed through the cache without blocking the event loop.
+        """
+        if self.cache is not None:
+            self._config = await self.cache.get_async(
+                self.key, lambda: self._fetch_async(self.http_client, self.url)
+            )
+        return self._config
+
+    @classmethod
+    async def create_async(
+        cls,
+        http_client: AsyncHttpClient,
+        cache: Optional[ConfigCache] = None,
+        url: Optional[str] = None,
+    ) -> "Config":
+        """
+        Fetches the configuration without blocking the event loop.
+
+        Args:
+            http_client (AsyncHttpClient): The client used to fetch the configuration.
+            cache (Optional[ConfigCache]): A cache to serve and refresh the
+                configuration through.
+            url (Optional[str]): The configuration endpoint. Defaults to CONFIG_URL.
+
+        Returns:
+            Config: The Telemetree configuration, refreshed by `config_async`.
+        """
+        url = url or cls.CONFIG_URL
+        if cache is not None:
+            config = await cache.get_async(
+                cache_key(http_client.project_id, url),
+                lambda: cls._fetch_async(http_client, url),
+            )
+        else:
+            config = await cls._fetch_async(http_client, url)
+
+        instance = cls(http_client, config, cache=cache, url=url)
+        instance._asynchronous = True
+        return instance
+
+    @staticmethod
+    async def _fetch_async(http_client: AsyncHttpClient, url: str) -> TelemetreeConfig:
+        response = await http_client.get(url)
+        return TelemetreeConfig(**response)
 
     def __get_config(self) -> TelemetreeConfig:
         """
@@ -37,7 +403,7 @@ class Config:
         Returns:
             TelemetreeConfig: The Telemetree configuration.
         """
-        response = self.http_client.get(self.CONFIG_URL)
+        response = self.http_client.get(self.url)
 
         return TelemetreeConfig(**response)
 
@@ -1,3 +1,122 @@
-HTTP_TIMEOUT = 10.0
+HTTP_CONNECT_TIMEOUT = 3.05
+HTTP_READ_TIMEOUT = 10.0
+
+# Connection pool defaults: the number of hosts to keep pools for and the
+# number of keep-alive connections kept per host
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 10
 
 JSON_HEADER = {"Content-Type": "application/json; charset=UTF-8", "Accept": "*/*"}
+
+# Background dispatcher defaults
+DISPATCHER_QUEUE_SIZE = 10_000
+DISPATCHER_FLUSH_SIZE = 100
+DISPATCHER_FLUSH_INTERVAL = 5.0
+DISPATCHER_CLOSE_TIMEOUT = 10.0
+
+# Asynchronous client defaults
+ASYNC_MAX_CONCURRENCY = 10
+
+# Batch ingestion limits: events are split into requests of at most this many
+# events and this many bytes of serialized JSON before encryption
+BATCH_MAX_EVENTS = 500
+BATCH_MAX_BYTES = 512 * 1024
+
+# On-disk spool defaults
+SPOOL_SEGMENT_BYTES = 8 * 1024 * 1024
+SPOOL_MAX_BYTES = 256 * 1024 * 1024
+SPOOL_MAX_AGE = 7 * 24 * 60 * 60.0
+SPOOL_FSYNC_EVERY = 100
+SPOOL_FSYNC_INTERVAL = 1.0
+SPOOL_DRAIN_BATCH = 100
+SPOOL_RETRY_INTERVAL = 5.0
+
+# Retry and circuit breaker defaults
+RETRY_MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 30.0
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30.0
+
+# Encryption executor defaults: the number of encryptions queued per worker
+# before callers are made to wait
+ENCRYPTION_PENDING_PER_WORKER = 4
+
+# Remote configuration cache defaults: a cached config is fresh for the TTL and
+# is then served for up to the stale TTL while it is refreshed in the background
+CONFIG_CACHE_TTL = 300.0
+CONFIG_CACHE_STALE_TTL = 24 * 60 * 60.0
+# The wait after a failed fetch before the configuration service is asked again
+CONFIG_CACHE_RETRY_INTERVAL = 30.0
+
+# Telegram auto-capture defaults, used when the remote configuration leaves them out
+AUTO_CAPTURE_TELEGRAM_EVENTS = ("message",)
+AUTO_CAPTURE_COMMANDS = ("/start", "/help")
+
+# Compression defaults: payloads smaller than the minimum are sent uncompressed
+COMPRESSION_MIN_BYTES = 128
+ZLIB_COMPRESS_LEVEL = 6
+ZSTD_COMPRESS_LEVEL = 3
+GZIP_COMPRESS_LEVEL = 6
+
+# Counter aggregation defaults: the window length in seconds and the number of
+# distinct events held before the window is sent early
+AGGREGATION_WINDOW = 60.0
+AGGREGATION_MAX_KEYS = 10_000
+
+# Metrics defaults: the name prefix and the latency histogram buckets in seconds
+METRICS_PREFIX = "telemetree_"
+METRICS_LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Deduplication defaults: the number of event IDs remembered, for how long in
+# seconds, and the false positive rate of the Bloom filter variant
+DEDUP_MAX_SIZE = 100_000
+DEDUP_WINDOW = 600.0
+DEDUP_BLOOM_ERROR_RATE = 0.001
+
+# Delivery agent defaults: the socket timeout of workers in seconds and the
+# largest frame the agent accepts
+AGENT_SOCKET_TIMEOUT = 5.0
+AGENT_FRAME_MAX_BYTES = 1024 * 1024
+
+# Adaptive concurrency defaults: the limits on requests in flight, the factors
+# the limit is cut by on overload and on rising latency, and the latency, as a
+# multiple of the lowest recent one, that counts as rising
+CONCURRENCY_INITIAL_LIMIT = 4
+CONCURRENCY_MIN_LIMIT = 1
+CONCURRENCY_MAX_LIMIT = 64
+CONCURRENCY_BACKOFF = 0.5
+CONCURRENCY_LATENCY_BACKOFF = 0.9
+CONCURRENCY_LATENCY_TOLERANCE = 2.0
+
+# Session defaults: the inactivity in seconds that ends a session, the number
+# of users tracked at once, the initial size of the session table and the
+# number of users sampled when one must be forgotten
+SESSION_TIMEOUT = 30 * 60.0
+SESSION_MAX_USERS = 1_000_000
+SESSION_TABLE_MIN_SLOTS = 1024
+SESSION_EVICTION_SAMPLE = 16
+
+# Offline export defaults: the uncompressed size and the age in seconds at
+# which an export file is completed, and the number of requests between
+# upload checkpoints
+EXPORT_FILE_BYTES = 64 * 1024 * 1024
+EXPORT_FILE_AGE = 60 * 60.0
+EXPORT_UPLOAD_WINDOW = 64
@@ -0,0 +1,256 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from hashlib import blake2b
+from typing import Iterable, Iterator, Optional, Set, Union
+import logging
+import math
+import threading
+import time
+import uuid
+
+from telemetree.constants import DEDUP_BLOOM_ERROR_RATE, DEDUP_MAX_SIZE, DEDUP_WINDOW
+from telemetree.schemas import Event, TrustedEvent
+
+logger = logging.getLogger("telemetree.dedup")
+
+
+class SeenSet:
+    """
+    Remembers keys for a time window, keeping at most `max_size` of them.
+
+    Keys are forgotten `window` seconds after they were first added, or earlier,
+    oldest first, when the set is full.
+
+    Args:
+        max_size (int): The maximum number of keys held.
+        window (float): How long a key is remembered in seconds.
+    """
+
+    def __init__(self, max_size: int = DEDUP_MAX_SIZE, window: float = DEDUP_WINDOW):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        if window <= 0:
+            raise ValueError("window must be positive")
+
+        self.max_size = max_size
+        self.window = window
+        self._expiries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+    def __contains__(self, key: str) -> bool:
+        expiry = self._expiries.get(key)
+        return expiry is not None and expiry > time.monotonic()
+
+    def add(self, key: str) -> bool:
+        """Adds a key. Returns False if it was already there."""
+        now = time.monotonic()
+        expiries = self._expiries
+        with self._lock:
+            # Keys are in the order they were added, so expired ones come first
+            while expiries:
+                oldest, expiry = next(iter(expiries.items()))
+                if expiry > now:
+                    break
+                del expiries[oldest]
+            if key in expiries:
+                return False
+            expiries[key] = now + self.window
+            if len(expiries) > self.max_size:
+                expiries.popitem(last=False)
+            return True
+
+
+class BloomFilter:
+    """
+    A set of keys in a fixed bit array, which may report keys it never saw.
+
+    Args:
+        capacity (int): The number of keys the filter is sized for.
+        error_rate (float): The false positive rate at capacity.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = DEDUP_BLOOM_ERROR_RATE):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """Adds a key. Returns False if it was, or seemed to be, already there."""
+        bits = self._bits
+        new = False
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not bits[p >> 3] & mask:
+                bits[p >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+
+class BloomSeenSet:
+    """
+    A `SeenSet` in constant memory for large windows, made of two Bloom filters.
+
+    Keys are added to the current filter and looked up in both. The current
+    filter becomes the previous one when it is `window` seconds old or holds
+    `max_size` keys, so keys are remembered for at least one window and at most
+    two. A small fraction of new keys, `error_rate`, is reported as seen.
+
+    Args:
+        max_size (int): The number of keys per window the filters are sized for.
+        window (float): How long a key is remembered at least, in seconds.
+        error_rate (float): The false positive rate of each filter.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEDUP_MAX_SIZE,
+        window: float = DEDUP_WINDOW,
+        error_rate: float = DEDUP_BLOOM_ERROR_RATE,
+    ):
+        if window <= 0:
+            raise ValueError("window must be positive")
+
+        self.max_size = max_size
+        self.window = window
+        self.error_rate = error_rate
+        self._current = BloomFilter(max_size, error_rate)
+        self._previous: Optional[BloomFilter] = None
+        self._rotated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        previous = self._previous.count if self._previous is not None else 0
+        return self._current.count + previous
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._rotate()
+            return key in self._current or (
+                self._previous is not None and key in self._previous
+            )
+
+    def add(self, key: str) -> bool:
+        """Adds a key. Returns False if it was, or seemed to be, already there."""
+        with self._lock:
+            self._rotate()
+            if self._previous is not None and key in self._previous:
+                return False
+            return self._current.add(key)
+
+    def _rotate(self) -> None:
+        now = time.monotonic()
+        if now - self._rotated >= self.window or self._current.count >= self.max_size:
+            self._previous = self._current
+            self._current = BloomFilter(self.max_size, self.error_rate)
+            self._rotated = now
+
+
+class Deduplicator:
+    """
+    Drops events whose event ID was already seen, in front of `Telemetree.track`.
+
+    An event ID is remembered once the event was tracked: `is_duplicate` holds
+    it while the event is in flight, so a concurrent redelivery is dropped,
+    and the client then calls `record` if tracking succeeded or `release` if
+    it raised, see `tracking`, so the caller can retry a failed event with the same ID.
+
+    Events without an `event_id` are given a random one, which is sent with the
+    event so the pipeline can also discard a request delivered twice, but is
+    not remembered. Set the ID yourself, e.g. from a Telegram update ID, to
+    drop redelivered events.
+
+    Args:
+        max_size (int): The maximum number of event IDs remembered.
+        window (float): How long an event ID is remembered in seconds.
+        bloom (bool): Remember the IDs in Bloom filters, using constant memory
+            for large windows but dropping about `error_rate` of unique events.
+        error_rate (float): The false positive rate of the Bloom filters.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEDUP_MAX_SIZE,
+        window: float = DEDUP_WINDOW,
+        bloom: bool = False,
+        error_rate: float = DEDUP_BLOOM_ERROR_RATE,
+    ) -> None:
+        self.seen: Union[SeenSet, BloomSeenSet] = (
+            BloomSeenSet(max_size, window, error_rate)
+            if bloom
+            else SeenSet(max_size, window)
+        )
+        self.dropped = 0
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, event: Union[Event, TrustedEvent]) -> bool:
+        """
+        Gives the event an ID if it has none, and checks whether it was seen.
+
+        An event that is not a duplicate holds its ID until `record` or
+        `release` is called with it.
+
+        Args:
+            event (Union[Event, TrustedEvent]): The event.
+
+        Returns:
+            bool: True if the event should be dropped.
+        """
+        event_id = event.event_id
+        if event_id is None:
+            event.event_id = uuid.uuid4().hex
+            return False
+        with self._lock:
+            if event_id not in self._pending and event_id not in self.seen:
+                self._pending.add(event_id)
+                return False
+            self.dropped += 1
+        logger.debug("Dropped duplicate event %s", event_id)
+        return True
+
+    @contextmanager
+    def tracking(self, events: Iterable[Union[Event, TrustedEvent]]) -> Iterator[None]:
+        """Records the events if the block succeeds and releases them if it raises."""
+        try:
+            yield
+        except BaseException:
+            self.release(events)
+            raise
+        self.record(events)
+
+    def record(self, events: Iterable[Union[Event, TrustedEvent]]) -> None:
+        """Remembers the IDs of tracked events, so they are dropped from now on."""
+        with self._lock:
+            for event in events:
+                if event.event_id in self._pending:
+                    self._pending.remove(event.event_id)
+                    self.seen.add(event.event_id)
+
+    def release(self, events: Iterable[Union[Event, TrustedEvent]]) -> None:
+        """Forgets the IDs of events that failed to be tracked, so they can be retried."""
+        with self._lock:
+            self._pending.difference_update(event.event_id for event in events)
@@ -0,0 +1,211 @@
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, List, Optional
+import logging
+import threading
+import time
+
+from telemetree.constants import (
+    DISPATCHER_FLUSH_INTERVAL,
+    DISPATCHER_FLUSH_SIZE,
+    DISPATCHER_QUEUE_SIZE,
+)
+
+logger = logging.getLogger("telemetree.dispatcher")
+
+
+class OverflowPolicy(Enum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+
+
+class BatchDispatcher:
+    """
+    Buffers items in a bounded in-memory queue and hands them to a sender
+    callable from a background worker thread.
+
+    A batch is flushed when it reaches `flush_size` items, when the oldest
+    buffered item is older than `flush_interval` seconds, on an explicit
+    `flush()` and on `close()`.
+
+    Args:
+        send_batch (Callable[[List[Any]], None]): Called from the worker thread with each batch.
+        max_queue_size (int): The maximum number of buffered items.
+        flush_size (int): The number of items that triggers a flush.
+        flush_interval (float): The maximum age in seconds of a buffered item.
+        overflow_policy (OverflowPolicy): What to do when the queue is full.
+        block_timeout (Optional[float]): How long `submit` waits for room under
+            the `BLOCK` policy before dropping the item. None waits forever.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Any]], None],
+        max_queue_size: int = DISPATCHER_QUEUE_SIZE,
+        flush_size: int = DISPATCHER_FLUSH_SIZE,
+        flush_interval: float = DISPATCHER_FLUSH_INTERVAL,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        block_timeout: Optional[float] = None,
+    ) -> None:
+        if max_queue_size <= 0:
+            raise ValueError("max_queue_size must be positive")
+        if flush_size <= 0:
+            raise ValueError("flush_size must be positive")
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive")
+
+        self.send_batch = send_batch
+        self.max_queue_size = max_queue_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        self.block_timeout = block_timeout
+
+        self.dropped = 0
+
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._sending = False
+        self._flush_requested = False
+
+        self._worker = threading.Thread(
+            target=self._run, name="telemetree-dispatcher", daemon=True
+        )
+        self._worker.start()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def submit(self, item: Any) -> bool:
+        """
+        Adds an item to the queue without waiting for it to be sent.
+
+        Args:
+            item (Any): The item to enqueue.
+
+        Returns:
+            bool: True if the item was queued, False if it was dropped.
+
+        Raises:
+            RuntimeError: If the dispatcher is closed.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Dispatcher is closed")
+
+            if len(self._buffer) >= self.max_queue_size:
+                if self.overflow_policy is OverflowPolicy.DROP_NEWEST:
+                    self._drop()
+                    return False
+                if self.overflow_policy is OverflowPolicy.DROP_OLDEST:
+                    self._buffer.popleft()
+                    self._drop()
+                elif not self._cond.wait_for(
+                    lambda: self._closed or len(self._buffer) < self.max_queue_size,
+                    self.block_timeout,
+                ):
+                    self._drop()
+                    return False
+                elif self._closed:
+                    raise RuntimeError("Dispatcher is closed")
+
+            self._buffer.append((time.monotonic(), item))
+            # Wake the worker to start the age timer or to send a full batch
+            if len(self._buffer) == 1 or len(self._buffer) >= self.flush_size:
+                self._cond.notify_all()
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sends everything buffered so far and waits for the sends to finish.
+
+        Args:
+            timeout (Optional[float]): The maximum time to wait in seconds.
+
+        Returns:
+            bool: True if the queue was drained within the timeout.
+        """
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: not self._buffer and not self._sending, timeout
+            )
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops accepting items, sends what is left and stops the worker.
+
+        Args:
+            timeout (Optional[float]): The maximum time to wait for the worker in seconds.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            logger.warning(
+                "Dispatcher did not stop within %s seconds, %s events left unsent",
+                timeout,
+                len(self._buffer),
+            )
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning("Dispatcher queue is full, %s events dropped", self.dropped)
+
+    def _ready(self) -> bool:
+        if not self._buffer:
+            return False
+        if self._closed or self._flush_requested:
+            return True
+        if len(self._buffer) >= self.flush_size:
+            return True
+        return time.monotonic() - self._buffer[0][0] >= self.flush_interval
+
+    def _next_batch(self) -> Optional[List[Any]]:
+        """Blocks until a batch is due. Returns None once closed and drained."""
+        with self._cond:
+            while not self._ready():
+                if self._closed:
+                    return None
+                if self._flush_requested:
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                if self._buffer:
+                    oldest = self._buffer[0][0]
+                    remaining = oldest + self.flush_interval - time.monotonic()
+                    self._cond.wait(max(remaining, 0))
+                else:
+                    self._cond.wait()
+
+            size = min(len(self._buffer), self.flush_size)
+            batch = [self._buffer.popleft()[1] for _ in range(size)]
+            self._sending = True
+            self._cond.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self.send_batch(batch)
+            except Exception as e:
+                logger.exception(
+                    "Failed to send a batch of %s events: %s", len(batch), e
+                )
+            finally:
+                with self._cond:
+                    self._sending = False
+                    self._cond.notify_all()
@@ -1,41 +1,189 @@
 from base64 import b64encode
+from typing import TYPE_CHECKING, Optional, Tuple, Union
 import logging
+import threading
+import time
 
-from Crypto.Cipher import AES
-from Crypto.Random import get_random_bytes
-from Crypto.Util.Padding import pad
-from rsa import PublicKey, encrypt
+from telemetree.compression import Compression, compress
+from telemetree.constants import COMPRESSION_MIN_BYTES
+from telemetree.metrics import NULL_METRICS, Metrics, resolve_metrics
 
-from telemetree.schemas import EncryptedEvent
+if TYPE_CHECKING:
+    from rsa import PublicKey
+
+# pycryptodome and rsa are imported on first use to keep `import telemetree` cheap
 
 logger = logging.getLogger("telemetree.encryption")
 
 
+def load_public_key(public_key: Union[str, bytes]) -> "PublicKey":
+    """
+    Parses a PEM encoded RSA public key in PKCS#1 or X.509 SubjectPublicKeyInfo format.
+
+    Args:
+        public_key (Union[str, bytes]): The PEM encoded public key.
+
+    Returns:
+        PublicKey: The parsed public key.
+    """
+    from rsa import PublicKey
+
+    if isinstance(public_key, str):
+        public_key = public_key.encode("utf-8")
+    if b"-----BEGIN PUBLIC KEY-----" in public_key:
+        return PublicKey.load_pkcs1_openssl_pem(public_key)
+    return PublicKey.load_pkcs1(public_key)
+
+
 class EncryptionService:
-    def __init__(self, public_key):
+    """
+    Hybrid RSA and AES encryption of event payloads.
+
+    By default every message gets a fresh AES key and IV, both wrapped with RSA.
+    The RSA cost can be amortized by reusing the wrapped key and IV for several
+    messages, rotating them after `key_reuse_events` messages or
+    `key_reuse_seconds` seconds, whichever comes first. The wire format does not
+    change, but messages encrypted under the same key share an IV, so identical
+    plaintext prefixes produce identical ciphertext prefixes.
+
+    Messages of at least `compression_min_bytes` bytes are compressed before
+    encryption when a compression is set, and the result names the compression.
+
+    Args:
+        public_key (Union[str, bytes]): The PEM encoded RSA public key.
+        key_reuse_events (Optional[int]): The number of messages encrypted with one
+            AES key and IV. None removes the limit.
+        key_reuse_seconds (Optional[float]): The maximum age of an AES key and IV in
+            seconds. None removes the limit.
+        compression (Union[Compression, str]): The compression applied before
+            encryption.
+        compression_min_bytes (int): The size from which messages are compressed.
+        metrics (Optional[Metrics]): Records the time spent in RSA, compression,
+            AES and base64. Not recorded in process pool workers.
+
+    Raises:
+        ValueError: If the public key cannot be parsed or both reuse limits are None.
+    """
+
+    def __init__(
+        self,
+        public_key: Union[str, bytes],
+        key_reuse_events: Optional[int] = 1,
+        key_reuse_seconds: Optional[float] = None,
+        compression: Union[Compression, str] = Compression.NONE,
+        compression_min_bytes: int = COMPRESSION_MIN_BYTES,
+        metrics: Optional[Metrics] = None,
+    ):
+        if key_reuse_events is None and key_reuse_seconds is None:
+            raise ValueError("At least one of the key reuse limits must be set")
+        if key_reuse_events is not None and key_reuse_events < 1:
+            raise ValueError("key_reuse_events must be positive")
+        if key_reuse_seconds is not None and key_reuse_seconds <= 0:
+            raise ValueError("key_reuse_seconds must be positive")
+
+        self.key_reuse_events = key_reuse_events
+        self.key_reuse_seconds = key_reuse_seconds
+        self.compression = Compression(compression)
+        self.compression_min_bytes = compression_min_bytes
+        self.metrics = resolve_metrics(metrics)
+
+        self._session: Optional[Tuple[bytes, bytes, bytes, bytes]] = None
+        self._session_uses = 0
+        self._session_started = 0.0
+        self._session_lock = threading.Lock()
+
         self.rsa_public_key = public_key
+        try:
+            self.rsa_key
+        except Exception as e:
+            logger.error("Invalid RSA public key: %s", e)
+            raise ValueError(f"Invalid RSA public key: {e}") from e
+
+    def __getstate__(self) -> dict:
+        # Locks cannot be pickled and the session key is not shared between processes
+        state = self.__dict__.copy()
+        del state["_session_lock"]
+        state["_session"] = None
+        state["metrics"] = NULL_METRICS
+        return state
 
-    def rsa_encrypt(self, message: bytes) -> bytes:
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._session_lock = threading.Lock()
+
+    @property
+    def rsa_public_key(self) -> Union[str, bytes]:
+        return self._rsa_public_key
+
+    @rsa_public_key.setter
+    def rsa_public_key(self, public_key: Union[str, bytes]) -> None:
+        self._rsa_public_key = public_key
+        self._rsa_key: Optional["PublicKey"] = None
+        self._session = None
+
+    @property
+    def rsa_key(self) -> "PublicKey":
+        """The parsed RSA public key, loaded once and cached."""
+        if self._rsa_key is None:
+            self._rsa_key = load_public_key(self._rsa_public_key)
+        return self._rsa_key
+
+    def rsa_encrypt(self, message: Union[bytes, str]) -> bytes:
         """
         Encrypts a message using RSA encryption with the provided public key.
 
         Args:
-            message (bytes): The message to encrypt.
+            message (Union[bytes, str]): The message to encrypt.
 
         Returns:
             bytes: The encrypted message in base64 encoding.
         """
+        from rsa import encrypt
+
         try:
+            if isinstance(message, str):
+                message = message.encode("utf-8")
             # Convert bytes to hex string first, matching Go implementation
             hex_str = message.hex().encode("utf-8")
 
-            rsa_key = PublicKey.load_pkcs1(self.rsa_public_key)
-            encrypted_message = encrypt(hex_str, rsa_key)
+            encrypted_message = encrypt(hex_str, self.rsa_key)
             return b64encode(encrypted_message)
         except Exception as e:
             logger.exception("Failed to encrypt message with RSA: %s", e)
             raise ValueError(f"Failed to encrypt message with RSA: {e}") from e
 
+    def session_key(self) -> Tuple[bytes, bytes, bytes, bytes]:
+        """
+        Returns the AES key and IV for the next message, rotating them when a
+        reuse limit is reached.
+
+        Returns:
+            tuple: The AES key, IV, RSA encrypted key and RSA encrypted IV.
+        """
+        if self.key_reuse_events == 1:
+            key, iv = self.generate_aes_key_and_iv()
+            return key, iv, self.rsa_encrypt(key), self.rsa_encrypt(iv)
+
+        with self._session_lock:
+            now = time.monotonic()
+            if (
+                self._session is None
+                or (
+                    self.key_reuse_events is not None
+                    and self._session_uses >= self.key_reuse_events
+                )
+                or (
+                    self.key_reuse_seconds is not None
+                    and now - self._session_started >= self.key_reuse_seconds
+                )
+            ):
+                key, iv = self.generate_aes_key_and_iv()
+                self._session = (key, iv, self.rsa_encrypt(key), self.rsa_encrypt(iv))
+                self._session_uses = 0
+                self._session_started = now
+            self._session_uses += 1
+            return self._session
+
     def generate_aes_key_and_iv(self) -> tuple:
         """
         Generates a random AES key and initialization vector (IV).
@@ -43,63 +191,89 @@ class EncryptionService:
         Returns:
             tuple: A tuple containing the AES key and IV, both as bytes.
         """
+        from Crypto.Random import get_random_bytes
+
         key = get_random_bytes(16)  # AES 128-bit key
         iv = get_random_bytes(16)  # AES IV
         return key, iv
 
-    def encrypt_with_aes(self, key: bytes, iv: bytes, message: str) -> bytes:
+    def encrypt_with_aes(
+        self, key: bytes, iv: bytes, message: Union[str, bytes]
+    ) -> bytes:
         """
         Encrypts a message using AES encryption with the provided key and IV.
 
         Args:
             key (bytes): The AES key.
             iv (bytes): The AES initialization vector.
-            message (str): The message to encrypt.
+            message (Union[str, bytes]): The message to encrypt.
 
         Returns:
             bytes: The encrypted message in base64 encoding.
 
         Raises:
-            ValueError: If the provided message is not a string.
+            ValueError: If the provided message is not a string or bytes.
         """
-        if not isinstance(message, str):
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        elif not isinstance(message, bytes):
             logger.error("Message must be a string")
             raise ValueError("Message must be a string")
 
-        cipher_aes = AES.new(key, AES.MODE_CBC, iv)
-        encrypted = cipher_aes.encrypt(pad(message.encode("utf-8"), AES.block_size))
-        return b64encode(encrypted)
+        from Crypto.Cipher import AES
+
+        with self.metrics.time("aes_seconds"):
+            cipher_aes = AES.new(key, AES.MODE_CBC, iv)
+            # PKCS#7 padding, appended inline: encrypting into a preallocated
+            # buffer with output= is slower in pycryptodome than one copy
+            padding = AES.block_size - len(message) % AES.block_size
+            encrypted = cipher_aes.encrypt(message + bytes((padding,)) * padding)
+        with self.metrics.time("base64_seconds"):
+            return b64encode(encrypted)
 
-    def encrypt(self, message: str) -> dict:
+    def encrypt(self, message: Union[str, bytes]) -> dict:
         """
         Encrypts a message using a hybrid approach with RSA and AES encryption.
 
         Args:
-            message (str): The message to encrypt.
+            message (Union[str, bytes]): The message to encrypt, preferably the
+                UTF-8 encoded bytes, which are not copied.
 
         Returns:
-            dict: A dictionary containing the encrypted key, IV, and message body, all base64 encoded.
+            dict: A dictionary containing the encrypted key, IV, and message body, all base64 encoded,
+                and the name of the compression if the message was compressed.
 
         Raises:
-            ValueError: If the provided message is not a string, or if an encryption error occurs.
+            ValueError: If the provided message is not a string or bytes, or if an
+                encryption error occurs.
         """
-        if not isinstance(message, str):
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        elif not isinstance(message, bytes):
             logger.error("Message must be a string")
             raise ValueError("Message must be a string")
 
         try:
-            key, iv = self.generate_aes_key_and_iv()
-
-            encrypted_key = self.rsa_encrypt(key)
-            encrypted_iv = self.rsa_encrypt(iv)
+            with self.metrics.time("rsa_seconds"):
+                key, iv, encrypted_key, encrypted_iv = self.session_key()
 
-            encrypted_body = self.encrypt_with_aes(key, iv, message)
+            data = message
+            compressed = (
+                self.compression is not Compression.NONE
+                and len(data) >= self.compression_min_bytes
+            )
+            if compressed:
+                with self.metrics.time("compress_seconds"):
+                    data = compress(data, self.compression)
 
-            return {
+            encrypted = {
                 "key": encrypted_key,
                 "iv": encrypted_iv,
-                "body": encrypted_body,
+                "body": self.encrypt_with_aes(key, iv, data),
             }
+            if compressed:
+                encrypted["compression"] = self.compression.value
+            return encrypted
         except Exception as e:
             logger.exception("Failed to encrypt message: %s", e)
             raise ValueError(f"Failed to encrypt message: {e}") from e
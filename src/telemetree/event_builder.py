@@ -0,0 +1,208 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from telemetree.schemas import TelemetreeConfig, TrustedEvent
+
+
+class UpdateSpec(NamedTuple):
+    """
+    Describes where the tracked fields of a Telegram update type live.
+
+    Attributes:
+        user_key (str): The key of the user object in the update payload.
+        text_keys (Tuple[str, ...]): The keys of the message text, in order of
+            preference. Updates with text are filtered by command and message.
+    """
+
+    user_key: str = "from"
+    text_keys: Tuple[str, ...] = ()
+
+
+_MESSAGE = UpdateSpec(text_keys=("text", "caption"))
+
+# The Telegram update types that can be tracked, keyed by their field in Update
+UPDATE_SPECS: Dict[str, UpdateSpec] = {
+    "message": _MESSAGE,
+    "edited_message": _MESSAGE,
+    "channel_post": _MESSAGE,
+    "edited_channel_post": _MESSAGE,
+    "business_message": _MESSAGE,
+    "edited_business_message": _MESSAGE,
+    "callback_query": UpdateSpec(),
+    "inline_query": UpdateSpec(),
+    "chosen_inline_result": UpdateSpec(),
+    "shipping_query": UpdateSpec(),
+    "pre_checkout_query": UpdateSpec(),
+    "purchased_paid_media": UpdateSpec(),
+    "poll_answer": UpdateSpec(user_key="user"),
+    "message_reaction": UpdateSpec(user_key="user"),
+    "my_chat_member": UpdateSpec(),
+    "chat_member": UpdateSpec(),
+    "chat_join_request": UpdateSpec(),
+}
+
+# Event.language holds at most this many characters
+_LANGUAGE_MAX_LENGTH = 5
+
+
+def parse_command(text: str) -> Optional[str]:
+    """
+    Returns the bot command a message starts with, without the bot username.
+
+    Args:
+        text (str): The message text.
+
+    Returns:
+        Optional[str]: The command, e.g. "/start", or None for other messages.
+    """
+    if not text.startswith("/"):
+        return None
+    return text.split(maxsplit=1)[0].split("@", 1)[0]
+
+
+class EventBuilder:
+    """
+    Converts raw Telegram updates into events.
+
+    Only the fields an event needs are read from the update, which is left
+    untouched. Which updates are tracked is decided by the auto-capture settings
+    of the configuration: the update type must be listed in
+    `auto_capture_telegram_events`, and a message must either start with one of
+    `auto_capture_commands`, which becomes the event type, or match one of
+    `auto_capture_messages`. Updates sent by bots are never tracked.
+
+    Args:
+        settings (Optional[TelemetreeConfig]): The configuration holding the
+            auto-capture settings. Defaults to capturing `/start` and `/help`.
+        application_id (Optional[str]): The application ID added to the events.
+
+    Raises:
+        ValueError: If a listed update type is not supported.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[TelemetreeConfig] = None,
+        application_id: Optional[str] = None,
+    ) -> None:
+        if settings is None:
+            # Only the auto-capture defaults are needed, not a key or host
+            settings = TelemetreeConfig.model_construct()
+        self.settings = settings
+        self.application_id = application_id
+
+        unknown = set(settings.auto_capture_telegram_events) - set(UPDATE_SPECS)
+        if unknown:
+            raise ValueError(
+                f"Unsupported Telegram update types: {', '.join(sorted(unknown))}"
+            )
+
+        self._specs: Dict[str, UpdateSpec] = {}
+        if settings.auto_capture_telegram:
+            self._specs = {
+                update_type: UPDATE_SPECS[update_type]
+                for update_type in settings.auto_capture_telegram_events
+            }
+        self._commands = (
+            None
+            if settings.auto_capture_commands is None
+            else frozenset(settings.auto_capture_commands)
+        )
+        self._messages = (
+            None
+            if settings.auto_capture_messages is None
+            else frozenset(settings.auto_capture_messages)
+        )
+
+    def parse_telegram_update(self, update: dict) -> Optional[TrustedEvent]:
+        """
+        Converts a Telegram update into an event.
+
+        Args:
+            update (dict): The update, as received by a webhook or from getUpdates.
+
+        Returns:
+            Optional[TrustedEvent]: The event, or None if the update is not tracked.
+        """
+        for update_type, payload in update.items():
+            spec = self._specs.get(update_type)
+            if spec is not None:
+                return self._build(update_type, spec, payload, update.get("update_id"))
+        return None
+
+    def parse_telegram_updates(self, updates: Iterable[dict]) -> List[TrustedEvent]:
+        """
+        Converts a batch of Telegram updates into events, skipping untracked ones.
+
+        Args:
+            updates (Iterable[dict]): The updates, e.g. the result of getUpdates.
+
+        Returns:
+            List[TrustedEvent]: The events of the tracked updates, in order.
+        """
+        specs = self._specs
+        build = self._build
+        events = []
+        append = events.append
+        for update in updates:
+            for update_type, payload in update.items():
+                spec = specs.get(update_type)
+                if spec is not None:
+                    event = build(update_type, spec, payload, update.get("update_id"))
+                    if event is not None:
+                        append(event)
+                    break
+        return events
+
+    def _build(
+        self,
+        update_type: str,
+        spec: UpdateSpec,
+        payload: dict,
+        update_id: Optional[int] = None,
+    ) -> Optional[TrustedEvent]:
+        user = payload.get(spec.user_key)
+        if not user or user.get("is_bot"):
+            return None
+
+        event_type = update_type
+        if spec.text_keys:
+            event_type = self._match_text(update_type, spec, payload)
+            if event_type is None:
+                return None
+
+        language = user.get("language_code")
+        if language is not None and len(language) > _LANGUAGE_MAX_LENGTH:
+            language = language.split("-", 1)[0][:_LANGUAGE_MAX_LENGTH]
+
+        return TrustedEvent(
+            event_type,
+            user["id"],
+            is_premium=user.get("is_premium", False),
+            username=user.get("username"),
+            firstname=user.get("first_name"),
+            lastname=user.get("last_name"),
+            language=language,
+            application_id=self.application_id,
+            # Redelivered updates get the same ID, so they can be deduplicated
+            event_id=None if update_id is None else f"tg:{update_id}:{user['id']}",
+        )
+
+    def _match_text(
+        self, update_type: str, spec: UpdateSpec, payload: dict
+    ) -> Optional[str]:
+        text = None
+        for key in spec.text_keys:
+            text = payload.get(key)
+            if text is not None:
+                break
+
+        if text is not None:
+            command = parse_command(text)
+            if command is not None:
+                if self._commands is None or command in self._commands:
+                    return command
+                return None
+        # Messages without text, like stickers, are tracked only with no filter
+        if self._messages is None or (text is not None and text in self._messages):
+            return update_type
+        return None
@@ -4,3 +4,7 @@ class WrongIdentityKeys(Exception):
 
 class CustomEventNotSupported(Exception):
     pass
+
+
+class CircuitOpenError(Exception):
+    pass
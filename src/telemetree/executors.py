@@ -0,0 +1,144 @@
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Iterable, Iterator, Optional, Union
+import logging
+import os
+import threading
+
+from telemetree.constants import ENCRYPTION_PENDING_PER_WORKER
+from telemetree.encryption import EncryptionService
+
+logger = logging.getLogger("telemetree.executors")
+
+
+class ExecutorKind(Enum):
+    INLINE = "inline"
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+# The encryption service of a worker process, set up by _init_worker
+_worker_service: Optional[EncryptionService] = None
+
+
+def _init_worker(service: EncryptionService) -> None:
+    global _worker_service
+    _worker_service = service
+
+
+def _encrypt_in_worker(message: Union[str, bytes]) -> dict:
+    return _worker_service.encrypt(message)
+
+
+class EncryptionExecutor:
+    """
+    Runs hybrid encryption inline, on a thread pool or on a process pool.
+
+    The pure-Python RSA step holds the GIL, so only the process pool spreads
+    encryption over several cores; the thread pool helps when AES dominates.
+    At most `max_pending` encryptions are queued at a time: callers block once
+    the pool falls behind instead of buffering without limit.
+
+    Args:
+        encryption_service (EncryptionService): The service that encrypts messages.
+        kind (Union[ExecutorKind, str]): inline, thread or process.
+        max_workers (Optional[int]): The pool size. Defaults to the number of CPUs.
+        max_pending (Optional[int]): The maximum number of queued encryptions.
+    """
+
+    def __init__(
+        self,
+        encryption_service: EncryptionService,
+        kind: Union[ExecutorKind, str] = ExecutorKind.INLINE,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ) -> None:
+        self.encryption_service = encryption_service
+        self.kind = ExecutorKind(kind)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = (
+            max_pending or self.max_workers * ENCRYPTION_PENDING_PER_WORKER
+        )
+        if self.max_workers <= 0 or self.max_pending <= 0:
+            raise ValueError("max_workers and max_pending must be positive")
+
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool: Optional[Executor] = None
+        if self.kind is ExecutorKind.THREAD:
+            self._pool = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="telemetree-encryption"
+            )
+        elif self.kind is ExecutorKind.PROCESS:
+            self._pool = ProcessPoolExecutor(
+                self.max_workers,
+                initializer=_init_worker,
+                initargs=(encryption_service,),
+            )
+
+    def submit(self, message: Union[str, bytes]) -> Future:
+        """
+        Queues a message for encryption, waiting while `max_pending` are queued.
+
+        Args:
+            message (Union[str, bytes]): The message to encrypt.
+
+        Returns:
+            Future: Resolves to the encrypted key, IV and body.
+        """
+        if self._pool is None:
+            future: Future = Future()
+            try:
+                future.set_result(self.encryption_service.encrypt(message))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._slots.acquire()
+        try:
+            if self.kind is ExecutorKind.PROCESS:
+                future = self._pool.submit(_encrypt_in_worker, message)
+            else:
+                future = self._pool.submit(self.encryption_service.encrypt, message)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def encrypt(self, message: Union[str, bytes]) -> dict:
+        """Encrypts a single message. See EncryptionService.encrypt."""
+        if self._pool is None:
+            return self.encryption_service.encrypt(message)
+        return self.submit(message).result()
+
+    def map(self, messages: Iterable[Union[str, bytes]]) -> Iterator[dict]:
+        """
+        Encrypts messages in parallel, yielding the results in order.
+
+        At most `max_pending` messages are in flight, so a long iterable is
+        consumed as results are taken.
+
+        Args:
+            messages (Iterable[Union[str, bytes]]): The messages to encrypt.
+
+        Yields:
+            dict: The encrypted key, IV and body of each message.
+        """
+        if self._pool is None:
+            for message in messages:
+                yield self.encryption_service.encrypt(message)
+            return
+
+        window = deque()
+        for message in messages:
+            # Hand out the oldest result before queueing more than the pool can hold
+            if len(window) >= self.max_pending:
+                yield window.popleft().result()
+            window.append(self.submit(message))
+        while window:
+            yield window.popleft().result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
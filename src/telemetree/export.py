@@ -0,0 +1,406 @@
+from collections import deque
+from enum import Enum
+from typing import (
+    TYPE_CHECKING,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+
+from telemetree.constants import (
+    EXPORT_FILE_AGE,
+    EXPORT_FILE_BYTES,
+    EXPORT_UPLOAD_WINDOW,
+    GZIP_COMPRESS_LEVEL,
+)
+from telemetree.schemas import EncryptedEvent
+from telemetree.utils import chunk_payloads, serialize_batch
+
+if TYPE_CHECKING:
+    from telemetree.client import Telemetree
+
+logger = logging.getLogger("telemetree.export")
+
+EXPORT_SUFFIX = ".ndjson.gz"
+PARTIAL_SUFFIX = ".part"
+UPLOADED_SUFFIX = ".uploaded"
+UPLOAD_CHECKPOINT_FILE = "upload-checkpoint"
+
+
+class ExportFormat(Enum):
+    ENCRYPTED = "encrypted"
+    PLAINTEXT = "plaintext"
+
+
+def export_format(path: str) -> ExportFormat:
+    """Returns the format of an export file from its name."""
+    name = os.path.basename(path)[: -len(EXPORT_SUFFIX)]
+    return ExportFormat(name.rsplit(".", 1)[-1])
+
+
+def read_export(path: str) -> Iterator[bytes]:
+    """
+    Reads the records of an export file, without their line endings.
+
+    Args:
+        path (str): The path of a completed export file.
+
+    Yields:
+        bytes: The serialized records.
+    """
+    with gzip.open(path, "rb") as file:
+        for line in file:
+            line = line.rstrip(b"\n")
+            if line:
+                yield line
+
+
+class FileSink:
+    """
+    Writes events to rotated, gzip compressed newline delimited JSON files,
+    for backfills and hosts without a connection to Telemetree.
+
+    Plaintext exports, the default, hold one serialized Event per line. They
+    are encrypted when they are uploaded, in requests of many events, and can
+    be produced without fetching the configuration. Encrypted exports hold one
+    EncryptedEvent per line, each posted in a request of its own, so they only
+    batch events written together, by `track_many` or in batching mode; use
+    them when the files must not hold readable user data.
+
+    A file is written under a `.part` name and renamed once it is complete: when
+    it reaches `max_file_bytes` of uncompressed records, on the first write
+    after it is `max_file_age` seconds old, and on `close()`. File names start
+    with the time they were opened, so they sort in the order they were written.
+
+    Args:
+        directory (str): The directory the files are written to.
+        format (Union[ExportFormat, str]): plaintext or encrypted.
+        max_file_bytes (int): The uncompressed size at which a file is completed.
+        max_file_age (float): The age in seconds at which a file is completed.
+        compress_level (int): The gzip compression level.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        format: Union[ExportFormat, str] = ExportFormat.PLAINTEXT,
+        max_file_bytes: int = EXPORT_FILE_BYTES,
+        max_file_age: float = EXPORT_FILE_AGE,
+        compress_level: int = GZIP_COMPRESS_LEVEL,
+    ) -> None:
+        if max_file_bytes <= 0:
+            raise ValueError("max_file_bytes must be positive")
+        if max_file_age <= 0:
+            raise ValueError("max_file_age must be positive")
+
+        self.directory = directory
+        self.format = ExportFormat(format)
+        self.max_file_bytes = max_file_bytes
+        self.max_file_age = max_file_age
+        self.compress_level = compress_level
+        self.records = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file: Optional[gzip.GzipFile] = None
+        self._path: Optional[str] = None
+        self._size = 0
+        self._opened = 0.0
+        self._seq = 0
+
+    def post(self, data: EncryptedEvent) -> None:
+        """Writes an encrypted event, in place of `HttpClient.post`."""
+        self.write([data.model_dump_json(exclude_none=True).encode("utf-8")])
+
+    def send(self, payloads: Iterable[bytes]) -> None:
+        """Writes serialized events to a plaintext export."""
+        self.write(payloads)
+
+    def write(self, records: Iterable[bytes]) -> None:
+        """
+        Writes serialized records, one per line.
+
+        Args:
+            records (Iterable[bytes]): The records, without line endings.
+        """
+        data = b"".join(record + b"\n" for record in records)
+        with self._lock:
+            if self._file is not None and (
+                self._size >= self.max_file_bytes
+                or time.monotonic() - self._opened >= self.max_file_age
+            ):
+                self._complete()
+            if self._file is None:
+                self._open()
+            self._file.write(data)
+            self._size += len(data)
+            self.records += data.count(b"\n")
+
+    def rotate(self) -> None:
+        """Completes the current file, making it available for upload."""
+        with self._lock:
+            if self._file is not None:
+                self._complete()
+
+    def close(self) -> None:
+        self.rotate()
+
+    def __enter__(self) -> "FileSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _open(self) -> None:
+        self._seq += 1
+        name = (
+            f"{int(time.time() * 1000):013d}-{os.getpid()}-{self._seq:06d}"
+            f".{self.format.value}{EXPORT_SUFFIX}"
+        )
+        self._path = os.path.join(self.directory, name)
+        self._file = gzip.open(
+            self._path + PARTIAL_SUFFIX, "wb", compresslevel=self.compress_level
+        )
+        self._size = 0
+        self._opened = time.monotonic()
+
+    def _complete(self) -> None:
+        self._file.close()
+        os.replace(self._path + PARTIAL_SUFFIX, self._path)
+        logger.info("Completed export file %s (%s bytes)", self._path, self._size)
+        self._file = None
+
+
+class UploadResult(NamedTuple):
+    files: int
+    records: int
+    requests: int
+
+
+class BulkUploader:
+    """
+    Uploads export files to Telemetree in large requests, resuming where a
+    previous run stopped.
+
+    Plaintext records are grouped into requests of up to the client's
+    `batch_max_events` and `batch_max_bytes` and encrypted with its key.
+    Encrypted records cannot be merged, so each is posted as it is. Requests are posted from the
+    client's delivery pool when it has a `concurrency_limiter`, else one at a
+    time.
+
+    Progress is saved to a checkpoint file in the directory every `window`
+    requests, and uploaded files are renamed with an `.uploaded` suffix, or
+    deleted. Records are delivered at least once: after a failure, requests
+    that were in flight may be sent again.
+
+    Args:
+        client (Telemetree): The client whose configuration, encryption and
+            HTTP connections are used.
+        directory (str): The directory holding the export files.
+        delete (bool): Delete uploaded files instead of renaming them.
+        window (int): The number of requests between checkpoints.
+    """
+
+    def __init__(
+        self,
+        client: "Telemetree",
+        directory: str,
+        delete: bool = False,
+        window: int = EXPORT_UPLOAD_WINDOW,
+    ) -> None:
+        if window <= 0:
+            raise ValueError("window must be positive")
+
+        self.client = client
+        self.directory = directory
+        self.delete = delete
+        self.window = window
+        self._checkpoint_path = os.path.join(directory, UPLOAD_CHECKPOINT_FILE)
+
+    def pending(self) -> List[str]:
+        """Returns the completed export files not uploaded yet, oldest first."""
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(EXPORT_SUFFIX)
+        )
+
+    def upload(self) -> UploadResult:
+        """
+        Uploads every pending file.
+
+        Returns:
+            UploadResult: The number of files, records and requests uploaded.
+
+        Raises:
+            Exception: The error of the first request that failed for good,
+                once the progress up to it is saved.
+        """
+        self.client.initialize()
+        files = records = requests = 0
+        for path in self.pending():
+            file_records, file_requests = self._upload_file(path)
+            files += 1
+            records += file_records
+            requests += file_requests
+        return UploadResult(files, records, requests)
+
+    def _upload_file(self, path: str) -> Tuple[int, int]:
+        name = os.path.basename(path)
+        done = self._load_checkpoint(name)
+        if done:
+            logger.info("Resuming %s after %s records", name, done)
+
+        records = requests = 0
+        units = self._requests(path, done)
+        while True:
+            window = [unit for _, unit in zip(range(self.window), units)]
+            if not window:
+                break
+            end = self._post_window(name, window)
+            records += end - done
+            requests += len(window)
+            done = end
+
+        if self.delete:
+            os.remove(path)
+        else:
+            os.replace(path, path + UPLOADED_SUFFIX)
+        self._clear_checkpoint()
+        logger.info("Uploaded %s: %s records in %s requests", name, records, requests)
+        return records, requests
+
+    def _requests(self, path: str, skip: int) -> Iterator[Tuple[int, EncryptedEvent]]:
+        """Yields each request of a file with the number of records up to its end."""
+        lines = read_export(path)
+        for _ in zip(range(skip), lines):
+            pass
+
+        if export_format(path) is ExportFormat.ENCRYPTED:
+            for number, line in enumerate(lines, skip + 1):
+                yield number, EncryptedEvent.model_validate_json(line)
+            return
+
+        client = self.client
+        ends: Deque[int] = deque()
+
+        def batches() -> Iterator[bytes]:
+            end = skip
+            for chunk in chunk_payloads(
+                lines, client.batch_max_events, client.batch_max_bytes
+            ):
+                end += len(chunk)
+                ends.append(end)
+                yield serialize_batch(chunk)
+
+        # Batches are encrypted on the client's encryption pool while others are posted
+        for encrypted in client.encryption_executor.map(batches()):
+            yield ends.popleft(), EncryptedEvent(**encrypted)
+
+    def _post_window(self, name: str, window: List[Tuple[int, EncryptedEvent]]) -> int:
+        """Posts a window of requests and saves the progress. Returns its end."""
+        post = self.client.http_client.post
+        scheduler = self.client.scheduler
+        if scheduler is None:
+            outcomes = []
+            for end, event in window:
+                try:
+                    post(event)
+                except Exception as e:
+                    outcomes.append(e)
+                    break
+                outcomes.append(None)
+        else:
+            futures = [scheduler.submit(post, event) for _, event in window]
+            outcomes = [future.exception() for future in futures]
+
+        done = None
+        for (end, _), error in zip(window, outcomes):
+            if error is not None:
+                if done is not None:
+                    self._save_checkpoint(name, done)
+                raise error
+            done = end
+        self._save_checkpoint(name, done)
+        return done
+
+    def _load_checkpoint(self, name: str) -> int:
+        try:
+            with open(self._checkpoint_path, "r", encoding="utf-8") as checkpoint:
+                stored = json.load(checkpoint)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            logger.warning(
+                "Ignoring corrupt upload checkpoint %s", self._checkpoint_path
+            )
+            return 0
+        return stored["records"] if stored.get("file") == name else 0
+
+    def _save_checkpoint(self, name: str, records: int) -> None:
+        tmp_path = self._checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as checkpoint:
+            json.dump({"file": name, "records": records}, checkpoint)
+        os.replace(tmp_path, self._checkpoint_path)
+
+    def _clear_checkpoint(self) -> None:
+        try:
+            os.remove(self._checkpoint_path)
+        except FileNotFoundError:
+            pass
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Uploads the export files of a directory."""
+    from telemetree.client import Telemetree
+    from telemetree.concurrency import AdaptiveLimiter
+    from telemetree.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(
+        prog="python -m telemetree.export",
+        description="Uploads exported events to Telemetree.",
+    )
+    parser.add_argument("directory", help="the directory holding the export files")
+    parser.add_argument(
+        "--api-key", default=os.environ.get("TELEMETREE_API_KEY"), required=False
+    )
+    parser.add_argument(
+        "--project-id", default=os.environ.get("TELEMETREE_PROJECT_ID"), required=False
+    )
+    parser.add_argument(
+        "--delete", action="store_true", help="delete files once uploaded"
+    )
+    args = parser.parse_args(argv)
+    if not args.api_key or not args.project_id:
+        parser.error(
+            "--api-key and --project-id, or TELEMETREE_API_KEY and "
+            "TELEMETREE_PROJECT_ID, are required"
+        )
+
+    configure_logging()
+    with Telemetree(
+        args.api_key,
+        args.project_id,
+        concurrency_limiter=AdaptiveLimiter(),
+    ) as client:
+        result = BulkUploader(client, args.directory, delete=args.delete).upload()
+    print(
+        f"Uploaded {result.records} records from {result.files} files "
+        f"in {result.requests} requests"
+    )
+
+
+if __name__ == "__main__":
+    main()
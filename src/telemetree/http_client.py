@@ -1,12 +1,31 @@
 from enum import Enum
-from socket import timeout
+from typing import TYPE_CHECKING, Optional, Union
+import asyncio
+import gzip
+import json
 import logging
+import time
 
-import requests
-
-from telemetree.constants import HTTP_TIMEOUT
-from telemetree.exceptions import WrongIdentityKeys
+from telemetree.constants import (
+    COMPRESSION_MIN_BYTES,
+    GZIP_COMPRESS_LEVEL,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_READ_TIMEOUT,
+)
+from telemetree.concurrency import AdaptiveLimiter
+from telemetree.exceptions import CircuitOpenError, WrongIdentityKeys
+from telemetree.metrics import Metrics, resolve_metrics
+from telemetree.retry import CircuitBreaker, RetryPolicy, parse_retry_after
 from telemetree.schemas import EncryptedEvent
+from telemetree.transport import Transport, TransportKind, create_transport
+
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+# requests and httpx are imported on first use to keep `import telemetree` cheap
 
 logger = logging.getLogger("telemetree.http_client")
 
@@ -19,13 +38,173 @@ class HttpStatus(Enum):
     UNAUTHORIZED = 401
     FORBIDDEN = 403
     NOT_FOUND = 404
+    REQUEST_TIMEOUT = 408
+    TOO_MANY_REQUESTS = 429
     INTERNAL_SERVER_ERROR = 500
+    BAD_GATEWAY = 502
+    SERVICE_UNAVAILABLE = 503
+    GATEWAY_TIMEOUT = 504
+
+
+# The server did not process the request, so sending it again cannot duplicate the event
+SAFE_RETRY_STATUSES = frozenset(
+    {
+        HttpStatus.REQUEST_TIMEOUT.value,
+        HttpStatus.TOO_MANY_REQUESTS.value,
+        HttpStatus.SERVICE_UNAVAILABLE.value,
+    }
+)
+# The server may have processed the request before failing
+AMBIGUOUS_RETRY_STATUSES = frozenset(
+    {
+        HttpStatus.INTERNAL_SERVER_ERROR.value,
+        HttpStatus.BAD_GATEWAY.value,
+        HttpStatus.GATEWAY_TIMEOUT.value,
+    }
+)
+
+
+def is_retryable_status(retry_policy: RetryPolicy, status_code: int) -> bool:
+    if status_code in SAFE_RETRY_STATUSES:
+        return True
+    return status_code in AMBIGUOUS_RETRY_STATUSES and retry_policy.is_retryable(False)
+
+
+def is_rejection(status_code: int) -> bool:
+    """Returns True if the status means the server will never accept the request."""
+    return (
+        HttpStatus.BAD_REQUEST.value
+        <= status_code
+        < HttpStatus.INTERNAL_SERVER_ERROR.value
+        and status_code not in SAFE_RETRY_STATUSES
+    )
+
+
+def is_endpoint_failure(status_code: int) -> bool:
+    """Returns True if the status means the endpoint is down or overloaded."""
+    return status_code >= HttpStatus.INTERNAL_SERVER_ERROR.value or status_code in (
+        HttpStatus.REQUEST_TIMEOUT.value,
+        HttpStatus.TOO_MANY_REQUESTS.value,
+    )
+
+
+def _is_plain(value: str) -> bool:
+    """Returns True if a JSON string holds the value without escapes."""
+    return (
+        value.isascii()
+        and value.isprintable()
+        and '"' not in value
+        and "\\" not in value
+    )
+
+
+def encode_body(data: EncryptedEvent) -> bytes:
+    """
+    Encodes an encrypted event as a request body.
+
+    The pipeline expects the event's JSON document wrapped in a JSON string.
+    The base64 fields need no escaping, so the body is assembled in one pass
+    rather than dumped to JSON twice.
+
+    Args:
+        data (EncryptedEvent): The encrypted event.
+
+    Returns:
+        bytes: The request body.
+    """
+    values = [data.key, data.iv, data.body]
+    if data.compression is not None:
+        values.append(data.compression)
+    if not all(_is_plain(value) for value in values):
+        return json.dumps(data.model_dump_json(exclude_none=True)).encode("utf-8")
+
+    parts = [
+        '"{\\"key\\":\\"',
+        data.key,
+        '\\",\\"iv\\":\\"',
+        data.iv,
+        '\\",\\"body\\":\\"',
+        data.body,
+    ]
+    if data.compression is not None:
+        parts.append('\\",\\"compression\\":\\"')
+        parts.append(data.compression)
+    parts.append('\\"}"')
+    return "".join(parts).encode("ascii")
+
+
+def gzip_body(body: bytes) -> bytes:
+    """Compresses a request body for `Content-Encoding: gzip`."""
+    return gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL)
 
 
 class HttpClient:
-    def __init__(self, api_key: str, project_id: str) -> None:
+    """
+    Synchronous HTTP client sending through a pluggable transport, by default a
+    pooled requests session that keeps connections alive.
+
+    Args:
+        api_key (str): The API key for authentication.
+        project_id (str): The project ID for the Telemetree service.
+        url (Optional[str]): The URL events are posted to.
+        pool_connections (int): The number of hosts to keep connection pools for.
+        pool_maxsize (int): The maximum number of connections kept per host.
+        connect_timeout (float): The connection timeout in seconds.
+        read_timeout (float): The read timeout in seconds.
+        retry_policy (Optional[RetryPolicy]): When and how failed posts are retried.
+        circuit_breaker (Optional[CircuitBreaker]): Fails posts fast while the endpoint is down.
+        gzip (bool): Compress request bodies of at least `gzip_min_bytes` bytes and
+            send them with `Content-Encoding: gzip`.
+        gzip_min_bytes (int): The body size from which requests are compressed.
+        metrics (Optional[Metrics]): Records request latencies, bytes sent,
+            retries and errors.
+        transport (Union[TransportKind, str, Transport]): The transport requests
+            are sent with, or its kind: pooled HTTP/1.1 with requests, HTTP/2
+            with httpx, or in memory for tests.
+        limiter (Optional[AdaptiveLimiter]): Bounds the requests in flight across
+            threads, adapting the bound to the latency and overload responses
+            of the host.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        project_id: str,
+        url: Optional[str] = None,
+        pool_connections: int = HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        gzip: bool = False,
+        gzip_min_bytes: int = COMPRESSION_MIN_BYTES,
+        metrics: Optional[Metrics] = None,
+        transport: Union[TransportKind, str, Transport] = TransportKind.REQUESTS,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ) -> None:
         self.api_key = api_key
         self.project_id = project_id
+        self.url = url
+        self.gzip = gzip
+        self.gzip_min_bytes = gzip_min_bytes
+        self.metrics = resolve_metrics(metrics)
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.transport = create_transport(transport, pool_connections, pool_maxsize)
+        self.limiter = limiter
+
+    @property
+    def session(self) -> "requests.Session":
+        """The pooled session of the requests transport, created on first use."""
+        return self.transport.session
+
+    @session.setter
+    def session(self, session: "requests.Session") -> None:
+        self.transport.session = session
 
     def get(self, config_url: str):
         """
@@ -37,7 +216,7 @@ class HttpClient:
         }
         url = f"{config_url}?project={self.project_id}"
 
-        request = requests.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+        request = self.transport.get(url, headers=headers, timeout=self.timeout)
         response_json = request.json()
         if request.status_code != HttpStatus.OK.value:
             logger.error(
@@ -55,35 +234,279 @@ class HttpClient:
         """
         Sends a POST request to the specified URL with the given data and headers.
 
+        Failed requests are retried according to the retry policy.
+
+        Args:
+            data (EncryptedEvent): The data to be sent in the request body.
+
+        Returns:
+            dict: The JSON response returned by the server.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            Exception: The transport's errors, e.g. for the requests transport
+                HTTPError if the server returns an error status, RequestException
+                if the request fails and timeout if it times out.
+        """
+        errors = self.transport.errors
+        if not self.circuit_breaker.allow():
+            self.metrics.increment("circuit_open_rejections")
+            raise CircuitOpenError(f"Circuit open, not sending to {self.url}")
+
+        headers = {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key,
+            "x-project-id": self.project_id,
+        }
+
+        body = encode_body(data)
+        if self.gzip and len(body) >= self.gzip_min_bytes:
+            headers["Content-Encoding"] = "gzip"
+            body = gzip_body(body)
+        size = len(body)
+
+        attempt = 0
+        while True:
+            retry_after = None
+            self.metrics.increment("http_requests")
+            self.metrics.increment("bytes_sent", size)
+            started = self.limiter.acquire() if self.limiter is not None else None
+            overloaded = False
+            try:
+                with self.metrics.time("http_post_seconds"):
+                    request = self.transport.post(
+                        self.url, headers=headers, body=body, timeout=self.timeout
+                    )
+                request.raise_for_status()
+                self.circuit_breaker.record_success()
+                return request.json()
+            except errors.status as e:
+                error = e
+                status_code = e.response.status_code
+                overloaded = is_endpoint_failure(status_code)
+                if overloaded:
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.record_success()
+                retryable = is_retryable_status(self.retry_policy, status_code)
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+            except errors.connect + errors.timeout as e:
+                error = e
+                overloaded = True
+                self.circuit_breaker.record_failure()
+                # The request never reached the server if the connection failed
+                retryable = self.retry_policy.is_retryable(
+                    isinstance(e, errors.connect)
+                )
+            except errors.other as e:
+                self.circuit_breaker.record_failure()
+                self.metrics.increment("http_errors")
+                logger.exception("Failed to send POST request: %s", e)
+                raise e
+            except BaseException:
+                # Resolve a half-open trial whatever the failure, or the circuit stays shut
+                self.circuit_breaker.record_failure()
+                raise
+            finally:
+                # Retries wait without holding a slot
+                if started is not None:
+                    self.limiter.release(started, overloaded)
+
+            delay = None
+            if retryable and attempt < self.retry_policy.max_retries:
+                delay = self.retry_policy.delay(attempt, retry_after)
+            if delay is None or not self.circuit_breaker.allow():
+                self.metrics.increment("http_errors")
+                logger.error("Failed to send POST request: %s", error)
+                raise error
+
+            self.metrics.increment("http_retries")
+
+            logger.warning(
+                "POST request failed: %s. Retrying in %.2f seconds", error, delay
+            )
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        """Closes the pooled connections."""
+        self.transport.close()
+
+    def __enter__(self) -> "HttpClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncHttpClient:
+    """
+    Asynchronous counterpart of HttpClient built on httpx.
+
+    Args:
+        api_key (str): The API key for authentication.
+        project_id (str): The project ID for the Telemetree service.
+        url (Optional[str]): The URL events are posted to.
+        client (Optional[httpx.AsyncClient]): A preconfigured httpx client to use.
+            The pool and timeout arguments are ignored when it is given.
+        pool_maxsize (int): The maximum number of open connections.
+        connect_timeout (float): The connection timeout in seconds.
+        read_timeout (float): The read timeout in seconds.
+        retry_policy (Optional[RetryPolicy]): When and how failed posts are retried.
+        circuit_breaker (Optional[CircuitBreaker]): Fails posts fast while the endpoint is down.
+        gzip (bool): Compress request bodies of at least `gzip_min_bytes` bytes and
+            send them with `Content-Encoding: gzip`.
+        gzip_min_bytes (int): The body size from which requests are compressed.
+        metrics (Optional[Metrics]): Records request latencies, bytes sent,
+            retries and errors.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        project_id: str,
+        url: Optional[str] = None,
+        client: Optional["httpx.AsyncClient"] = None,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        gzip: bool = False,
+        gzip_min_bytes: int = COMPRESSION_MIN_BYTES,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.project_id = project_id
+        self.url = url
+        self.gzip = gzip
+        self.gzip_min_bytes = gzip_min_bytes
+        self.metrics = resolve_metrics(metrics)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        if client is None:
+            import httpx
+
+        self.client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize
+            ),
+        )
+
+    async def get(self, config_url: str):
+        """
+        Sends a GET request to the specified URL with the given headers.
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+
+        request = await self.client.get(
+            config_url, params={"project": self.project_id}, headers=headers
+        )
+        response_json = request.json()
+        if request.status_code != HttpStatus.OK.value:
+            logger.error(
+                "Failed to fetch the config. Status code: %s. Response: %s",
+                request.status_code,
+                response_json,
+            )
+            raise WrongIdentityKeys(
+                f"Failed to fetch the config. Status code: {request.status_code}. Response: {response_json}"
+            )
+
+        return response_json
+
+    async def post(self, data: EncryptedEvent):
+        """
+        Sends a POST request to the specified URL with the given data and headers.
+
+        Failed requests are retried according to the retry policy.
+
         Args:
             data (EncryptedEvent): The data to be sent in the request body.
 
         Returns:
-            HTTPResponse: The response object returned by the server.
+            dict: The JSON response returned by the server.
 
         Raises:
-            HTTPError: If an HTTP error occurs during the request.
-            URLError: If a URL error occurs during the request.
-            timeout: If the request times out.
+            CircuitOpenError: If the circuit breaker is open.
+            httpx.HTTPError: If the request fails or the server returns an error status.
         """
-        try:
-            headers = {
-                "Content-Type": "application/json",
-                "x-api-key": self.api_key,
-                "x-project-id": self.project_id,
-            }
+        import httpx
+
+        if not self.circuit_breaker.allow():
+            self.metrics.increment("circuit_open_rejections")
+            raise CircuitOpenError(f"Circuit open, not sending to {self.url}")
 
-            data = data.model_dump_json()
+        headers = {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key,
+            "x-project-id": self.project_id,
+        }
 
-            request = requests.post(
-                self.url, json=data, headers=headers, timeout=HTTP_TIMEOUT
+        body = encode_body(data)
+        if self.gzip and len(body) >= self.gzip_min_bytes:
+            headers["Content-Encoding"] = "gzip"
+            body = gzip_body(body)
+        size = len(body)
+
+        attempt = 0
+        while True:
+            retry_after = None
+            self.metrics.increment("http_requests")
+            self.metrics.increment("bytes_sent", size)
+            try:
+                with self.metrics.time("http_post_seconds"):
+                    request = await self.client.post(
+                        self.url, headers=headers, content=body
+                    )
+                request.raise_for_status()
+                self.circuit_breaker.record_success()
+                return request.json()
+            except httpx.HTTPStatusError as e:
+                error = e
+                status_code = e.response.status_code
+                if is_endpoint_failure(status_code):
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.record_success()
+                retryable = is_retryable_status(self.retry_policy, status_code)
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+            except httpx.TransportError as e:
+                error = e
+                self.circuit_breaker.record_failure()
+                # The request never reached the server if the connection failed
+                retryable = self.retry_policy.is_retryable(
+                    isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                )
+            except httpx.HTTPError as e:
+                self.circuit_breaker.record_failure()
+                self.metrics.increment("http_errors")
+                logger.exception("Failed to send POST request: %s", e)
+                raise e
+            except BaseException:
+                # Resolve a half-open trial whatever the failure, cancellation included
+                self.circuit_breaker.record_failure()
+                raise
+
+            delay = None
+            if retryable and attempt < self.retry_policy.max_retries:
+                delay = self.retry_policy.delay(attempt, retry_after)
+            if delay is None or not self.circuit_breaker.allow():
+                self.metrics.increment("http_errors")
+                logger.error("Failed to send POST request: %s", error)
+                raise error
+
+            self.metrics.increment("http_retries")
+
+            logger.warning(
+                "POST request failed: %s. Retrying in %.2f seconds", error, delay
             )
-            request.raise_for_status()
-            return request.json()
-        except (
-            requests.exceptions.HTTPError,
-            requests.exceptions.RequestException,
-            timeout,
-        ) as e:
-            logger.exception("Failed to send POST request: %s", e)
-            raise e
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
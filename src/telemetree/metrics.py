@@ -0,0 +1,234 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+import logging
+import threading
+
+from telemetree.constants import METRICS_LATENCY_BUCKETS, METRICS_PREFIX
+
+logger = logging.getLogger("telemetree.metrics")
+
+# A sink receives every measurement as (kind, name, value), kind being
+# "histogram" or "counter"
+MetricsSink = Callable[[str, str, float], Any]
+
+
+class Histogram:
+    """
+    Counts observations in fixed buckets, keeping their number and sum.
+
+    Args:
+        buckets (Sequence[float]): The upper bounds of the buckets, ascending.
+    """
+
+    def __init__(self, buckets: Sequence[float] = METRICS_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    Collects the SDK's latency histograms, counters and gauges.
+
+    Stages are timed with `time()`, and each measurement is also passed to the
+    sinks, e.g. a callback or an `OpenTelemetrySink`. Gauges are read when a
+    snapshot is taken. `render_prometheus()` renders everything in the
+    Prometheus text format.
+
+    Args:
+        sinks (Iterable[MetricsSink]): Receive each measurement as it is made.
+        buckets (Sequence[float]): The latency histogram buckets in seconds.
+    """
+
+    enabled = True
+
+    def __init__(
+        self,
+        sinks: Iterable[MetricsSink] = (),
+        buckets: Sequence[float] = METRICS_LATENCY_BUCKETS,
+    ) -> None:
+        self.sinks: List[MetricsSink] = list(sinks)
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float) -> None:
+        """Records a value, usually a duration in seconds, in a histogram."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.buckets)
+            histogram.observe(value)
+        self._emit("histogram", name, value)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Adds to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self._emit("counter", name, value)
+
+    def register_gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Registers a callable returning the current value of a gauge."""
+        self.gauges[name] = read
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """Records the duration of the block in the histogram `name`."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the current values.
+
+        Returns:
+            Dict[str, Any]: The counters and gauges by name, and for each histogram
+                its count, sum, p50 and p99.
+        """
+        with self._lock:
+            values: Dict[str, Any] = dict(self.counters)
+            for name, histogram in self.histograms.items():
+                values[name] = {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99),
+                }
+        values.update(self._read_gauges())
+        return values
+
+    def render_prometheus(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"{METRICS_PREFIX}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+            for name, histogram in sorted(self.histograms.items()):
+                metric = f"{METRICS_PREFIX}{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+        for name, value in sorted(self._read_gauges().items()):
+            metric = f"{METRICS_PREFIX}{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _read_gauges(self) -> Dict[str, float]:
+        values = {}
+        for name, read in list(self.gauges.items()):
+            try:
+                values[name] = read()
+            except Exception as e:
+                logger.warning("Failed to read gauge %s: %s", name, e)
+        return values
+
+    def _emit(self, kind: str, name: str, value: float) -> None:
+        for sink in self.sinks:
+            try:
+                sink(kind, name, value)
+            except Exception as e:
+                logger.warning("Metrics sink failed: %s", e)
+
+
+class _NullTimer:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    """Discards all measurements. Used when metrics are disabled."""
+
+    enabled = False
+
+    def observe(self, name: str, value: float) -> None:
+        pass
+
+    def increment(self, name: str, value: float = 1) -> None:
+        pass
+
+    def register_gauge(self, name: str, read: Callable[[], float]) -> None:
+        pass
+
+    def time(self, name: str) -> _NullTimer:
+        return _NULL_TIMER
+
+
+NULL_METRICS = NullMetrics()
+
+
+class OpenTelemetrySink:
+    """
+    Forwards measurements to an OpenTelemetry meter, or anything with the same
+    `create_histogram` and `create_counter` methods.
+
+    Args:
+        meter: The meter the instruments are created with.
+        prefix (str): Prepended to the instrument names.
+    """
+
+    def __init__(self, meter: Any, prefix: str = METRICS_PREFIX) -> None:
+        self.meter = meter
+        self.prefix = prefix
+        self._instruments: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, kind: str, name: str, value: float) -> None:
+        instrument = self._instruments.get(name)
+        if instrument is None:
+            with self._lock:
+                instrument = self._instruments.get(name)
+                if instrument is None:
+                    instrument = self._instruments[name] = self._create(kind, name)
+        if kind == "histogram":
+            instrument.record(value)
+        else:
+            instrument.add(value)
+
+    def _create(self, kind: str, name: str) -> Any:
+        if kind == "histogram":
+            return self.meter.create_histogram(self.prefix + name, unit="s")
+        return self.meter.create_counter(self.prefix + name)
+
+
+def resolve_metrics(metrics: Optional[Metrics]) -> Any:
+    """Returns the metrics, or the no-op collector if there are none."""
+    return metrics if metrics is not None else NULL_METRICS
@@ -0,0 +1,190 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Optional
+import logging
+import random
+import threading
+import time
+
+from telemetree.constants import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_MAX_RETRIES,
+)
+
+logger = logging.getLogger("telemetree.retry")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header given either in seconds or as an HTTP date.
+
+    Args:
+        value (Optional[str]): The header value.
+
+    Returns:
+        Optional[float]: The delay in seconds, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests are retried and how long to wait in between.
+
+    Delays grow exponentially from `backoff_base` up to `backoff_max` with full
+    jitter. A Retry-After header on 429 and 503 responses overrides the delay;
+    when it asks for more than `backoff_max` the request is not retried.
+
+    Connection failures and 408, 429 and 503 responses are always safe to
+    retry. Read timeouts and 500, 502 and 504 responses may come after the
+    server stored the event, so they are only retried when `retry_ambiguous`
+    is set, accepting possible duplicates.
+
+    Args:
+        max_retries (int): The maximum number of retries after the first attempt.
+        backoff_base (float): The delay before the first retry in seconds.
+        backoff_max (float): The maximum delay in seconds.
+        jitter (bool): Randomize delays to spread out retries from many clients.
+        retry_ambiguous (bool): Also retry failures that may have been processed.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = RETRY_MAX_RETRIES,
+        backoff_base: float = RETRY_BACKOFF_BASE,
+        backoff_max: float = RETRY_BACKOFF_MAX,
+        jitter: bool = True,
+        retry_ambiguous: bool = False,
+    ) -> None:
+        if max_retries < 0:
+            raise ValueError("max_retries must not be negative")
+        if backoff_base < 0 or backoff_max < 0:
+            raise ValueError("Backoff delays must not be negative")
+
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_ambiguous = retry_ambiguous
+
+    def is_retryable(self, safe: bool) -> bool:
+        """
+        Args:
+            safe (bool): Whether the failed request is known not to have been processed.
+        """
+        return safe or self.retry_ambiguous
+
+    def delay(
+        self, attempt: int, retry_after: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Returns the wait before the given retry.
+
+        Args:
+            attempt (int): The number of the retry, starting at 0.
+            retry_after (Optional[float]): The delay requested by the server.
+
+        Returns:
+            Optional[float]: The delay in seconds, or None if the request should not be retried.
+        """
+        if retry_after is not None:
+            return retry_after if retry_after <= self.backoff_max else None
+        delay = min(self.backoff_max, self.backoff_base * (2**attempt))
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops requests to an endpoint that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests fail immediately with CircuitOpenError. After `reset_timeout`
+    seconds a single trial request is let through; its outcome closes or
+    reopens the circuit.
+
+    Args:
+        failure_threshold (int): The consecutive failures that open the circuit.
+        reset_timeout (float): The time in seconds before a trial request.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ) -> None:
+        if failure_threshold <= 0:
+            raise ValueError("failure_threshold must be positive")
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            if (
+                self._state is CircuitState.OPEN
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                return CircuitState.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Returns True if a request may be sent now."""
+        with self._lock:
+            if self._state is CircuitState.CLOSED:
+                return True
+            if self._state is CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                # Let one trial request through
+                self._state = CircuitState.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state is not CircuitState.CLOSED:
+                logger.info("Circuit closed, the endpoint is reachable again")
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state is CircuitState.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state is not CircuitState.OPEN:
+                    logger.warning(
+                        "Circuit opened after %s consecutive failures", self._failures
+                    )
+                self._state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
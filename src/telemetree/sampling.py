@@ -0,0 +1,184 @@
+from collections import Counter
+from typing import Dict, Optional, Union
+import logging
+import random
+import threading
+import time
+
+from telemetree.schemas import Event, TrustedEvent
+
+logger = logging.getLogger("telemetree.sampling")
+
+_MASK_64 = (1 << 64) - 1
+
+
+def user_hash(telegram_id: int) -> float:
+    """
+    Maps a Telegram ID to a number in [0, 1), the same in every process.
+
+    Uses the splitmix64 finalizer, so consecutive IDs are spread evenly.
+    """
+    x = (telegram_id + 0x9E3779B97F4A7C15) & _MASK_64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    x ^= x >> 31
+    return x / (1 << 64)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` events per second on average and
+    bursts of up to `burst` events.
+
+    Args:
+        rate (float): The number of tokens added per second.
+        burst (Optional[float]): The capacity of the bucket. Defaults to `rate`,
+            and is at least one token.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst is not None and burst <= 0:
+            raise ValueError("burst must be positive")
+
+        self.rate = rate
+        self.burst = max(burst if burst is not None else rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Takes a token if one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class SamplingRule:
+    """
+    How the events of one type are sampled and rate limited.
+
+    Sampled events carry their `sample_rate` so counts can be reweighted by its
+    inverse. Rate limiting is not reflected in the sample rate.
+
+    Args:
+        rate (float): The fraction of events kept, between 0 and 1.
+        by_user (bool): Keep all or none of a user's events, deciding with a hash
+            of the Telegram ID instead of at random. The same users are kept in
+            every process and for every event type sampled at the same rate.
+        max_per_second (Optional[float]): The maximum rate of kept events.
+        burst (Optional[float]): The burst allowed above `max_per_second`.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        by_user: bool = False,
+        max_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+    ) -> None:
+        if not 0 <= rate <= 1:
+            raise ValueError("rate must be between 0 and 1")
+
+        self.rate = rate
+        self.by_user = by_user
+        self.max_per_second = max_per_second
+        self.burst = burst
+
+    def create_bucket(self) -> Optional[TokenBucket]:
+        if self.max_per_second is None:
+            return None
+        return TokenBucket(self.max_per_second, self.burst)
+
+
+class Sampler:
+    """
+    Decides which events are sent, in front of `Telemetree.track`.
+
+    Each event is sampled by the rule of its type, or the default rule, then
+    limited by the rule's token bucket and finally by the global one.
+
+    Args:
+        rules (Optional[Dict[str, SamplingRule]]): The rules by event type.
+        default (Optional[SamplingRule]): The rule of the other event types.
+            Defaults to keeping every event.
+        max_per_second (Optional[float]): The maximum rate of all kept events.
+        burst (Optional[float]): The burst allowed above `max_per_second`.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Dict[str, SamplingRule]] = None,
+        default: Optional[SamplingRule] = None,
+        max_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+    ) -> None:
+        self.rules = dict(rules or {})
+        self.default = default or SamplingRule()
+        self.bucket = (
+            TokenBucket(max_per_second, burst) if max_per_second is not None else None
+        )
+        self._buckets = {
+            event_type: rule.create_bucket() for event_type, rule in self.rules.items()
+        }
+        self._default_buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+        self.dropped: Counter = Counter()
+
+    def apply(self, event: Union[Event, TrustedEvent]) -> bool:
+        """
+        Decides whether to send an event and records its sample rate on it.
+
+        Args:
+            event (Union[Event, TrustedEvent]): The event.
+
+        Returns:
+            bool: True if the event should be sent.
+        """
+        event_type = event.event_type
+        rule = self.rules.get(event_type, self.default)
+
+        if rule.rate < 1:
+            if rule.by_user:
+                kept = user_hash(event.telegram_id) < rule.rate
+            else:
+                kept = random.random() < rule.rate
+            if not kept:
+                self._drop(event_type)
+                return False
+            event.sample_rate = rule.rate
+
+        bucket = self._bucket(event_type, rule)
+        if bucket is not None and not bucket.try_acquire():
+            self._drop(event_type)
+            return False
+        if self.bucket is not None and not self.bucket.try_acquire():
+            self._drop(event_type)
+            return False
+        return True
+
+    def _bucket(self, event_type: str, rule: SamplingRule) -> Optional[TokenBucket]:
+        if rule is not self.default:
+            return self._buckets[event_type]
+        if rule.max_per_second is None:
+            return None
+        # Each type without a rule of its own gets a bucket of the default rule
+        bucket = self._default_buckets.get(event_type)
+        if bucket is None:
+            with self._lock:
+                bucket = self._default_buckets.setdefault(
+                    event_type, rule.create_bucket()
+                )
+        return bucket
+
+    def _drop(self, event_type: str) -> None:
+        with self._lock:
+            self.dropped[event_type] += 1
@@ -1,6 +1,29 @@
-from typing import Optional
-from datetime import datetime
+from typing import Any, Dict, List, Optional
+import datetime as dt
+import itertools
 from pydantic import BaseModel, Field, AliasChoices
+from pydantic_core import to_json
+
+from telemetree.constants import AUTO_CAPTURE_COMMANDS, AUTO_CAPTURE_TELEGRAM_EVENTS
+
+
+# The session of events not assigned to a user session: the process start time
+# in milliseconds
+PROCESS_SESSION_ID = int(dt.datetime.now().timestamp() * 1000)
+
+
+# Fields set by the SDK that are left out of the JSON while they are unset
+OMITTED_IF_NONE = ("sample_rate", "count", "event_id")
+# The fields to exclude for each combination of them being None. Plain sets, as
+# pydantic serializes with them much faster than with frozensets.
+_OMIT_EXCLUDES = {
+    unset: {name for name, is_unset in zip(OMITTED_IF_NONE, unset) if is_unset} or None
+    for unset in itertools.product((False, True), repeat=len(OMITTED_IF_NONE))
+}
+
+
+def _now() -> str:
+    return dt.datetime.now().isoformat()
 
 
 class TelemetreeConfig(BaseModel):
@@ -10,12 +33,38 @@ class TelemetreeConfig(BaseModel):
     Attributes:
         public_key (str): The public key used for encryption.
         host (str): The host URL for the Telemetree service.
+        auto_capture_telegram (bool): Whether Telegram updates are tracked.
+        auto_capture_telegram_events (List[str]): The update types to track.
+        auto_capture_commands (Optional[List[str]]): The bot commands to track,
+            or None for all commands.
+        auto_capture_messages (Optional[List[str]]): The message texts to track,
+            or None for all messages.
+        compression (List[str]): The payload compressions the pipeline accepts,
+            in order of preference.
     """
 
     public_key: str = Field(..., description="The RSA public key used for encryption")
     host: str = Field(
         ..., description="The host URL for the Telemetree pipeline service"
     )
+    auto_capture_telegram: bool = Field(
+        default=True, description="Whether Telegram updates are tracked"
+    )
+    auto_capture_telegram_events: List[str] = Field(
+        default=list(AUTO_CAPTURE_TELEGRAM_EVENTS),
+        description="The Telegram update types to track",
+    )
+    auto_capture_commands: Optional[List[str]] = Field(
+        default=list(AUTO_CAPTURE_COMMANDS),
+        description="The bot commands to track, or None for all commands",
+    )
+    auto_capture_messages: Optional[List[str]] = Field(
+        default=[], description="The message texts to track, or None for all messages"
+    )
+    compression: List[str] = Field(
+        default=[],
+        description="The payload compressions the pipeline accepts, best first",
+    )
 
 
 class EncryptedEvent(BaseModel):
@@ -26,11 +75,14 @@ class EncryptedEvent(BaseModel):
         key (str): The encrypted key used for decryption.
         iv (str): The encrypted initialization vector used for decryption.
         body (str): The encrypted event data.
+        compression (Optional[str]): The compression applied before encryption,
+            if any.
     """
 
     key: str
     iv: str
     body: str
+    compression: Optional[str] = None
 
 
 class Event(BaseModel):
@@ -51,8 +103,18 @@ class Event(BaseModel):
             - referrer (Optional[int]): The referrer.
         - Default:
             - event_source (str): The event source.
-            - datetime (str): The event timestamp in ISO 8601 format.
-            - session_id (int): The session ID.
+            - datetime (str): The event timestamp in ISO 8601 format, when
+              the event is tracked unless given.
+            - session_id (int): The session ID, assigned per user at track time
+              when sessions are tracked, else the process start time in
+              milliseconds.
+        - Set by the SDK:
+            - application_id (str): The application ID.
+            - sample_rate (float): The sampling rate, when the event was sampled.
+            - count (int): The number of folded events, when the event was aggregated.
+            - event_id (str): The idempotency key of the event, generated when
+              deduplicating unless given.
+          They are left out of the serialized event while they are None.
     """
 
     event_type: str = Field(
@@ -98,14 +160,175 @@ class Event(BaseModel):
         default="python_SDK", max_length=255, description="Default. Event source"
     )
     datetime: str = Field(
-        default=datetime.now().isoformat(),
+        default_factory=_now,
         description="Default. Event timestamp in ISO 8601 format",
     )
     session_id: int = Field(
-        default=int(datetime.now().timestamp() * 1000),
+        default=PROCESS_SESSION_ID,
         description="Default. Session ID",
     )
 
     application_id: Optional[str] = Field(
         default=None, description="Optional. The application ID"
     )
+    sample_rate: Optional[float] = Field(
+        default=None,
+        gt=0,
+        le=1,
+        description="Optional. The fraction of events of this kind that were sent",
+    )
+    count: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Optional. The number of identical events this event stands for",
+    )
+    event_id: Optional[str] = Field(
+        default=None,
+        max_length=255,
+        description="Optional. The idempotency key of the event",
+    )
+
+    def model_dump(self, **kwargs: Any) -> Dict[str, Any]:
+        kwargs.setdefault("exclude", self._unset_exclude())
+        return super().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs: Any) -> str:
+        kwargs.setdefault("exclude", self._unset_exclude())
+        return super().model_dump_json(**kwargs)
+
+    def to_json(self) -> bytes:
+        """Serializes the event as `model_dump_json()` does, to UTF-8 bytes."""
+        return self.__pydantic_serializer__.to_json(self, exclude=self._unset_exclude())
+
+    def stamp(self) -> None:
+        """Sets the timestamp to the current time, unless it was given."""
+        if "datetime" not in self.model_fields_set:
+            self.datetime = _now()
+
+    def _unset_exclude(self) -> Optional[set]:
+        values = self.__dict__
+        return _OMIT_EXCLUDES[
+            (
+                values["sample_rate"] is None,
+                values["count"] is None,
+                values["event_id"] is None,
+            )
+        ]
+
+
+def _event_aliases() -> Dict[str, str]:
+    aliases = {}
+    for name, field in Event.model_fields.items():
+        aliases[name] = name
+        if isinstance(field.validation_alias, AliasChoices):
+            for choice in field.validation_alias.choices:
+                aliases[choice] = name
+    return aliases
+
+
+# Maps every accepted input key of Event to its field name
+EVENT_ALIASES = _event_aliases()
+REQUIRED_EVENT_FIELDS = tuple(
+    name for name, field in Event.model_fields.items() if field.is_required()
+)
+
+# Static defaults in field order, and the fields whose default is computed.
+# TrustedEvent reads the fields left out while unset from class attributes.
+_EVENT_DEFAULTS = {
+    name: None if field.is_required() else field.default
+    for name, field in Event.model_fields.items()
+    if name not in OMITTED_IF_NONE
+}
+_EVENT_DEFAULT_FACTORIES = {
+    name: field.default_factory
+    for name, field in Event.model_fields.items()
+    if field.default_factory is not None
+}
+
+
+class TrustedEvent:
+    """
+    An event built by trusted code, skipping pydantic validation.
+
+    It has the same fields, defaults and JSON output as Event, but keeps them in
+    a plain dictionary serialized by pydantic's JSON encoder without building a
+    model. Only field names are checked: use it for events whose values are
+    known to be well formed.
+
+    Args:
+        event_type (str): The type of event to track.
+        telegram_id (int): The Telegram ID of the user.
+        **fields: Any other Event field, by name or alias.
+
+    Raises:
+        ValueError: If a field is unknown.
+    """
+
+    # The values live in __dict__, which is serialized as it is
+    __slots__ = ("__dict__", "_dated")
+
+    sample_rate: Optional[float] = None
+    count: Optional[int] = None
+    event_id: Optional[str] = None
+
+    def __init__(self, event_type: str, telegram_id: int, **fields: Any) -> None:
+        fields["event_type"] = event_type
+        fields["telegram_id"] = telegram_id
+        self.__dict__ = self._values(fields)
+        self._dated = "datetime" in fields
+
+    @classmethod
+    def from_dict(cls, event: Dict[str, Any]) -> "TrustedEvent":
+        """
+        Builds an event from a dictionary keyed by field names or aliases.
+
+        Raises:
+            ValueError: If a required field is missing or a field is unknown.
+        """
+        values = cls._values(event)
+        for name in REQUIRED_EVENT_FIELDS:
+            if values[name] is None:
+                raise ValueError(f"Missing required event field: {name}")
+        instance = cls.__new__(cls)
+        instance.__dict__ = values
+        instance._dated = "datetime" in event
+        return instance
+
+    def stamp(self) -> None:
+        """Sets the timestamp to the current time, unless it was given."""
+        if not self._dated:
+            self.__dict__["datetime"] = _now()
+            self._dated = True
+
+    @staticmethod
+    def _values(fields: Dict[str, Any]) -> Dict[str, Any]:
+        values = _EVENT_DEFAULTS.copy()
+        for name, factory in _EVENT_DEFAULT_FACTORIES.items():
+            values[name] = factory()
+        try:
+            for key, value in fields.items():
+                values[EVENT_ALIASES[key]] = value
+        except KeyError as e:
+            raise ValueError(f"Unknown event field: {e.args[0]}") from None
+        for name in OMITTED_IF_NONE:
+            if values.get(name, 0) is None:
+                del values[name]
+        return values
+
+    def model_dump(self) -> Dict[str, Any]:
+        return self.__dict__.copy()
+
+    def model_dump_json(self) -> str:
+        return to_json(self.__dict__).decode()
+
+    def to_json(self) -> bytes:
+        return to_json(self.__dict__)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TrustedEvent):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.__dict__.items())
+        return f"TrustedEvent({fields})"
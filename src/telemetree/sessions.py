@@ -0,0 +1,185 @@
+from array import array
+from typing import Optional, Union
+import logging
+import threading
+import time
+
+from telemetree.constants import (
+    SESSION_EVICTION_SAMPLE,
+    SESSION_MAX_USERS,
+    SESSION_TABLE_MIN_SLOTS,
+    SESSION_TIMEOUT,
+)
+from telemetree.schemas import PROCESS_SESSION_ID, Event, TrustedEvent
+
+logger = logging.getLogger("telemetree.sessions")
+
+_MASK_64 = (1 << 64) - 1
+_GOLDEN_64 = 0x9E3779B97F4A7C15
+# The table is grown once it is this full, as a fraction of its slots
+_MAX_LOAD = 0.75
+
+
+class SessionTracker:
+    """
+    Assigns events to per-user sessions that end after a period of inactivity.
+
+    A user's session starts with their first event, or their first event after
+    `timeout` seconds without any, and its ID is the start time in milliseconds
+    since the epoch. Events carrying a session ID of their own keep it.
+
+    The sessions are kept in an open addressing hash table of flat arrays, 20
+    bytes per slot, so a million active users fit in about 40 MB instead of the
+    few hundred taken by a dictionary of objects. The table doubles on demand
+    until it holds `max_users`; beyond that, the least recently seen user of a
+    small sample is forgotten, preferring users whose session ended.
+
+    Args:
+        timeout (float): The inactivity in seconds after which a session ends.
+        max_users (int): The maximum number of users tracked at once.
+    """
+
+    def __init__(
+        self, timeout: float = SESSION_TIMEOUT, max_users: int = SESSION_MAX_USERS
+    ) -> None:
+        if timeout <= 0:
+            raise ValueError("timeout must be positive")
+        if max_users <= 0:
+            raise ValueError("max_users must be positive")
+
+        self.timeout = timeout
+        self.max_users = max_users
+        self.evicted = 0
+
+        self._epoch = time.monotonic()
+        self._count = 0
+        self._hand = 0
+        self._lock = threading.Lock()
+        self._allocate(SESSION_TABLE_MIN_SLOTS)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def session_id(self, telegram_id: int, now: Optional[float] = None) -> int:
+        """
+        Returns the user's current session ID, starting a new session if the
+        last one ended, and records the activity.
+
+        Args:
+            telegram_id (int): The Telegram ID of the user.
+            now (Optional[float]): The time of the activity in seconds since the
+                epoch. Defaults to the current time.
+
+        Returns:
+            int: The session ID.
+        """
+        if now is None:
+            now = time.time()
+        if telegram_id <= 0:
+            # Not a valid user, so there is nothing to remember
+            return int(now * 1000)
+        seen = int(time.monotonic() - self._epoch)
+
+        with self._lock:
+            slot = self._find(telegram_id)
+            if self._keys[slot] == telegram_id:
+                if seen - self._seen[slot] < self.timeout:
+                    self._seen[slot] = seen
+                    return self._sessions[slot]
+            else:
+                if self._count >= self.max_users:
+                    self._evict(seen)
+                    slot = self._find(telegram_id)
+                elif self._count + 1 > len(self._keys) * _MAX_LOAD:
+                    self._allocate(len(self._keys) * 2)
+                    slot = self._find(telegram_id)
+                self._keys[slot] = telegram_id
+                self._count += 1
+            session_id = int(now * 1000)
+            self._sessions[slot] = session_id
+            self._seen[slot] = seen
+            return session_id
+
+    def apply(self, event: Union[Event, TrustedEvent]) -> None:
+        """Sets the session ID of an event left on the default session."""
+        if event.session_id == PROCESS_SESSION_ID:
+            event.session_id = self.session_id(event.telegram_id)
+
+    def _allocate(self, slots: int) -> None:
+        """Creates a table of `slots` slots, a power of two, moving the users over."""
+        old = getattr(self, "_keys", None)
+        old_sessions = getattr(self, "_sessions", None)
+        old_seen = getattr(self, "_seen", None)
+
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._keys = array("q", bytes(8 * slots))
+        self._sessions = array("q", bytes(8 * slots))
+        # Last activity in whole seconds since the tracker was created
+        self._seen = array("i", bytes(4 * slots))
+        self._hand = 0
+        if old is None:
+            return
+        for index, key in enumerate(old):
+            if key:
+                slot = self._find(key)
+                self._keys[slot] = key
+                self._sessions[slot] = old_sessions[index]
+                self._seen[slot] = old_seen[index]
+
+    def _home(self, key: int) -> int:
+        return ((key * _GOLDEN_64) & _MASK_64) >> (64 - self._bits)
+
+    def _find(self, key: int) -> int:
+        """Returns the slot holding the key, or the empty slot it would go in."""
+        keys = self._keys
+        mask = self._mask
+        slot = self._home(key)
+        while keys[slot] and keys[slot] != key:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _evict(self, seen: int) -> None:
+        """Forgets one user, sampling the users after a rotating hand."""
+        keys = self._keys
+        victim = -1
+        oldest = None
+        slot = self._hand
+        sampled = 0
+        while sampled < SESSION_EVICTION_SAMPLE:
+            slot = (slot + 1) & self._mask
+            if not keys[slot]:
+                continue
+            if seen - self._seen[slot] >= self.timeout:
+                victim = slot
+                break
+            if oldest is None or self._seen[slot] < oldest:
+                victim, oldest = slot, self._seen[slot]
+            sampled += 1
+        self._hand = slot
+        self._delete(victim)
+        self.evicted += 1
+
+    def _delete(self, slot: int) -> None:
+        """Empties a slot, moving later keys of the probe run back into the gap."""
+        keys = self._keys
+        mask = self._mask
+        gap = slot
+        probe = slot
+        while True:
+            probe = (probe + 1) & mask
+            key = keys[probe]
+            if not key:
+                break
+            home = self._home(key)
+            # The key stays if its home lies cyclically in (gap, probe]
+            if (gap < probe and gap < home <= probe) or (
+                gap > probe and (home > gap or home <= probe)
+            ):
+                continue
+            keys[gap] = key
+            self._sessions[gap] = self._sessions[probe]
+            self._seen[gap] = self._seen[probe]
+            gap = probe
+        keys[gap] = 0
+        self._count -= 1
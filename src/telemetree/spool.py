@@ -0,0 +1,387 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from pydantic import ValidationError
+
+from telemetree.constants import (
+    SPOOL_DRAIN_BATCH,
+    SPOOL_FSYNC_EVERY,
+    SPOOL_FSYNC_INTERVAL,
+    SPOOL_MAX_AGE,
+    SPOOL_MAX_BYTES,
+    SPOOL_RETRY_INTERVAL,
+    SPOOL_SEGMENT_BYTES,
+)
+from telemetree.http_client import is_rejection
+from telemetree.metrics import Metrics, resolve_metrics
+from telemetree.schemas import EncryptedEvent
+
+logger = logging.getLogger("telemetree.spool")
+
+# A position in the spool: the segment sequence number and a byte offset in it
+Position = Tuple[int, int]
+
+SEGMENT_SUFFIX = ".log"
+CHECKPOINT_FILE = "checkpoint"
+
+
+class Spool:
+    """
+    Append-only, segment based on-disk queue of encrypted events.
+
+    Records are newline delimited JSON appended to segment files of at most
+    `segment_max_bytes`. Writes are flushed to the OS on every append and
+    fsynced every `fsync_every` records or `fsync_interval` seconds. The read
+    position is kept in a checkpoint file, so unacknowledged records are
+    replayed in order after a restart. Once the spool exceeds `max_bytes`, or
+    a segment is older than `max_age` seconds, the oldest segments are evicted,
+    checked when a new segment is started and when records are read.
+
+    Args:
+        directory (str): The directory holding the segments and the checkpoint.
+        segment_max_bytes (int): The size at which a new segment is started.
+        max_bytes (int): The maximum total size of the segments.
+        max_age (float): The maximum age of a segment in seconds.
+        fsync_every (int): The number of appends between fsyncs.
+        fsync_interval (float): The maximum time between fsyncs in seconds.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = SPOOL_SEGMENT_BYTES,
+        max_bytes: int = SPOOL_MAX_BYTES,
+        max_age: float = SPOOL_MAX_AGE,
+        fsync_every: int = SPOOL_FSYNC_EVERY,
+        fsync_interval: float = SPOOL_FSYNC_INTERVAL,
+    ) -> None:
+        if segment_max_bytes <= 0 or max_bytes <= 0:
+            raise ValueError("Spool size limits must be positive")
+        if max_age <= 0:
+            raise ValueError("max_age must be positive")
+
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self.evicted_segments = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._segments: Dict[int, int] = {}
+        for name in os.listdir(directory):
+            if name.endswith(SEGMENT_SUFFIX):
+                seq = int(name[: -len(SEGMENT_SUFFIX)])
+                self._segments[seq] = os.path.getsize(self._segment_path(seq))
+
+        self._read_position = self._load_checkpoint()
+        for seq in [seq for seq in self._segments if seq < self._read_position[0]]:
+            self._remove_segment(seq)
+
+        # Never append to a segment left over from a previous run, its tail may be torn
+        self._write_seq = max(self._segments, default=self._read_position[0] - 1) + 1
+        self._writer = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @property
+    def size_bytes(self) -> int:
+        """The total size of the segments on disk."""
+        return sum(self._segments.values())
+
+    def append(self, event: EncryptedEvent) -> None:
+        """
+        Appends an encrypted event to the spool.
+
+        Args:
+            event (EncryptedEvent): The event to store.
+        """
+        line = event.model_dump_json(exclude_none=True).encode("utf-8") + b"\n"
+        with self._lock:
+            if self._writer is None or (
+                self._segments[self._write_seq] >= self.segment_max_bytes
+            ):
+                self._roll()
+            self._writer.write(line)
+            self._writer.flush()
+            self._segments[self._write_seq] += len(line)
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                self._sync()
+
+    def read(self, max_records: int) -> List[Tuple[EncryptedEvent, Position]]:
+        """
+        Reads unacknowledged records from the read position on, without consuming them.
+
+        Args:
+            max_records (int): The maximum number of records to return.
+
+        Returns:
+            List[Tuple[EncryptedEvent, Position]]: The records, each with the position
+                just after it, to be passed to `ack` once the record is delivered.
+        """
+        records: List[Tuple[EncryptedEvent, Position]] = []
+        with self._lock:
+            self._evict()
+            seq, offset = self._read_position
+            while len(records) < max_records:
+                if seq not in self._segments:
+                    later = [s for s in self._segments if s > seq]
+                    if not later:
+                        break
+                    seq, offset = min(later), 0
+
+                complete = True
+                with open(self._segment_path(seq), "rb") as segment:
+                    segment.seek(offset)
+                    for line in segment:
+                        if not line.endswith(b"\n"):
+                            complete = False
+                            break
+                        offset += len(line)
+                        try:
+                            event = EncryptedEvent.model_validate_json(line)
+                        except ValidationError as e:
+                            logger.warning("Skipping corrupt spool record: %s", e)
+                            continue
+                        records.append((event, (seq, offset)))
+                        if len(records) >= max_records:
+                            break
+
+                if len(records) >= max_records:
+                    break
+                if seq == self._write_seq and self._writer is not None:
+                    break
+                if not complete:
+                    logger.warning("Skipping torn record at the end of segment %s", seq)
+                later = [s for s in self._segments if s > seq]
+                if not later:
+                    break
+                seq, offset = min(later), 0
+        return records
+
+    def ack(self, position: Position) -> None:
+        """
+        Marks every record up to the position as delivered.
+
+        Args:
+            position (Position): A position returned by `read`.
+        """
+        with self._lock:
+            if position <= self._read_position:
+                return
+            self._read_position = position
+            for seq in [seq for seq in self._segments if seq < position[0]]:
+                self._remove_segment(seq)
+            self._save_checkpoint()
+
+    def sync(self, force: bool = False) -> None:
+        """
+        Fsyncs pending appends once `fsync_interval` has passed since the last fsync.
+
+        Args:
+            force (bool): Fsync regardless of the interval.
+        """
+        with self._lock:
+            if self._unsynced and (
+                force or time.monotonic() - self._last_sync >= self.fsync_interval
+            ):
+                self._sync()
+
+    def close(self) -> None:
+        """Fsyncs and closes the current segment."""
+        with self._lock:
+            if self._writer is not None:
+                self._sync()
+                self._writer.close()
+                self._writer = None
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:020d}{SEGMENT_SUFFIX}")
+
+    def _roll(self) -> None:
+        if self._writer is not None:
+            self._sync()
+            self._writer.close()
+            self._write_seq += 1
+        self._writer = open(self._segment_path(self._write_seq), "ab")
+        self._segments[self._write_seq] = 0
+        # Only whole segments are evicted, so the limits can only be crossed here
+        self._evict()
+
+    def _sync(self) -> None:
+        os.fsync(self._writer.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _remove_segment(self, seq: int) -> None:
+        try:
+            os.remove(self._segment_path(seq))
+        except FileNotFoundError:
+            pass
+        self._segments.pop(seq, None)
+
+    def _evict(self) -> None:
+        now = time.time()
+        for seq in sorted(self._segments):
+            if seq == self._write_seq and self._writer is not None:
+                break
+            over_size = sum(self._segments.values()) > self.max_bytes
+            try:
+                expired = now - os.path.getmtime(self._segment_path(seq)) > self.max_age
+            except FileNotFoundError:
+                expired = True
+            if not over_size and not expired:
+                break
+            logger.warning(
+                "Evicting spool segment %s (%s bytes)", seq, self._segments[seq]
+            )
+            self._remove_segment(seq)
+            self.evicted_segments += 1
+            if self._read_position[0] <= seq:
+                self._read_position = (seq + 1, 0)
+                self._save_checkpoint()
+
+    def _load_checkpoint(self) -> Position:
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as checkpoint:
+                seq, offset = checkpoint.read().split()
+                return int(seq), int(offset)
+        except FileNotFoundError:
+            return min(self._segments, default=0), 0
+        except ValueError:
+            logger.warning("Ignoring corrupt spool checkpoint %s", path)
+            return min(self._segments, default=0), 0
+
+    def _save_checkpoint(self) -> None:
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as checkpoint:
+            checkpoint.write(f"{self._read_position[0]} {self._read_position[1]}")
+        os.replace(tmp_path, path)
+
+
+class SpoolDrainer:
+    """
+    Background thread that delivers spooled events in order and acknowledges them.
+
+    When a send fails the drainer keeps the record and retries after
+    `retry_interval` seconds, so events survive outages and restarts. A record
+    the server rejects with a 4xx status other than 408 or 429 would fail
+    forever, so it is dropped and counted as `spool_rejected` instead of
+    blocking the records behind it.
+
+    Args:
+        spool (Spool): The spool to drain.
+        send (Callable[[EncryptedEvent], Any]): Delivers one event, raising on failure.
+        batch_size (int): The number of records read from the spool at a time.
+        retry_interval (float): The wait after a failed send, in seconds.
+        metrics (Optional[Metrics]): Counts the rejected records.
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        send: Callable[[EncryptedEvent], Any],
+        batch_size: int = SPOOL_DRAIN_BATCH,
+        retry_interval: float = SPOOL_RETRY_INTERVAL,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        self.spool = spool
+        self.send = send
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.metrics = resolve_metrics(metrics)
+        self.rejected = 0
+
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stopping = False
+        self._worker = threading.Thread(
+            target=self._run, name="telemetree-spool-drainer", daemon=True
+        )
+        self._worker.start()
+
+    def notify(self) -> None:
+        """Wakes the drainer after new records were appended."""
+        with self._lock:
+            self._generation += 1
+            self._idle.clear()
+        self._wake.set()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every spooled record has been delivered.
+
+        Args:
+            timeout (Optional[float]): The maximum time to wait in seconds.
+
+        Returns:
+            bool: True if the spool was drained within the timeout.
+        """
+        self.notify()
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the drainer. Undelivered records stay in the spool.
+
+        Args:
+            timeout (Optional[float]): The maximum time to wait for the thread in seconds.
+        """
+        self._stopping = True
+        self._wake.set()
+        self._worker.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.clear()
+            generation = self._generation
+            self.spool.sync()
+            records = self.spool.read(self.batch_size)
+            if not records:
+                with self._lock:
+                    # Only report idle if nothing was appended during this pass
+                    if generation == self._generation:
+                        self._idle.set()
+                self._wake.wait(self.spool.fsync_interval)
+                continue
+
+            if not self._deliver(records):
+                self._wake.wait(self.retry_interval)
+
+    def _deliver(self, records: List[Tuple[EncryptedEvent, Position]]) -> bool:
+        delivered: Optional[Position] = None
+        try:
+            for event, position in records:
+                if self._stopping:
+                    break
+                try:
+                    self.send(event)
+                except Exception as e:
+                    status_code = getattr(
+                        getattr(e, "response", None), "status_code", None
+                    )
+                    if status_code is None or not is_rejection(status_code):
+                        raise
+                    logger.error("Dropping spooled event rejected by the server: %s", e)
+                    self.rejected += 1
+                    self.metrics.increment("spool_rejected")
+                delivered = position
+            return True
+        except Exception as e:
+            logger.warning("Failed to deliver spooled event, retrying later: %s", e)
+            return False
+        finally:
+            if delivered is not None:
+                self.spool.ack(delivered)
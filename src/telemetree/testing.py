@@ -0,0 +1,190 @@
+from base64 import b64decode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+import gzip
+import json
+import logging
+import threading
+import time
+
+from telemetree.compression import Compression, decompress
+from telemetree.schemas import EncryptedEvent
+
+logger = logging.getLogger("telemetree.testing")
+
+
+class _PipelineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which Nagle would delay
+    disable_nagle_algorithm = True
+    server: "_PipelineServer"
+
+    def do_GET(self) -> None:
+        pipeline = self.server.pipeline
+        if not self.path.startswith(pipeline.CONFIG_PATH):
+            self._respond(404, {"error": "not found"})
+            return
+        self._respond(200, pipeline.config)
+
+    def do_POST(self) -> None:
+        pipeline = self.server.pipeline
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        if pipeline.latency:
+            time.sleep(pipeline.latency)
+        status = pipeline.record(dict(self.headers), body)
+        self._respond(status, {"status": "ok" if status < 400 else "error"})
+
+    def _respond(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _PipelineServer(ThreadingHTTPServer):
+    daemon_threads = True
+    pipeline: "MockPipeline"
+
+
+class MockPipeline:
+    """
+    A local stand-in for the Telemetree configuration service and ingestion
+    endpoint, for tests and benchmarks.
+
+    It serves a configuration holding its own RSA public key, accepts posted
+    events, and can decrypt them. Point a client at it with
+    `config_url=pipeline.config_url` and `config_cache=None`.
+
+    Args:
+        latency (float): Seconds to wait before answering each post.
+        statuses (Optional[List[int]]): Status codes to answer the first posts
+            with, one per post, before answering 200.
+        key_bits (int): The size of the generated RSA key.
+        config (Optional[Dict[str, Any]]): Extra configuration fields to serve.
+    """
+
+    CONFIG_PATH = "/config"
+    EVENTS_PATH = "/events"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        statuses: Optional[List[int]] = None,
+        key_bits: int = 2048,
+        config: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        import rsa
+
+        self.latency = latency
+        self.statuses = list(statuses or [])
+        self.public_key, self.private_key = rsa.newkeys(key_bits)
+        self.extra_config = dict(config or {})
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server: Optional[_PipelineServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def config_url(self) -> str:
+        return self.url + self.CONFIG_PATH
+
+    @property
+    def events_url(self) -> str:
+        return self.url + self.EVENTS_PATH
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return {
+            "public_key": self.public_key.save_pkcs1().decode("utf-8"),
+            "host": self.events_url,
+            **self.extra_config,
+        }
+
+    def start(self) -> "MockPipeline":
+        """Starts serving on a free local port."""
+        self._server = _PipelineServer(("127.0.0.1", 0), _PipelineHandler)
+        self._server.pipeline = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="telemetree-mock", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockPipeline":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def record(self, headers: Dict[str, str], body: bytes) -> int:
+        """Stores a posted request and returns the status to answer it with."""
+        with self._lock:
+            self.requests.append({"headers": headers, "body": body})
+            return self.statuses.pop(0) if self.statuses else 200
+
+    def reset(self) -> None:
+        """Forgets the received requests."""
+        with self._lock:
+            self.requests.clear()
+
+    def received(self) -> List[EncryptedEvent]:
+        """Returns the encrypted events posted so far."""
+        with self._lock:
+            bodies = [request["body"] for request in self.requests]
+        encrypted = []
+        for body in bodies:
+            document = json.loads(body)
+            # The body may be the event encoded once more as a JSON string
+            if isinstance(document, str):
+                document = json.loads(document)
+            encrypted.append(EncryptedEvent(**document))
+        return encrypted
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Decrypts the posted events, flattening batches."""
+        events = []
+        for encrypted in self.received():
+            payload = json.loads(self.decrypt(encrypted))
+            if isinstance(payload, list):
+                events.extend(payload)
+            else:
+                events.append(payload)
+        return events
+
+    def decrypt(self, encrypted: EncryptedEvent) -> bytes:
+        """Decrypts and decompresses the body of one encrypted event."""
+        import rsa
+        from Crypto.Cipher import AES
+        from Crypto.Util.Padding import unpad
+
+        key = bytes.fromhex(
+            rsa.decrypt(b64decode(encrypted.key), self.private_key).decode()
+        )
+        iv = bytes.fromhex(
+            rsa.decrypt(b64decode(encrypted.iv), self.private_key).decode()
+        )
+        cipher = AES.new(key, AES.MODE_CBC, iv)
+        body = unpad(cipher.decrypt(b64decode(encrypted.body)), AES.block_size)
+        if encrypted.compression:
+            body = decompress(body, Compression(encrypted.compression))
+        return body
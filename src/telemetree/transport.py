@@ -0,0 +1,318 @@
+from abc import ABC, abstractmethod
+from enum import Enum
+from socket import timeout as socket_timeout
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+import json
+import logging
+import threading
+
+from telemetree.constants import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE
+
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+# requests and httpx are imported on first use to keep `import telemetree` cheap
+
+logger = logging.getLogger("telemetree.transport")
+
+Timeout = Tuple[float, float]
+
+
+class TransportKind(Enum):
+    REQUESTS = "requests"
+    HTTP2 = "http2"
+    MEMORY = "memory"
+
+
+class TransportErrors(NamedTuple):
+    """
+    The exception types a transport raises, for HttpClient to classify failures.
+
+    Attributes:
+        status: Raised by `raise_for_status()` on an error status. It has the
+            response as its `response` attribute.
+        connect: The request failed before reaching the server.
+        timeout: The request timed out, or the connection broke, after it may
+            have reached the server.
+        other: Any other failure of the transport.
+    """
+
+    status: Type[BaseException]
+    connect: Tuple[Type[BaseException], ...]
+    timeout: Tuple[Type[BaseException], ...]
+    other: Tuple[Type[BaseException], ...]
+
+
+class Transport(ABC):
+    """
+    Sends the requests of an HttpClient.
+
+    Responses must have `status_code`, `headers`, `json()` and
+    `raise_for_status()`, like those of requests and httpx.
+    """
+
+    errors: TransportErrors
+
+    @abstractmethod
+    def get(self, url: str, headers: Dict[str, str], timeout: Timeout) -> Any:
+        """Sends a GET request and returns the response."""
+
+    @abstractmethod
+    def post(
+        self, url: str, headers: Dict[str, str], body: bytes, timeout: Timeout
+    ) -> Any:
+        """Sends a POST request with a JSON body and returns the response."""
+
+    def close(self) -> None:
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    HTTP/1.1 over a pooled requests session, keeping connections alive.
+
+    Args:
+        pool_connections (int): The number of hosts to keep connection pools for.
+        pool_maxsize (int): The maximum number of connections kept per host.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+    ) -> None:
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._session: Optional["requests.Session"] = None
+        self._errors: Optional[TransportErrors] = None
+
+    @property
+    def errors(self) -> TransportErrors:
+        if self._errors is None:
+            import requests
+
+            self._errors = TransportErrors(
+                status=requests.exceptions.HTTPError,
+                connect=(requests.exceptions.ConnectionError,),
+                timeout=(requests.exceptions.Timeout, socket_timeout),
+                other=(requests.exceptions.RequestException,),
+            )
+        return self._errors
+
+    @property
+    def session(self) -> "requests.Session":
+        """The pooled session, created on first use."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            adapter = HTTPAdapter(
+                pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    @session.setter
+    def session(self, session: "requests.Session") -> None:
+        self._session = session
+
+    def get(self, url: str, headers: Dict[str, str], timeout: Timeout) -> Any:
+        return self.session.get(url, headers=headers, timeout=timeout)
+
+    def post(
+        self, url: str, headers: Dict[str, str], body: bytes, timeout: Timeout
+    ) -> Any:
+        return self.session.post(url, headers=headers, timeout=timeout, data=body)
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+
+
+class Http2Transport(Transport):
+    """
+    HTTP/2 through httpx, multiplexing concurrent requests over one connection
+    per host, so threads sending at once share it instead of opening a socket
+    each. HTTP/2 is negotiated over TLS; plain http URLs use HTTP/1.1.
+
+    Needs the optional h2 package: `pip install telemetree[http2]`.
+
+    Args:
+        max_connections (int): The maximum number of open connections.
+    """
+
+    def __init__(self, max_connections: int = HTTP_POOL_MAXSIZE) -> None:
+        import httpx
+
+        try:
+            import h2  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "The HTTP/2 transport needs the h2 package: "
+                "pip install telemetree[http2]"
+            ) from e
+
+        self.max_connections = max_connections
+        self.errors = TransportErrors(
+            status=httpx.HTTPStatusError,
+            connect=(httpx.ConnectError, httpx.ConnectTimeout),
+            timeout=(httpx.TransportError,),
+            other=(httpx.HTTPError,),
+        )
+        self._client: Optional["httpx.Client"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> "httpx.Client":
+        """The httpx client, created on first use."""
+        if self._client is None:
+            import httpx
+
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        http2=True,
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_connections,
+                        ),
+                    )
+        return self._client
+
+    def get(self, url: str, headers: Dict[str, str], timeout: Timeout) -> Any:
+        return self.client.get(url, headers=headers, timeout=_httpx_timeout(timeout))
+
+    def post(
+        self, url: str, headers: Dict[str, str], body: bytes, timeout: Timeout
+    ) -> Any:
+        return self.client.post(
+            url, headers=headers, content=body, timeout=_httpx_timeout(timeout)
+        )
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+
+
+def _httpx_timeout(timeout: Timeout) -> "httpx.Timeout":
+    import httpx
+
+    connect, read = timeout
+    return httpx.Timeout(read, connect=connect)
+
+
+class HTTPStatusError(Exception):
+    """An error status answered by a MemoryTransport handler."""
+
+    def __init__(self, message: str, response: "MemoryResponse") -> None:
+        super().__init__(message)
+        self.response = response
+
+
+class MemoryConnectionError(Exception):
+    """Raised by a MemoryTransport handler to simulate an unreachable server."""
+
+
+class MemoryResponse:
+    def __init__(
+        self, status_code: int, payload: Any, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def json(self) -> Any:
+        return self.payload
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise HTTPStatusError(f"{self.status_code} error", self)
+
+
+class MemoryRequest(NamedTuple):
+    method: str
+    url: str
+    headers: Dict[str, str]
+    body: Optional[bytes]
+
+
+# Answers a request with a status code and a JSON payload
+MemoryHandler = Callable[[MemoryRequest], Tuple[int, Any]]
+
+
+class MemoryTransport(Transport):
+    """
+    Keeps requests in memory instead of sending them, for tests.
+
+    Every request is recorded in `requests` and answered by the handler, by
+    default with 200 and `{"status": "ok"}`. A handler may raise
+    `MemoryConnectionError` to simulate an unreachable server.
+
+    Args:
+        handler (Optional[MemoryHandler]): Answers each request with a status
+            code and a JSON payload.
+    """
+
+    def __init__(self, handler: Optional[MemoryHandler] = None) -> None:
+        self.handler = handler or (lambda request: (200, {"status": "ok"}))
+        self.errors = TransportErrors(
+            status=HTTPStatusError,
+            connect=(MemoryConnectionError,),
+            timeout=(),
+            other=(),
+        )
+        self.requests: List[MemoryRequest] = []
+        self._lock = threading.Lock()
+
+    def get(self, url: str, headers: Dict[str, str], timeout: Timeout) -> Any:
+        return self._handle(MemoryRequest("GET", url, dict(headers), None))
+
+    def post(
+        self, url: str, headers: Dict[str, str], body: bytes, timeout: Timeout
+    ) -> Any:
+        return self._handle(MemoryRequest("POST", url, dict(headers), bytes(body)))
+
+    def _handle(self, request: MemoryRequest) -> MemoryResponse:
+        with self._lock:
+            self.requests.append(request)
+        status_code, payload = self.handler(request)
+        # Round trip the payload like a real response body
+        return MemoryResponse(status_code, json.loads(json.dumps(payload)))
+
+
+def create_transport(
+    transport: Union[TransportKind, str, Transport],
+    pool_connections: int = HTTP_POOL_CONNECTIONS,
+    pool_maxsize: int = HTTP_POOL_MAXSIZE,
+) -> Transport:
+    """
+    Returns the transport itself, or a new transport of the given kind.
+
+    Args:
+        transport (Union[TransportKind, str, Transport]): A transport or its kind.
+        pool_connections (int): The number of hosts to keep connection pools for.
+        pool_maxsize (int): The maximum number of connections kept per host.
+    """
+    if hasattr(transport, "post"):
+        return transport
+    kind = TransportKind(transport)
+    if kind is TransportKind.HTTP2:
+        return Http2Transport(max_connections=pool_maxsize)
+    if kind is TransportKind.MEMORY:
+        return MemoryTransport()
+    return RequestsTransport(pool_connections, pool_maxsize)
@@ -1,4 +1,11 @@
+from typing import Iterable, Iterator, List, TypeVar
 from uuid import UUID
+import logging
+
+logger = logging.getLogger("telemetree.utils")
+
+# A serialized event, as str or as UTF-8 bytes
+Payload = TypeVar("Payload", str, bytes)
 
 
 def validate_uuid(uuid_str: str) -> str:
@@ -7,3 +14,51 @@ def validate_uuid(uuid_str: str) -> str:
         return uuid_str
     except ValueError:
         raise ValueError("Invalid key format.")
+
+
+def chunk_payloads(
+    payloads: Iterable[Payload], max_events: int, max_bytes: int
+) -> Iterator[List[Payload]]:
+    """
+    Groups serialized events into chunks that fit in one batch request.
+
+    A single payload larger than `max_bytes` is yielded as a chunk of its own.
+
+    Args:
+        payloads (Iterable[Payload]): The serialized events.
+        max_events (int): The maximum number of events per chunk.
+        max_bytes (int): The maximum size of a serialized chunk in bytes.
+
+    Yields:
+        List[Payload]: The serialized events of one chunk.
+    """
+    if max_events <= 0 or max_bytes <= 0:
+        raise ValueError("Batch limits must be positive")
+
+    chunk: List[Payload] = []
+    # Account for the enclosing brackets and the separating commas
+    size = 2
+    for payload in payloads:
+        payload_size = (
+            len(payload) if isinstance(payload, bytes) else len(payload.encode("utf-8"))
+        ) + 1
+        if chunk and (len(chunk) >= max_events or size + payload_size > max_bytes):
+            yield chunk
+            chunk, size = [], 2
+        if payload_size + 2 > max_bytes:
+            logger.warning(
+                "Event of %s bytes exceeds the batch limit of %s bytes",
+                payload_size,
+                max_bytes,
+            )
+        chunk.append(payload)
+        size += payload_size
+    if chunk:
+        yield chunk
+
+
+def serialize_batch(payloads: List[Payload]) -> Payload:
+    """Joins serialized events into a JSON array."""
+    if payloads and isinstance(payloads[0], bytes):
+        return b"[" + b",".join(payloads) + b"]"
+    return "[" + ",".join(payloads) + "]"
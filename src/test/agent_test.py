@@ -0,0 +1,129 @@
+import io
+import json
+import struct
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.telemetree.agent import Agent, encode_frames, read_frames
+from src.telemetree.client import Telemetree
+from src.telemetree.sessions import SessionTracker
+from src.telemetree.testing import MockPipeline
+from src.test.client_test import API_KEY, PROJECT_ID
+
+
+def test_frames_round_trip():
+    payloads = [b'{"event_type":"message"}', b"", '{"username":"Ω"}'.encode()]
+    assert list(read_frames(io.BytesIO(encode_frames(payloads)))) == payloads
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"\x00\x00", struct.pack(">I", 10) + b"short", struct.pack(">I", 2048)],
+)
+def test_bad_frames_are_rejected(data):
+    with pytest.raises(ValueError):
+        list(read_frames(io.BytesIO(data), max_bytes=1024))
+
+
+def test_agent_delivers_the_events_of_all_workers(tmp_path):
+    socket_path = str(tmp_path / "agent.sock")
+    with MockPipeline(key_bits=512) as pipeline:
+        client = Telemetree(
+            API_KEY,
+            PROJECT_ID,
+            batching=True,
+            config_url=pipeline.config_url,
+            config_cache=None,
+        )
+        agent = Agent(socket_path, client).start()
+        workers = [
+            Telemetree(API_KEY, PROJECT_ID, agent_socket=socket_path) for _ in range(2)
+        ]
+        try:
+            for i, worker in enumerate(workers):
+                assert (
+                    worker.track({"event_type": "message", "telegram_id": i + 1})
+                    is None
+                )
+                assert worker.config is None
+            workers[0].track_many(
+                [
+                    {"event_type": "/start", "telegram_id": 3},
+                    {"event_type": "/help", "telegram_id": 4},
+                ]
+            )
+            for worker in workers:
+                worker.close()
+            # Wait for the agent to read everything the workers wrote
+            for _ in range(100):
+                if agent.received == 4:
+                    break
+                time.sleep(0.01)
+        finally:
+            agent.stop()
+
+        events = pipeline.events()
+    assert sorted(event["telegram_id"] for event in events) == [1, 2, 3, 4]
+    assert len(pipeline.requests) == 1
+
+
+def test_worker_raises_when_the_agent_is_unreachable(tmp_path):
+    worker = Telemetree(
+        API_KEY, PROJECT_ID, agent_socket=str(tmp_path / "missing.sock")
+    )
+    with pytest.raises(ConnectionError):
+        worker.track({"event_type": "message", "telegram_id": 1})
+
+
+def test_agent_assigns_one_session_per_user_across_workers(tmp_path):
+    socket_path = str(tmp_path / "agent.sock")
+    client = SimpleNamespace(
+        dispatcher=MagicMock(), sessions=SessionTracker(), close=MagicMock()
+    )
+    agent = Agent(socket_path, client).start()
+    workers = [
+        Telemetree(API_KEY, PROJECT_ID, agent_socket=socket_path) for _ in range(2)
+    ]
+    try:
+        for worker in workers:
+            assert worker.sessions is None
+            worker.track({"event_type": "message", "telegram_id": 7})
+        workers[0].track({"event_type": "message", "telegram_id": 7, "session_id": 5})
+        for worker in workers:
+            worker.close()
+        for _ in range(100):
+            if agent.received == 3:
+                break
+            time.sleep(0.01)
+    finally:
+        agent.stop()
+
+    events = [
+        json.loads(call.args[0].to_json())
+        for call in client.dispatcher.submit.call_args_list
+    ]
+    sessions = sorted(event["session_id"] for event in events)
+    assert sessions[0] == 5
+    assert sessions[1] == sessions[2] == client.sessions.session_id(7)
+
+
+@pytest.mark.parametrize(
+    "frame",
+    [
+        b'{"telegram_id":7,"session_id":0}',
+        b'{"session_id":0,"telegram_id":7}',
+        b'{"telegram_id":7, "session_id": 0 }',
+    ],
+)
+def test_agent_assigns_sessions_wherever_the_field_is(tmp_path, frame):
+    client = SimpleNamespace(
+        dispatcher=MagicMock(), sessions=SessionTracker(), close=MagicMock()
+    )
+    agent = Agent(str(tmp_path / "agent.sock"), client)
+    agent.submit(frame)
+    (call,) = client.dispatcher.submit.call_args_list
+    event = json.loads(call.args[0].to_json())
+    assert event["session_id"] == client.sessions.session_id(7) != 0
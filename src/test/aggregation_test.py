@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from src.telemetree.aggregation import Aggregator
+from src.telemetree.schemas import Event, TrustedEvent
+
+
+class Collector:
+    def __init__(self):
+        self.batches = []
+        self.sent = threading.Event()
+
+    def __call__(self, events):
+        self.batches.append(events)
+        self.sent.set()
+
+
+def click(telegram_id: int = 1, **fields) -> Event:
+    return Event(event_type="button_clicked", telegram_id=telegram_id, **fields)
+
+
+def test_identical_events_are_folded_with_a_count():
+    collector = Collector()
+    aggregator = Aggregator(collector, ["button_clicked"])
+    original = click()
+    for _ in range(3):
+        aggregator.add(original)
+    aggregator.add(click(telegram_id=2))
+    aggregator.add(click(language="en"))
+    aggregator.flush()
+
+    (events,) = collector.batches
+    assert {(event.telegram_id, event.language, event.count) for event in events} == {
+        (1, None, 3),
+        (1, "en", 1),
+        (2, None, 1),
+    }
+    assert original.count is None
+    aggregator.close()
+
+
+def test_dimensions_limit_the_compared_fields():
+    collector = Collector()
+    aggregator = Aggregator(collector, ["button_clicked"], dimensions=())
+    aggregator.add(click(language="en"))
+    aggregator.add(TrustedEvent("button_clicked", 1, language="ru", count=4))
+    aggregator.flush()
+    ((event,),) = collector.batches
+    assert event.count == 5
+    aggregator.close()
+
+
+def test_window_close_sends_the_events():
+    collector = Collector()
+    aggregator = Aggregator(collector, ["button_clicked"], window=0.05)
+    aggregator.add(click())
+    assert collector.sent.wait(2)
+    assert collector.batches[0][0].count == 1
+    aggregator.close()
+
+
+def test_full_table_is_sent_early():
+    collector = Collector()
+    aggregator = Aggregator(collector, ["button_clicked"], max_keys=2)
+    for telegram_id in range(1, 4):
+        aggregator.add(click(telegram_id))
+    assert [len(batch) for batch in collector.batches] == [2]
+    aggregator.close()
+    assert [len(batch) for batch in collector.batches] == [2, 1]
+
+
+def test_add_after_close_fails():
+    aggregator = Aggregator(Collector(), ["button_clicked"])
+    aggregator.close()
+    with pytest.raises(RuntimeError):
+        aggregator.add(click())
+
+
+def test_unknown_dimension_is_rejected():
+    with pytest.raises(ValueError):
+        Aggregator(Collector(), ["button_clicked"], dimensions=["color"])
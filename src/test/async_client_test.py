@@ -0,0 +1,171 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from rsa import newkeys
+
+from src.telemetree.async_client import AsyncTelemetree
+from src.telemetree.config import Config, ConfigCache
+from src.telemetree.dedup import Deduplicator
+from src.telemetree.http_client import AsyncHttpClient
+from src.telemetree.metrics import Metrics
+
+
+API_KEY = "a1b2c3d4-e5f6-4a7b-8c9d-0e1f2a3b4c5d"
+PROJECT_ID = "f0e1d2c3-b4a5-4968-8776-655443322110"
+
+public_key, private_key = newkeys(512)
+
+
+class FakeTelemetree:
+    def __init__(self):
+        self.config_requests = []
+        self.events = []
+        self.public_key = public_key
+        self.host = "https://pipeline.test/events"
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host == "config.ton.solutions":
+            self.config_requests.append(request)
+            return httpx.Response(
+                200,
+                json={
+                    "public_key": self.public_key.save_pkcs1().decode("utf-8"),
+                    "host": self.host,
+                },
+            )
+        self.events.append(json.loads(json.loads(request.content)))
+        return httpx.Response(200, json={"status": "ok"})
+
+
+@pytest.fixture
+def server():
+    return FakeTelemetree()
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault("config_cache", None)
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    return AsyncTelemetree(API_KEY, PROJECT_ID, http_client=http_client, **kwargs)
+
+
+def test_construction_does_not_fetch_config(server):
+    client = make_client(server)
+    assert client.encryption_service is None
+    assert server.config_requests == []
+
+
+def test_create_fetches_config(server):
+    async def scenario():
+        client = await AsyncTelemetree.create(
+            API_KEY,
+            PROJECT_ID,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(server)),
+            config_cache=None,
+        )
+        await client.aclose()
+        return client
+
+    client = asyncio.run(scenario())
+    assert client.host == "https://pipeline.test/events"
+    assert len(server.config_requests) == 1
+    assert server.config_requests[0].url.params["project"] == PROJECT_ID
+
+
+def test_track_sends_encrypted_event(server):
+    async def scenario():
+        async with make_client(server) as client:
+            return await client.track({"event_type": "message", "telegram_id": 1})
+
+    assert asyncio.run(scenario()) == {"status": "ok"}
+    assert len(server.events) == 1
+    assert set(server.events[0]) == {"key", "iv", "body"}
+
+
+def test_track_many_fetches_config_once(server):
+    async def scenario():
+        client = make_client(server, max_concurrency=2, batch_max_events=2)
+        responses = await client.track_many(
+            {"event_type": "message", "telegram_id": telegram_id}
+            for telegram_id in range(1, 6)
+        )
+        await client.aclose()
+        return responses
+
+    assert asyncio.run(scenario()) == [{"status": "ok"}] * 3
+    assert len(server.config_requests) == 1
+    assert len(server.events) == 3
+
+
+def test_client_built_outside_a_loop_runs_on_later_loops(server):
+    client = make_client(server)
+    event = {"event_type": "message", "telegram_id": 1}
+
+    asyncio.run(client.track(event))
+    # The transport is bound to the first loop, the lock must not be
+    client.http_client.client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    asyncio.run(client.track(event))
+    assert len(server.config_requests) == 1
+    assert len(server.events) == 2
+
+
+def test_rotated_config_is_picked_up(server):
+    client = make_client(server, config_cache=ConfigCache(ttl=0, stale_ttl=0))
+    rotated_public_key, _ = newkeys(512)
+
+    async def scenario():
+        await client.track({"event_type": "message", "telegram_id": 1})
+        server.public_key = rotated_public_key
+        server.host = "https://pipeline.test/rotated"
+        await client.track({"event_type": "message", "telegram_id": 2})
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert client.http_client.url == "https://pipeline.test/rotated"
+    assert client.public_key == rotated_public_key.save_pkcs1().decode("utf-8")
+
+
+def test_track_many_validates_before_sending(server):
+    async def scenario():
+        async with make_client(server) as client:
+            await client.track_many(
+                [{"event_type": "message", "telegram_id": 1}, {"event_type": "x"}]
+            )
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+    assert server.events == []
+
+
+def test_config_create_async(server):
+    async def scenario():
+        http_client = AsyncHttpClient(
+            API_KEY,
+            PROJECT_ID,
+            client=httpx.AsyncClient(transport=httpx.MockTransport(server)),
+        )
+        config = await Config.create_async(http_client)
+        await http_client.aclose()
+        return config
+
+    config = asyncio.run(scenario())
+    assert config.get_host() == "https://pipeline.test/events"
+
+
+def test_redelivered_updates_are_tracked_once(server):
+    update = {
+        "update_id": 7,
+        "message": {"from": {"id": 5, "first_name": "A"}, "text": "/start"},
+    }
+    metrics = Metrics()
+
+    async def scenario():
+        async with make_client(
+            server, deduplicator=Deduplicator(), metrics=metrics
+        ) as client:
+            return [await client.track_update(update) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [{"status": "ok"}, None]
+    assert len(server.events) == 1
+    assert metrics.snapshot()["events_tracked"] == 2
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from src.telemetree.cli import ReplayReport, load_records, main
+
+
+def write_records(path, records):
+    with open(path, "w", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+        file.write("\n")
+    return str(path)
+
+
+def update(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "from": {"id": user_id, "is_bot": False, "first_name": "Test"},
+            "chat": {"id": user_id, "type": "private"},
+            "date": 1700000000,
+            "text": "hello",
+        },
+    }
+
+
+def replay(capsys, *argv) -> dict:
+    code = main(["replay", *argv, "--mock", "--mock-key-bits", "512", "--json"])
+    report = json.loads(capsys.readouterr().out)
+    assert code == 0
+    return report
+
+
+def test_replays_events_and_updates(tmp_path, capsys):
+    events = [{"event_type": "message", "telegram_id": i} for i in range(1, 21)]
+    updates = [update(i, 100 + i) for i in range(1, 6)]
+    path = write_records(tmp_path / "records.jsonl", events + updates)
+
+    report = replay(capsys, path)
+    assert report["events"] == report["calls"] == 25
+    assert report["errors"] == 0
+    assert report["http_requests"] >= 20
+    assert report["events_per_second"] > 0
+    assert report["cpu_seconds_per_event"] > 0
+    latency = report["latency_seconds"]
+    assert 0 < latency["p50"] <= latency["p99"] <= latency["max"]
+
+
+def test_replays_in_batches(tmp_path, capsys):
+    events = [{"event_type": "message", "telegram_id": i} for i in range(1, 31)]
+    path = write_records(tmp_path / "events.jsonl", events)
+
+    report = replay(capsys, path, "--batch-size", "10", "--repeat", "2")
+    assert (report["events"], report["calls"], report["errors"]) == (60, 6, 0)
+
+
+def test_paces_calls_at_the_target_rate(tmp_path, capsys):
+    events = [{"event_type": "message", "telegram_id": i} for i in range(1, 11)]
+    path = write_records(tmp_path / "events.jsonl", events)
+
+    report = replay(capsys, path, "--rate", "50", "--batching")
+    # The last of 10 calls starts 9 / 50 seconds after the first
+    assert report["elapsed_seconds"] >= 0.18
+    assert report["events"] == 10
+
+
+def test_replays_other_records_as_synthetic_events(tmp_path, capsys):
+    records = [{"request_id": f"user-{i:03d}", "title": "t"} for i in range(1, 6)]
+    path = write_records(tmp_path / "requests.jsonl", records)
+
+    report = replay(capsys, path, "--event-type", "request")
+    assert (report["events"], report["errors"]) == (5, 0)
+
+
+def test_load_records_rejects_non_objects(tmp_path):
+    path = write_records(tmp_path / "records.jsonl", [{"event_type": "a"}, [1, 2]])
+    assert load_records(path, limit=1) == [{"event_type": "a"}]
+    with pytest.raises(ValueError):
+        load_records(path)
+
+
+def test_report_percentiles():
+    report = ReplayReport(100, 100, 5, 2.0, 0.5, [i / 100 for i in range(1, 101)], {})
+    assert report.percentile(0.5) == 0.5
+    assert report.percentile(0.99) == 0.99
+    assert report.throughput == 50
+    assert report.error_rate == 0.05
+
+
+def test_credentials_are_required_without_the_mock(tmp_path, monkeypatch):
+    monkeypatch.delenv("TELEMETREE_API_KEY", raising=False)
+    monkeypatch.delenv("TELEMETREE_PROJECT_ID", raising=False)
+    path = write_records(tmp_path / "events.jsonl", [])
+    with pytest.raises(SystemExit):
+        main(["replay", path])
@@ -0,0 +1,313 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from base64 import b64decode
+from unittest.mock import MagicMock, patch
+
+import pytest
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import unpad
+from rsa import decrypt, newkeys
+
+from src.telemetree.client import Telemetree
+from src.telemetree.compression import Compression, decompress
+from src.telemetree.dedup import Deduplicator
+from src.telemetree.metrics import Metrics
+from src.telemetree.sampling import Sampler, SamplingRule
+from src.telemetree.config import ConfigCache
+
+
+API_KEY = "a1b2c3d4-e5f6-4a7b-8c9d-0e1f2a3b4c5d"
+PROJECT_ID = "f0e1d2c3-b4a5-4968-8776-655443322110"
+
+public_key, private_key = newkeys(512)
+
+config_response = {
+    "public_key": public_key.save_pkcs1().decode("utf-8"),
+    "host": "https://pipeline.test/events",
+}
+
+
+def decrypt_payload(encrypted_event, raw: bool = False):
+    key = bytes.fromhex(decrypt(b64decode(encrypted_event.key), private_key).decode())
+    iv = bytes.fromhex(decrypt(b64decode(encrypted_event.iv), private_key).decode())
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    body = unpad(cipher.decrypt(b64decode(encrypted_event.body)), AES.block_size)
+    return body if raw else json.loads(body)
+
+
+def make_client(**kwargs) -> Telemetree:
+    kwargs.setdefault("config_cache", None)
+    with patch("telemetree.http_client.HttpClient.get", return_value=config_response):
+        client = Telemetree(API_KEY, PROJECT_ID, **kwargs)
+    client.http_client.post = MagicMock(return_value={"status": "ok"})
+    return client
+
+
+def test_track_sends_synchronously_by_default():
+    client = make_client()
+    response = client.track({"event_type": "message", "telegram_id": 1})
+    assert response == {"status": "ok"}
+    assert client.http_client.post.call_count == 1
+    assert client.http_client.url == config_response["host"]
+
+
+def test_track_rejects_invalid_event():
+    client = make_client()
+    with pytest.raises(ValueError):
+        client.track({"event_type": "message"})
+    client.http_client.post.assert_not_called()
+
+
+def test_track_in_batching_mode_queues_and_flushes():
+    client = make_client(batching=True, flush_size=10, flush_interval=60)
+    for telegram_id in range(1, 4):
+        assert (
+            client.track({"event_type": "message", "telegram_id": telegram_id}) is None
+        )
+    assert client.flush(timeout=5)
+    assert client.http_client.post.call_count == 1
+    client.close()
+
+
+def test_close_sends_pending_events():
+    client = make_client(batching=True, flush_size=10, flush_interval=60)
+    client.track({"event_type": "message", "telegram_id": 1})
+    client.close()
+    assert client.http_client.post.call_count == 1
+
+
+def test_context_manager_closes_http_session():
+    with make_client() as client:
+        client.http_client.session = MagicMock()
+    client.http_client.session.close.assert_called_once()
+
+
+def test_track_many_sends_one_encrypted_batch():
+    client = make_client()
+    responses = client.track_many(
+        {"event_type": "message", "telegram_id": telegram_id}
+        for telegram_id in range(1, 4)
+    )
+    assert responses == [{"status": "ok"}]
+    (encrypted_event,), _ = client.http_client.post.call_args
+    payload = decrypt_payload(encrypted_event)
+    assert [event["telegram_id"] for event in payload] == [1, 2, 3]
+
+
+def test_track_many_chunks_by_event_count():
+    client = make_client(batch_max_events=2)
+    responses = client.track_many(
+        {"event_type": "message", "telegram_id": telegram_id}
+        for telegram_id in range(1, 6)
+    )
+    assert len(responses) == 3
+    assert client.http_client.post.call_count == 3
+
+
+def test_track_many_validates_before_sending():
+    client = make_client()
+    with pytest.raises(ValueError):
+        client.track_many([{"event_type": "message", "telegram_id": 1}, {}])
+    client.http_client.post.assert_not_called()
+
+
+def test_spool_mode_persists_then_delivers(tmp_path):
+    client = make_client(spool_dir=str(tmp_path))
+    assert client.track({"event_type": "message", "telegram_id": 1}) is None
+    assert client.track_many([{"event_type": "message", "telegram_id": 2}]) is None
+    assert client.flush(timeout=5)
+    assert client.http_client.post.call_count == 2
+    client.close()
+
+
+def test_track_many_with_thread_pool_encryption():
+    client = make_client(
+        encryption_executor="thread", encryption_workers=2, batch_max_events=1
+    )
+    responses = client.track_many(
+        {"event_type": "message", "telegram_id": telegram_id}
+        for telegram_id in range(1, 5)
+    )
+    assert len(responses) == 4
+    sent = [call.args[0] for call in client.http_client.post.call_args_list]
+    assert [decrypt_payload(event)[0]["telegram_id"] for event in sent] == [1, 2, 3, 4]
+    client.close()
+
+
+def test_rotated_public_key_is_picked_up():
+    cache = ConfigCache(ttl=0, stale_ttl=0)
+    client = make_client(config_cache=cache)
+    rotated_public_key, rotated_private_key = newkeys(512)
+    rotated = {
+        "public_key": rotated_public_key.save_pkcs1().decode("utf-8"),
+        "host": "https://pipeline.test/rotated",
+    }
+    with patch("telemetree.http_client.HttpClient.get", return_value=rotated):
+        client.track({"event_type": "message", "telegram_id": 1})
+    assert client.http_client.url == rotated["host"]
+    (encrypted_event,), _ = client.http_client.post.call_args
+    key = decrypt(b64decode(encrypted_event.key), rotated_private_key)
+    assert len(bytes.fromhex(key.decode())) == 16
+
+
+def test_lazy_client_initializes_on_first_track():
+    with patch(
+        "telemetree.http_client.HttpClient.get", return_value=config_response
+    ) as get:
+        client = Telemetree(API_KEY, PROJECT_ID, lazy=True, config_cache=None)
+        assert get.call_count == 0
+        assert client.encryption_service is None
+        client.http_client.post = MagicMock(return_value={"status": "ok"})
+        assert client.track({"event_type": "message", "telegram_id": 1}) == {
+            "status": "ok"
+        }
+        assert get.call_count == 1
+
+
+def test_lazy_batching_client_does_not_initialize_on_track():
+    with patch(
+        "telemetree.http_client.HttpClient.get", return_value=config_response
+    ) as get:
+        client = Telemetree(
+            API_KEY,
+            PROJECT_ID,
+            lazy=True,
+            batching=True,
+            flush_interval=60,
+            config_cache=None,
+        )
+        client.http_client.post = MagicMock(return_value={"status": "ok"})
+        client.track({"event_type": "message", "telegram_id": 1})
+        assert get.call_count == 0
+        client.close()
+        assert get.call_count == 1
+    assert client.http_client.post.call_count == 1
+
+
+def test_warmup_initializes_in_background():
+    with patch("telemetree.http_client.HttpClient.get", return_value=config_response):
+        client = Telemetree(
+            API_KEY, PROJECT_ID, lazy=True, warmup=True, config_cache=None
+        )
+        for _ in range(500):
+            if client.encryption_service is not None:
+                break
+            time.sleep(0.01)
+    assert client.encryption_service is not None
+
+
+def test_import_does_not_load_heavy_dependencies():
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "import sys, logging, telemetree; "
+        "heavy = [m for m in ('pydantic', 'requests', 'httpx', 'rsa', 'Crypto') "
+        "if m in sys.modules]; "
+        "assert not heavy, heavy; "
+        "assert not logging.getLogger().handlers"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        env={**os.environ, "PYTHONPATH": src_dir},
+    )
+
+
+def test_track_many_without_validation_sends_the_same_events():
+    client = make_client(validate_events=False)
+    events = [{"event_type": "message", "telegram_id": 1}]
+    client.track_many(events)
+    (encrypted_event,), _ = client.http_client.post.call_args
+    (event,) = decrypt_payload(encrypted_event)
+    assert event["telegram_id"] == 1
+    assert event["application_id"] == PROJECT_ID
+    assert event["event_source"] == "python_SDK"
+    assert "application_id" not in events[0]
+
+
+def test_track_update_sends_selected_updates_only():
+    client = make_client()
+    update = {
+        "update_id": 1,
+        "message": {"from": {"id": 5, "first_name": "A"}, "text": "/start"},
+    }
+    assert client.track_update(update) == {"status": "ok"}
+    assert client.track_update({"update_id": 2, "message": {"text": "hi"}}) is None
+    (encrypted_event,), _ = client.http_client.post.call_args
+    event = decrypt_payload(encrypted_event)
+    assert event["event_type"] == "/start"
+    assert event["telegram_id"] == 5
+    assert client.http_client.post.call_count == 1
+
+
+def test_track_many_compresses_when_the_pipeline_accepts_it():
+    client = make_client()
+    client.config.config.compression = ["zlib"]
+    client.track_many(
+        {"event_type": "message", "telegram_id": telegram_id}
+        for telegram_id in range(1, 4)
+    )
+    (encrypted_event,), _ = client.http_client.post.call_args
+    assert encrypted_event.compression == "zlib"
+    compressed = decrypt_payload(encrypted_event, raw=True)
+    payload = json.loads(decompress(compressed, Compression.ZLIB))
+    assert [event["telegram_id"] for event in payload] == [1, 2, 3]
+
+
+def test_sampled_out_events_are_not_sent():
+    client = make_client(sampler=Sampler({"message": SamplingRule(rate=0)}))
+    assert client.track({"event_type": "message", "telegram_id": 1}) is None
+    client.track_many([{"event_type": "purchase", "telegram_id": 1}])
+    (encrypted_event,), _ = client.http_client.post.call_args
+    assert [event["event_type"] for event in decrypt_payload(encrypted_event)] == [
+        "purchase"
+    ]
+
+
+def test_aggregated_events_are_sent_once_with_a_count():
+    client = make_client(aggregate=["button_clicked"])
+    for _ in range(5):
+        assert client.track({"event_type": "button_clicked", "telegram_id": 1}) is None
+    client.http_client.post.assert_not_called()
+    client.flush()
+    (encrypted_event,), _ = client.http_client.post.call_args
+    (event,) = decrypt_payload(encrypted_event)
+    assert event["count"] == 5
+    client.close()
+
+
+def test_metrics_record_the_pipeline_stages():
+    metrics = Metrics()
+    client = make_client(metrics=metrics)
+    client.track({"event_type": "message", "telegram_id": 1})
+    snapshot = metrics.snapshot()
+    assert snapshot["events_tracked"] == 1
+    for stage in ("validate", "serialize", "encrypt", "rsa", "aes", "base64"):
+        assert snapshot[f"{stage}_seconds"]["count"] == 1
+
+
+def test_redelivered_updates_are_sent_once_with_their_event_id():
+    client = make_client(deduplicator=Deduplicator())
+    update = {
+        "update_id": 7,
+        "message": {"from": {"id": 5, "first_name": "A"}, "text": "/start"},
+    }
+    assert client.track_update(update) == {"status": "ok"}
+    assert client.track_update(update) is None
+    assert client.track_updates([update]) == []
+    (encrypted_event,), _ = client.http_client.post.call_args
+    assert decrypt_payload(encrypted_event)["event_id"] == "tg:7:5"
+    assert client.http_client.post.call_count == 1
+
+
+def test_a_failed_event_can_be_retried_with_its_event_id():
+    client = make_client(deduplicator=Deduplicator())
+    event = {"event_type": "purchase", "telegram_id": 1, "event_id": "order-1"}
+    client.http_client.post.side_effect = [OSError("connection reset"), {"ok": 1}]
+    with pytest.raises(OSError):
+        client.track(dict(event))
+    assert client.track(dict(event)) == {"ok": 1}
+    assert client.track(dict(event)) is None
+    assert client.http_client.post.call_count == 2
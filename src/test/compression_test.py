@@ -0,0 +1,62 @@
+import pytest
+
+from src.telemetree.compression import (
+    EVENT_DICTIONARY,
+    Compression,
+    compress,
+    decompress,
+    negotiate,
+)
+from src.telemetree.schemas import Event
+
+
+BATCH = (
+    b"["
+    + b",".join(
+        Event(event_type="message", telegram_id=telegram_id).model_dump_json().encode()
+        for telegram_id in range(1, 50)
+    )
+    + b"]"
+)
+
+
+@pytest.mark.parametrize("compression", [Compression.ZLIB, Compression.ZSTD])
+def test_compress_round_trip(compression):
+    if compression is Compression.ZSTD:
+        pytest.importorskip("zstandard")
+    compressed = compress(BATCH, compression)
+    assert len(compressed) < len(BATCH) / 10
+    assert decompress(compressed, compression) == BATCH
+
+
+def test_none_leaves_data_untouched():
+    assert compress(BATCH, Compression.NONE) is BATCH
+
+
+# The Event fields when the dictionary was built; it must not change with them
+DICTIONARY_FIELDS = (
+    "event_type",
+    "telegram_id",
+    "is_premium",
+    "username",
+    "firstname",
+    "lastname",
+    "language",
+    "referrer_type",
+    "referrer",
+    "event_source",
+    "datetime",
+    "session_id",
+    "application_id",
+)
+
+
+def test_dictionary_covers_the_event_fields():
+    for name in DICTIONARY_FIELDS:
+        assert f'"{name}":'.encode() in EVENT_DICTIONARY
+
+
+def test_negotiate_picks_first_supported_compression():
+    assert negotiate(["brotli", "zlib", "zstd"]) is Compression.ZLIB
+    assert negotiate(["brotli"]) is Compression.NONE
+    assert negotiate([]) is Compression.NONE
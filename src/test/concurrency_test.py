@@ -0,0 +1,159 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.telemetree.client import Telemetree
+from src.telemetree.concurrency import AdaptiveLimiter, DeliveryScheduler
+from src.telemetree.http_client import HttpClient
+from src.telemetree.schemas import EncryptedEvent
+from src.telemetree.testing import MockPipeline
+from src.test.client_test import API_KEY, PROJECT_ID, make_client
+from src.test.retry_test import make_response
+
+
+def finish(limiter: AdaptiveLimiter, latency: float, overloaded: bool = False):
+    """Runs one request through the limiter that took `latency` seconds."""
+    assert limiter.acquire(timeout=0) is not None
+    limiter.release(time.monotonic() - latency, overloaded)
+
+
+def test_limiter_raises_the_limit_by_about_one_per_round_trip():
+    limiter = AdaptiveLimiter(initial_limit=4, max_limit=8)
+    for _ in range(5):
+        finish(limiter, 0.01)
+    assert limiter.limit == 5
+    for _ in range(100):
+        finish(limiter, 0.01)
+    assert limiter.limit == 8
+
+
+def test_limiter_halves_the_limit_on_overload_once_per_burst():
+    limiter = AdaptiveLimiter(initial_limit=16)
+    started = [limiter.acquire() for _ in range(4)]
+    for start in started:
+        limiter.release(start, overloaded=True)
+    assert limiter.limit == 8
+    # Requests started after the cut cut it again
+    finish(limiter, 0.0, overloaded=True)
+    assert limiter.limit == 4
+    for _ in range(10):
+        finish(limiter, 0.0, overloaded=True)
+    assert limiter.limit == 1
+
+
+def test_limiter_backs_off_when_the_latency_rises():
+    limiter = AdaptiveLimiter(initial_limit=10, latency_backoff=0.5)
+    finish(limiter, 0.01)
+    limit = limiter.limit
+    finish(limiter, 0.1)
+    assert limiter.limit == limit // 2
+
+
+def test_limiter_blocks_acquire_at_the_limit():
+    limiter = AdaptiveLimiter(initial_limit=2)
+    first = limiter.acquire()
+    limiter.acquire()
+    assert limiter.acquire(timeout=0.01) is None
+    assert limiter.in_flight == 2
+
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(limiter.acquire()))
+    waiter.start()
+    limiter.release(first)
+    waiter.join(timeout=5)
+    assert acquired and acquired[0] is not None
+
+
+def test_limiter_rejects_invalid_settings():
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(initial_limit=0)
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(initial_limit=100, max_limit=10)
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(backoff=1.5)
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(latency_tolerance=0.5)
+
+
+def test_scheduler_keeps_at_most_the_limit_pending():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+    scheduler = DeliveryScheduler(limiter)
+    release = threading.Event()
+    scheduler.submit(release.wait)
+    scheduler.submit(release.wait)
+
+    submitted = threading.Event()
+    submitter = threading.Thread(
+        target=lambda: (scheduler.submit(lambda: None), submitted.set())
+    )
+    submitter.start()
+    assert not submitted.wait(0.05)
+    assert len(scheduler) == 2
+
+    release.set()
+    assert submitted.wait(5)
+    assert scheduler.wait(timeout=5)
+    scheduler.shutdown()
+
+
+def test_http_client_reports_overload_to_the_limiter():
+    limiter = AdaptiveLimiter(initial_limit=8)
+    http_client = HttpClient(
+        API_KEY, PROJECT_ID, url="https://pipeline.test", limiter=limiter
+    )
+    http_client.session = MagicMock()
+    http_client.session.post.side_effect = [make_response(429), make_response(200)]
+
+    with patch("telemetree.http_client.time.sleep"):
+        http_client.post(EncryptedEvent(key="key", iv="iv", body="body"))
+
+    assert http_client.session.post.call_count == 2
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_batches_are_delivered_concurrently():
+    limiter = AdaptiveLimiter(initial_limit=4)
+    client = make_client(
+        batching=True, flush_size=1, flush_interval=60, concurrency_limiter=limiter
+    )
+    in_flight = []
+    lock = threading.Lock()
+
+    def post(encrypted):
+        with lock:
+            in_flight.append(len(client.scheduler))
+        time.sleep(0.02)
+        return {"status": "ok"}
+
+    client.http_client.post.side_effect = post
+    for telegram_id in range(1, 13):
+        client.track({"event_type": "message", "telegram_id": telegram_id})
+    assert client.flush(timeout=5)
+
+    assert client.http_client.post.call_count == 12
+    assert max(in_flight) > 1
+    client.close()
+
+
+def test_track_many_delivers_chunks_through_the_limiter():
+    with MockPipeline(key_bits=512) as pipeline:
+        client = Telemetree(
+            API_KEY,
+            PROJECT_ID,
+            config_url=pipeline.config_url,
+            config_cache=None,
+            batch_max_events=2,
+            concurrency_limiter=AdaptiveLimiter(),
+        )
+        events = [{"event_type": "message", "telegram_id": i} for i in range(1, 11)]
+        responses = client.track_many(events)
+        client.close()
+
+        assert len(responses) == 5
+        assert sorted(event["telegram_id"] for event in pipeline.events()) == list(
+            range(1, 11)
+        )
+        assert client.concurrency_limiter.in_flight == 0
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.telemetree.config import Config, ConfigCache, cache_key
+from src.telemetree.schemas import TelemetreeConfig
+
+
+PROJECT_ID = "f0e1d2c3-b4a5-4968-8776-655443322110"
+
+config_v1 = TelemetreeConfig(public_key="key-1", host="https://pipeline.test/v1")
+config_v2 = TelemetreeConfig(public_key="key-2", host="https://pipeline.test/v2")
+
+
+@pytest.fixture
+def clock():
+    with patch("telemetree.config.time.time", return_value=1000.0) as now:
+        yield now
+
+
+def test_fresh_config_is_served_from_memory(clock):
+    cache = ConfigCache(ttl=60)
+    fetch = MagicMock(return_value=config_v1)
+    assert cache.get(PROJECT_ID, fetch) == config_v1
+    clock.return_value = 1059.0
+    assert cache.get(PROJECT_ID, fetch) == config_v1
+    assert fetch.call_count == 1
+
+
+def test_stale_config_is_served_while_refreshing(clock):
+    cache = ConfigCache(ttl=60, stale_ttl=600)
+    cache.put(PROJECT_ID, config_v1)
+    clock.return_value = 1100.0
+
+    refreshed = threading.Event()
+
+    def fetch():
+        refreshed.set()
+        return config_v2
+
+    assert cache.get(PROJECT_ID, fetch) == config_v1
+    assert refreshed.wait(5)
+    for _ in range(100):
+        if cache.peek(PROJECT_ID) == config_v2:
+            break
+        threading.Event().wait(0.01)
+    assert cache.get(PROJECT_ID, fetch) == config_v2
+
+
+def test_expired_config_is_fetched_synchronously(clock):
+    cache = ConfigCache(ttl=60, stale_ttl=60)
+    cache.put(PROJECT_ID, config_v1)
+    clock.return_value = 2000.0
+    assert cache.get(PROJECT_ID, MagicMock(return_value=config_v2)) == config_v2
+
+
+def test_expired_config_is_used_when_fetch_fails(clock):
+    cache = ConfigCache(ttl=60, stale_ttl=60)
+    cache.put(PROJECT_ID, config_v1)
+    clock.return_value = 2000.0
+    fetch = MagicMock(side_effect=ConnectionError("config service down"))
+    assert cache.get(PROJECT_ID, fetch) == config_v1
+
+
+def test_failed_fetches_back_off(clock):
+    cache = ConfigCache(ttl=60, stale_ttl=60, retry_interval=30)
+    cache.put(PROJECT_ID, config_v1)
+    clock.return_value = 2000.0
+    fetch = MagicMock(side_effect=ConnectionError("config service down"))
+    for _ in range(10):
+        assert cache.get(PROJECT_ID, fetch) == config_v1
+    assert fetch.call_count == 1
+
+    with patch("telemetree.config.time.monotonic", return_value=10**9):
+        fetch.side_effect = None
+        fetch.return_value = config_v2
+        assert cache.get(PROJECT_ID, fetch) == config_v2
+
+
+def test_cache_key_includes_the_endpoint():
+    assert cache_key(PROJECT_ID) == cache_key(PROJECT_ID, Config.CONFIG_URL)
+    assert cache_key(PROJECT_ID, "http://a/config") != cache_key(
+        PROJECT_ID, "http://b/config"
+    )
+
+
+def test_async_config_is_refreshed_through_the_cache(clock):
+    http_client = MagicMock(project_id=PROJECT_ID)
+    responses = iter([config_v1.model_dump(), config_v2.model_dump()])
+
+    async def get(url):
+        return next(responses)
+
+    http_client.get = get
+    cache = ConfigCache(ttl=60, stale_ttl=0)
+
+    async def scenario():
+        config = await Config.create_async(http_client, cache=cache)
+        assert (await config.config_async()).public_key == "key-1"
+        clock.return_value = 1061.0
+        # Reading the property never fetches with the async client
+        assert config.get_public_key() == "key-1"
+        return await config.config_async()
+
+    assert asyncio.run(scenario()).public_key == "key-2"
+
+
+def test_fetch_errors_propagate_without_a_cached_copy():
+    cache = ConfigCache()
+    with pytest.raises(ConnectionError):
+        cache.get(PROJECT_ID, MagicMock(side_effect=ConnectionError("down")))
+
+
+def test_disk_cache_is_shared_between_instances(tmp_path):
+    first = ConfigCache(directory=str(tmp_path))
+    first.get(PROJECT_ID, MagicMock(return_value=config_v1))
+
+    fetch = MagicMock()
+    second = ConfigCache(directory=str(tmp_path))
+    assert second.get(PROJECT_ID, fetch).model_dump() == config_v1.model_dump()
+    fetch.assert_not_called()
+
+
+def test_corrupt_disk_cache_is_ignored(tmp_path):
+    (tmp_path / f"telemetree-config-{PROJECT_ID}.json").write_text("{not json")
+    cache = ConfigCache(directory=str(tmp_path))
+    assert cache.get(PROJECT_ID, MagicMock(return_value=config_v1)) == config_v1
+
+
+def test_config_reads_through_the_cache(clock):
+    http_client = MagicMock(project_id=PROJECT_ID)
+    http_client.get.return_value = config_v1.model_dump()
+    cache = ConfigCache(ttl=60, stale_ttl=0)
+    config = Config(http_client, cache=cache)
+    assert config.get_public_key() == "key-1"
+
+    http_client.get.return_value = config_v2.model_dump()
+    clock.return_value = 1061.0
+    assert config.get_public_key() == "key-2"
+    assert config.get_host() == "https://pipeline.test/v2"
@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.telemetree.dedup import BloomFilter, BloomSeenSet, Deduplicator, SeenSet
+from src.telemetree.schemas import Event, TrustedEvent
+
+
+def test_seen_set_forgets_keys_after_the_window():
+    with patch("telemetree.dedup.time.monotonic", return_value=0.0):
+        seen = SeenSet(max_size=10, window=5)
+        assert seen.add("a")
+        assert not seen.add("a")
+    with patch("telemetree.dedup.time.monotonic", return_value=5.0):
+        assert seen.add("a")
+        assert len(seen) == 1
+
+
+def test_seen_set_evicts_oldest_keys_when_full():
+    seen = SeenSet(max_size=2)
+    assert seen.add("a") and seen.add("b") and seen.add("c")
+    assert not seen.add("c")
+    assert seen.add("a")
+    assert len(seen) == 2
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    for i in range(10_000):
+        bloom.add(f"event-{i}")
+    assert all(f"event-{i}" in bloom for i in range(10_000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 200
+
+
+def test_bloom_seen_set_remembers_keys_for_one_to_two_windows():
+    with patch("telemetree.dedup.time.monotonic", return_value=0.0):
+        seen = BloomSeenSet(max_size=100, window=10)
+        assert seen.add("a")
+    with patch("telemetree.dedup.time.monotonic", return_value=15.0):
+        assert not seen.add("a")
+        assert seen.add("b")
+    with patch("telemetree.dedup.time.monotonic", return_value=25.0):
+        assert seen.add("a")
+        assert not seen.add("b")
+
+
+@pytest.mark.parametrize("bloom", [False, True])
+def test_deduplicator_drops_repeated_event_ids(bloom):
+    deduplicator = Deduplicator(bloom=bloom)
+    first = Event(event_type="message", telegram_id=1, event_id="tg:1:1")
+    repeat = TrustedEvent("message", 1, event_id="tg:1:1")
+    assert not deduplicator.is_duplicate(first)
+    assert deduplicator.is_duplicate(repeat)
+    assert deduplicator.dropped == 1
+
+
+def test_deduplicator_assigns_missing_ids_without_remembering_them():
+    deduplicator = Deduplicator(max_size=1)
+    kept = Event(event_type="message", telegram_id=1, event_id="tg:1:1")
+    assert not deduplicator.is_duplicate(kept)
+    deduplicator.record([kept])
+    event = Event(event_type="message", telegram_id=1)
+    assert not deduplicator.is_duplicate(event)
+    assert len(event.event_id) == 32
+    deduplicator.record([event])
+    # The random ID did not take the place of the caller's one
+    assert len(deduplicator.seen) == 1
+    assert deduplicator.is_duplicate(kept.model_copy())
+
+
+@pytest.mark.parametrize("bloom", [False, True])
+def test_deduplicator_forgets_released_event_ids(bloom):
+    deduplicator = Deduplicator(bloom=bloom)
+    event = Event(event_type="message", telegram_id=1, event_id="tg:1:1")
+    assert not deduplicator.is_duplicate(event)
+    # A redelivery while the event is in flight is dropped
+    assert deduplicator.is_duplicate(event)
+    with pytest.raises(OSError):
+        with deduplicator.tracking([event]):
+            raise OSError("connection reset")
+    assert not deduplicator.is_duplicate(event)
+    with deduplicator.tracking([event]):
+        pass
+    assert deduplicator.is_duplicate(event)
+    assert deduplicator.dropped == 2
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from src.telemetree.dispatcher import BatchDispatcher, OverflowPolicy
+
+
+class RecordingSender:
+    def __init__(self, gate: threading.Event = None):
+        self.batches = []
+        self.gate = gate
+
+    def __call__(self, batch):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append(list(batch))
+
+    @property
+    def items(self):
+        return [item for batch in self.batches for item in batch]
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_flushes_when_batch_is_full():
+    sender = RecordingSender()
+    dispatcher = BatchDispatcher(sender, flush_size=3, flush_interval=60)
+    for i in range(3):
+        assert dispatcher.submit(i)
+    assert wait_until(lambda: sender.items == [0, 1, 2])
+    assert sender.batches == [[0, 1, 2]]
+    dispatcher.close()
+
+
+def test_flushes_by_age():
+    sender = RecordingSender()
+    dispatcher = BatchDispatcher(sender, flush_size=100, flush_interval=0.05)
+    dispatcher.submit("event")
+    assert wait_until(lambda: sender.items == ["event"])
+    dispatcher.close()
+
+
+def test_explicit_flush_waits_for_send():
+    sender = RecordingSender()
+    dispatcher = BatchDispatcher(sender, flush_size=100, flush_interval=60)
+    for i in range(5):
+        dispatcher.submit(i)
+    assert dispatcher.flush(timeout=2)
+    assert sender.items == [0, 1, 2, 3, 4]
+    dispatcher.close()
+
+
+def test_close_drains_queue_and_rejects_new_items():
+    sender = RecordingSender()
+    dispatcher = BatchDispatcher(sender, flush_size=2, flush_interval=60)
+    for i in range(5):
+        dispatcher.submit(i)
+    dispatcher.close(timeout=2)
+    assert sender.items == [0, 1, 2, 3, 4]
+    with pytest.raises(RuntimeError):
+        dispatcher.submit(5)
+
+
+def test_drop_newest_when_full():
+    gate = threading.Event()
+    sender = RecordingSender(gate)
+    dispatcher = BatchDispatcher(
+        sender,
+        max_queue_size=2,
+        flush_size=1,
+        flush_interval=60,
+        overflow_policy=OverflowPolicy.DROP_NEWEST,
+    )
+    dispatcher.submit("in-flight")
+    assert wait_until(lambda: len(dispatcher) == 0)
+    assert dispatcher.submit("a") and dispatcher.submit("b")
+    assert dispatcher.submit("c") is False
+    assert dispatcher.dropped == 1
+    gate.set()
+    dispatcher.close(timeout=2)
+    assert sender.items == ["in-flight", "a", "b"]
+
+
+def test_drop_oldest_when_full():
+    gate = threading.Event()
+    sender = RecordingSender(gate)
+    dispatcher = BatchDispatcher(
+        sender,
+        max_queue_size=2,
+        flush_size=1,
+        flush_interval=60,
+        overflow_policy="drop_oldest",
+    )
+    dispatcher.submit("in-flight")
+    assert wait_until(lambda: len(dispatcher) == 0)
+    for item in ("a", "b", "c"):
+        assert dispatcher.submit(item)
+    assert dispatcher.dropped == 1
+    gate.set()
+    dispatcher.close(timeout=2)
+    assert sender.items == ["in-flight", "b", "c"]
+
+
+def test_block_times_out_and_drops():
+    gate = threading.Event()
+    sender = RecordingSender(gate)
+    dispatcher = BatchDispatcher(
+        sender,
+        max_queue_size=1,
+        flush_size=1,
+        flush_interval=60,
+        overflow_policy=OverflowPolicy.BLOCK,
+        block_timeout=0.05,
+    )
+    dispatcher.submit("in-flight")
+    assert wait_until(lambda: len(dispatcher) == 0)
+    assert dispatcher.submit("a")
+    assert dispatcher.submit("b") is False
+    assert dispatcher.dropped == 1
+    gate.set()
+    dispatcher.close(timeout=2)
+    assert sender.items == ["in-flight", "a"]
+
+
+def test_sender_errors_do_not_stop_the_worker():
+    calls = []
+
+    def failing_sender(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise ConnectionError("boom")
+
+    dispatcher = BatchDispatcher(failing_sender, flush_size=1, flush_interval=60)
+    dispatcher.submit(1)
+    dispatcher.submit(2)
+    assert dispatcher.flush(timeout=2)
+    assert calls == [[1], [2]]
+    dispatcher.close()
@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 from Crypto.PublicKey import RSA
 from rsa import PrivateKey, decrypt
@@ -5,6 +7,7 @@ from base64 import b64decode
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 
+from src.telemetree.compression import Compression, decompress
 from src.telemetree.encryption import EncryptionService
 
 
@@ -77,14 +80,21 @@ def test_rsa_encrypt_raises_error_with_invalid_key(encryption_service):
         encryption_service.rsa_encrypt("Test message")
 
 
+# A 2048-bit key with PKCS#1 v1.5 padding holds 245 bytes, and the message is
+# hex encoded first, so 122 bytes of it fit
+MAX_RSA_MESSAGE_BYTES = 122
+
+
 def test_rsa_encrypt_with_large_message(encryption_service):
-    # RSA encryption cannot handle large messages, so we test the limit.
-    max_rsa_message_size = (
-        245  # This is an approximate size for a 2048-bit key with padding.
-    )
-    message = "a" * max_rsa_message_size
+    message = "a" * MAX_RSA_MESSAGE_BYTES
     encrypted_message = encryption_service.rsa_encrypt(message)
-    assert isinstance(encrypted_message, bytes)
+    decrypted = decrypt(b64decode(encrypted_message), load_private_key(private_key))
+    assert decrypted == message.encode().hex().encode()
+
+
+def test_rsa_encrypt_rejects_too_large_message(encryption_service):
+    with pytest.raises(ValueError):
+        encryption_service.rsa_encrypt("a" * (MAX_RSA_MESSAGE_BYTES + 1))
 
 
 def test_generate_aes_key_and_iv(encryption_service):
@@ -136,3 +146,77 @@ def test_encrypt_with_valid_message(encryption_service):
     assert (
         "key" in encrypted_data and "iv" in encrypted_data and "body" in encrypted_data
     )
+
+
+def decrypt_wire_bytes(encrypted_data: dict, private_key: PrivateKey) -> bytes:
+    # The AES key and IV are hex encoded before RSA encryption
+    key = bytes.fromhex(decrypt(b64decode(encrypted_data["key"]), private_key).decode())
+    iv = bytes.fromhex(decrypt(b64decode(encrypted_data["iv"]), private_key).decode())
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    return unpad(cipher.decrypt(b64decode(encrypted_data["body"])), AES.block_size)
+
+
+def decrypt_wire_message(encrypted_data: dict, private_key: PrivateKey) -> str:
+    return decrypt_wire_bytes(encrypted_data, private_key).decode("utf-8")
+
+
+def test_public_key_is_parsed_once(encryption_service):
+    with patch("rsa.PublicKey.load_pkcs1_openssl_pem") as load:
+        encryption_service.encrypt("first")
+        encryption_service.encrypt("second")
+    load.assert_not_called()
+
+
+def test_invalid_public_key_fails_at_construction():
+    with pytest.raises(ValueError):
+        EncryptionService(b"invalid_key")
+
+
+def test_fresh_key_per_message_by_default(encryption_service):
+    first = encryption_service.encrypt("first")
+    second = encryption_service.encrypt("second")
+    assert first["key"] != second["key"]
+
+
+def test_key_reused_for_configured_number_of_events():
+    service = EncryptionService(pub_key, key_reuse_events=3)
+    keys = [service.encrypt(f"message {i}")["key"] for i in range(4)]
+    assert keys[0] == keys[1] == keys[2]
+    assert keys[3] != keys[0]
+
+
+def test_key_rotated_after_time_window():
+    service = EncryptionService(pub_key, key_reuse_events=None, key_reuse_seconds=60)
+    with patch("telemetree.encryption.time.monotonic", return_value=1000.0):
+        first = service.encrypt("first")
+        second = service.encrypt("second")
+    with patch("telemetree.encryption.time.monotonic", return_value=1061.0):
+        third = service.encrypt("third")
+    assert first["key"] == second["key"]
+    assert third["key"] != first["key"]
+
+
+def test_reused_key_messages_decrypt(encryption_service):
+    service = EncryptionService(pub_key, key_reuse_events=10)
+    rsa_private_key = PrivateKey.load_pkcs1(private_key)
+    for message in ("first", "second 👾"):
+        assert (
+            decrypt_wire_message(service.encrypt(message), rsa_private_key) == message
+        )
+
+
+def test_key_reuse_requires_a_limit():
+    with pytest.raises(ValueError):
+        EncryptionService(pub_key, key_reuse_events=None, key_reuse_seconds=None)
+
+
+def test_large_messages_are_compressed_before_encryption():
+    service = EncryptionService(pub_key, compression="zlib")
+    rsa_private_key = PrivateKey.load_pkcs1(private_key)
+    assert "compression" not in service.encrypt("small")
+
+    message = '{"event_source":"python_SDK","referrer_type":"backend"}' * 10
+    encrypted = service.encrypt(message)
+    assert encrypted["compression"] == "zlib"
+    compressed = decrypt_wire_bytes(encrypted, rsa_private_key)
+    assert decompress(compressed, Compression.ZLIB).decode("utf-8") == message
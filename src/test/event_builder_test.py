@@ -1,52 +1,37 @@
+import copy
+
 import pytest
-from unittest.mock import patch
-from src.telemetree.event_builder import EventBuilder
-from src.telemetree.config import Config
-from src.telemetree.telegram_schemas import Update
+
+from src.telemetree.event_builder import EventBuilder, TrustedEvent, parse_command
+from src.telemetree.schemas import TelemetreeConfig
 import src.test.fixtures as fixtures
 
 
 @pytest.fixture
 def mock_config():
-    with patch("src.telemetree.config.requests.get") as mocked_get:
-        mocked_get.return_value.status_code = 200
-        mocked_get.return_value.json.return_value = {
-            "auto_capture_telegram": True,
-            "public_key": "sample_key",
-            "host": "test_host",
-            "auto_capture_telegram_events": [
-                "message",
-                "inline_query",
-                "chosen_inline_result",
-            ],
-            "auto_capture_commands": ["/start", "/stop"],
-            "auto_capture_messages": ["Test message"],
-            "app_name": "Test app",
-        }
-        config_instance = Config(api_key="dummy_api_key", project_id="dummy_project_id")
-        return config_instance
+    return TelemetreeConfig(
+        public_key="sample_key",
+        host="test_host",
+        auto_capture_telegram=True,
+        auto_capture_telegram_events=[
+            "message",
+            "edited_message",
+            "inline_query",
+            "chosen_inline_result",
+        ],
+        auto_capture_commands=["/start", "/stop"],
+        auto_capture_messages=["Test message"],
+    )
 
 
 @pytest.fixture
-def mock_config_no_auto_capture_telegram():
-    with patch("src.telemetree.config.requests.get") as mocked_get:
-        mocked_get.return_value.status_code = 200
-        mocked_get.return_value.json.return_value = {
-            "auto_capture_telegram": False,
-            "public_key": "sample_key",
-            "host": "test_host",
-            "auto_capture_telegram_events": [],
-            "auto_capture_commands": ["/start", "/stop"],
-            "auto_capture_messages": ["Test message"],
-            "app_name": "Test app",
-        }
-        config_instance = Config(api_key="dummy_api_key", project_id="dummy_project_id")
-        return config_instance
+def mock_config_no_auto_capture_telegram(mock_config):
+    return mock_config.model_copy(update={"auto_capture_telegram": False})
 
 
 @pytest.fixture
 def event_builder(mock_config):
-    return EventBuilder(settings=mock_config)
+    return EventBuilder(settings=mock_config, application_id="app")
 
 
 @pytest.fixture
@@ -58,7 +43,14 @@ def test_parse_valid_message_update(event_builder):
     result = event_builder.parse_telegram_update(
         fixtures.message_update_telegram_tracked
     )
-    assert isinstance(result, Update)
+    assert isinstance(result, TrustedEvent)
+    assert result.event_type == "/start"
+    assert result.telegram_id == 714862471
+    assert result.username == "candyflipline"
+    assert result.firstname == "Chris"
+    assert result.language == "en"
+    assert result.is_premium is True
+    assert result.application_id == "app"
 
 
 def test_parse_invalid_message_update(event_builder):
@@ -70,7 +62,7 @@ def test_parse_invalid_message_update(event_builder):
 
 def test_parse_valid_edited_message_update(event_builder):
     result = event_builder.parse_telegram_update(fixtures.edited_message_update_tracked)
-    assert isinstance(result, Update)
+    assert isinstance(result, TrustedEvent)
 
 
 def test_parse_invalid_edited_message_update(event_builder):
@@ -82,14 +74,14 @@ def test_parse_invalid_edited_message_update(event_builder):
 
 def test_parse_valid_inline_query_update(event_builder):
     result = event_builder.parse_telegram_update(fixtures.inline_query_update_telegram)
-    assert isinstance(result, Update)
+    assert result.event_type == "inline_query"
 
 
 def test_parse_valid_chosen_inline_result_update(event_builder):
     result = event_builder.parse_telegram_update(
         fixtures.chosen_inline_result_update_telegram
     )
-    assert isinstance(result, Update)
+    assert result.event_type == "chosen_inline_result"
 
 
 def test_parse_valid_message_update_no_auto_capture(event_builder_no_capture):
@@ -99,13 +91,6 @@ def test_parse_valid_message_update_no_auto_capture(event_builder_no_capture):
     assert result is None
 
 
-def test_parse_valid_edited_message_update_no_auto_capture(event_builder_no_capture):
-    result = event_builder_no_capture.parse_telegram_update(
-        fixtures.edited_message_update_tracked
-    )
-    assert result is None
-
-
 def test_parse_valid_inline_query_update_no_auto_capture(event_builder_no_capture):
     result = event_builder_no_capture.parse_telegram_update(
         fixtures.inline_query_update_telegram
@@ -113,10 +98,50 @@ def test_parse_valid_inline_query_update_no_auto_capture(event_builder_no_captur
     assert result is None
 
 
-def test_parse_valid_chosen_inline_result_update_no_auto_capture(
-    event_builder_no_capture,
-):
-    result = event_builder_no_capture.parse_telegram_update(
-        fixtures.chosen_inline_result_update_telegram
-    )
-    assert result is None
+def test_parse_update_of_unselected_type(event_builder):
+    update = {"update_id": 1, "callback_query": {"from": {"id": 1}, "data": "x"}}
+    assert event_builder.parse_telegram_update(update) is None
+
+
+def test_parse_updates_keeps_tracked_updates_in_order(event_builder):
+    updates = [
+        fixtures.message_update_telegram_tracked,
+        fixtures.message_update_telegram_not_tracked,
+        fixtures.inline_query_update_telegram,
+        fixtures.chosen_inline_result_update_telegram,
+    ]
+    original = copy.deepcopy(updates)
+    events = event_builder.parse_telegram_updates(updates)
+    assert [event.event_type for event in events] == [
+        "/start",
+        "inline_query",
+        "chosen_inline_result",
+    ]
+    assert updates == original
+
+
+def test_default_settings_capture_start_and_help_only():
+    builder = EventBuilder()
+    message = fixtures.message_update_telegram_tracked["message"]
+    help_update = {"update_id": 1, "message": {**message, "text": "/help@my_bot"}}
+    stop_update = {"update_id": 2, "message": {**message, "text": "/stop"}}
+    assert builder.parse_telegram_update(help_update).event_type == "/help"
+    assert builder.parse_telegram_update(stop_update) is None
+
+
+def test_long_language_codes_keep_the_primary_subtag(event_builder):
+    message = copy.deepcopy(fixtures.message_update_telegram_tracked)
+    message["message"]["from"]["language_code"] = "zh-hans"
+    assert event_builder.parse_telegram_update(message).language == "zh"
+
+
+def test_unsupported_update_type_is_rejected(mock_config):
+    settings = mock_config.model_copy(update={"auto_capture_telegram_events": ["x"]})
+    with pytest.raises(ValueError):
+        EventBuilder(settings)
+
+
+def test_parse_command():
+    assert parse_command("/start ref") == "/start"
+    assert parse_command("/start@my_bot") == "/start"
+    assert parse_command("hello") is None
@@ -0,0 +1,81 @@
+import pickle
+import threading
+import time
+
+import pytest
+from rsa import newkeys
+
+from src.telemetree.encryption import EncryptionService
+from src.telemetree.executors import EncryptionExecutor, ExecutorKind
+
+
+public_key, private_key = newkeys(512)
+
+
+@pytest.fixture
+def encryption_service():
+    return EncryptionService(public_key.save_pkcs1())
+
+
+@pytest.mark.parametrize("kind", ["inline", "thread", "process"])
+def test_map_preserves_order(encryption_service, kind):
+    executor = EncryptionExecutor(encryption_service, kind=kind, max_workers=2)
+    # Each message is one AES block longer than the previous one
+    messages = ["m" * 16 * n for n in range(10)]
+    results = list(executor.map(messages))
+    executor.shutdown()
+    assert all(set(result) == {"key", "iv", "body"} for result in results)
+    lengths = [len(result["body"]) for result in results]
+    assert lengths == sorted(lengths) and len(set(lengths)) == 10
+
+
+@pytest.mark.parametrize("kind", list(ExecutorKind))
+def test_encrypt_single_message(encryption_service, kind):
+    executor = EncryptionExecutor(encryption_service, kind=kind, max_workers=1)
+    assert set(executor.encrypt("hello")) == {"key", "iv", "body"}
+    executor.shutdown()
+
+
+def test_errors_propagate(encryption_service):
+    executor = EncryptionExecutor(encryption_service, kind="thread", max_workers=1)
+    with pytest.raises(ValueError):
+        list(executor.map(["fine", 42]))
+    executor.shutdown()
+
+
+def test_submit_blocks_when_queue_is_full(encryption_service):
+    gate = threading.Event()
+
+    class SlowService:
+        def encrypt(self, message):
+            gate.wait(5)
+            return encryption_service.encrypt(message)
+
+    executor = EncryptionExecutor(
+        SlowService(), kind="thread", max_workers=1, max_pending=2
+    )
+    executor.submit("a")
+    executor.submit("b")
+
+    submitted = threading.Event()
+
+    def submit_third():
+        executor.submit("c")
+        submitted.set()
+
+    thread = threading.Thread(target=submit_third)
+    thread.start()
+    time.sleep(0.1)
+    assert not submitted.is_set()
+    gate.set()
+    assert submitted.wait(5)
+    thread.join()
+    executor.shutdown()
+
+
+def test_encryption_service_survives_pickling(encryption_service):
+    service = EncryptionService(public_key.save_pkcs1(), key_reuse_events=5)
+    service.encrypt("warm up the session key")
+    restored = pickle.loads(pickle.dumps(service))
+    assert restored.rsa_key == service.rsa_key
+    assert set(restored.encrypt("hello")) == {"key", "iv", "body"}
@@ -0,0 +1,139 @@
+import json
+import os
+
+import pytest
+import requests
+
+from src.telemetree.client import Telemetree
+from src.telemetree.concurrency import AdaptiveLimiter
+from src.telemetree.export import (
+    PARTIAL_SUFFIX,
+    UPLOADED_SUFFIX,
+    BulkUploader,
+    ExportFormat,
+    FileSink,
+    read_export,
+)
+from src.telemetree.schemas import EncryptedEvent
+from src.telemetree.testing import MockPipeline
+from src.test.client_test import API_KEY, PROJECT_ID
+
+
+def events(count: int):
+    return [{"event_type": "message", "telegram_id": i} for i in range(1, count + 1)]
+
+
+def pipeline_client(pipeline: MockPipeline, **kwargs) -> Telemetree:
+    return Telemetree(
+        API_KEY,
+        PROJECT_ID,
+        config_url=pipeline.config_url,
+        config_cache=None,
+        **kwargs,
+    )
+
+
+def test_file_sink_rotates_and_completes_files(tmp_path):
+    sink = FileSink(str(tmp_path), ExportFormat.PLAINTEXT, max_file_bytes=100)
+    records = [json.dumps({"n": n}).encode() for n in range(30)]
+    for record in records:
+        sink.write([record])
+    assert any(name.endswith(PARTIAL_SUFFIX) for name in os.listdir(tmp_path))
+    sink.close()
+
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) > 1
+    assert not any(name.endswith(PARTIAL_SUFFIX) for name in names)
+    written = [line for name in names for line in read_export(tmp_path / name)]
+    assert written == records
+    assert sink.records == 30
+
+
+def test_plaintext_export_needs_no_configuration_and_uploads_in_batches(tmp_path):
+    with MockPipeline(key_bits=512) as pipeline:
+        client = Telemetree(
+            API_KEY,
+            PROJECT_ID,
+            config_url=pipeline.config_url,
+            export_dir=str(tmp_path),
+        )
+        assert client.export.format.value == "plaintext"
+        client.track({"event_type": "message", "telegram_id": 100})
+        assert client.track_many(events(20)) is None
+        client.close()
+        assert client.config is None
+        assert pipeline.requests == []
+
+        uploader_client = pipeline_client(
+            pipeline, batch_max_events=8, concurrency_limiter=AdaptiveLimiter()
+        )
+        result = BulkUploader(uploader_client, str(tmp_path)).upload()
+        uploader_client.close()
+
+        assert (result.files, result.records, result.requests) == (1, 21, 3)
+        assert sorted(event["telegram_id"] for event in pipeline.events()) == list(
+            range(1, 21)
+        ) + [100]
+        assert all(name.endswith(UPLOADED_SUFFIX) for name in os.listdir(tmp_path))
+
+
+def test_encrypted_export_is_posted_as_is(tmp_path):
+    with MockPipeline(key_bits=512) as pipeline:
+        client = pipeline_client(
+            pipeline, export_dir=str(tmp_path), export_format="encrypted"
+        )
+        client.track_many(events(10))
+        client.track({"event_type": "message", "telegram_id": 11})
+        client.close()
+        assert pipeline.requests == []
+
+        (name,) = os.listdir(tmp_path)
+        lines = list(read_export(tmp_path / name))
+        assert len(lines) == 2
+        EncryptedEvent.model_validate_json(lines[0])
+
+        uploader_client = pipeline_client(pipeline)
+        result = BulkUploader(uploader_client, str(tmp_path), delete=True).upload()
+        uploader_client.close()
+
+        assert result.requests == 2
+        assert sorted(event["telegram_id"] for event in pipeline.events()) == list(
+            range(1, 12)
+        )
+        assert os.listdir(tmp_path) == []
+
+
+def test_upload_resumes_after_a_failure(tmp_path):
+    with FileSink(str(tmp_path), ExportFormat.PLAINTEXT) as sink:
+        sink.send(
+            json.dumps({"event_type": "message", "telegram_id": i}).encode()
+            for i in range(1, 11)
+        )
+
+    with MockPipeline(key_bits=512, statuses=[200, 200, 400]) as pipeline:
+        client = pipeline_client(pipeline, batch_max_events=2)
+        uploader = BulkUploader(client, str(tmp_path), window=1)
+        with pytest.raises(requests.HTTPError):
+            uploader.upload()
+        with open(tmp_path / "upload-checkpoint") as checkpoint:
+            assert json.load(checkpoint)["records"] == 4
+
+        result = uploader.upload()
+        client.close()
+
+        assert result.records == 6
+        # The rejected request is the only one sent twice
+        received = sorted(event["telegram_id"] for event in pipeline.events())
+        assert received == sorted(list(range(1, 11)) + [5, 6])
+        assert not os.path.exists(tmp_path / "upload-checkpoint")
+
+
+def test_export_cannot_be_combined_with_a_spool(tmp_path):
+    with pytest.raises(ValueError):
+        Telemetree(
+            API_KEY,
+            PROJECT_ID,
+            export_dir=str(tmp_path / "export"),
+            spool_dir=str(tmp_path / "spool"),
+            lazy=True,
+        )
@@ -0,0 +1,127 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.telemetree.http_client import HttpClient, encode_body
+from src.telemetree.metrics import Metrics
+from src.telemetree.schemas import EncryptedEvent
+
+
+API_KEY = "a1b2c3d4-e5f6-4a7b-8c9d-0e1f2a3b4c5d"
+PROJECT_ID = "f0e1d2c3-b4a5-4968-8776-655443322110"
+
+
+class PipelineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        body = self.rfile.read(length)
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        self.server.bodies.append(body)
+        self.server.encodings.append(self.headers.get("Content-Encoding"))
+        self.server.client_ports.add(self.client_address[1])
+        body = json.dumps({"status": "ok"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def pipeline():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PipelineHandler)
+    server.bodies = []
+    server.encodings = []
+    server.client_ports = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def encrypted_event():
+    return EncryptedEvent(key="key", iv="iv", body="body")
+
+
+def test_post_reuses_connection(pipeline):
+    url = f"http://127.0.0.1:{pipeline.server_port}/events"
+    with HttpClient(API_KEY, PROJECT_ID, url=url) as http_client:
+        for _ in range(5):
+            assert http_client.post(encrypted_event()) == {"status": "ok"}
+    assert len(pipeline.bodies) == 5
+    assert len(pipeline.client_ports) == 1
+
+
+def test_pool_and_timeouts_are_configurable():
+    http_client = HttpClient(
+        API_KEY,
+        PROJECT_ID,
+        pool_connections=2,
+        pool_maxsize=32,
+        connect_timeout=1.5,
+        read_timeout=7.0,
+    )
+    adapter = http_client.session.get_adapter("https://pipeline.test")
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 32
+    assert http_client.timeout == (1.5, 7.0)
+    http_client.close()
+
+
+def test_post_passes_separate_timeouts():
+    http_client = HttpClient(
+        API_KEY, PROJECT_ID, url="https://pipeline.test", read_timeout=4.0
+    )
+    http_client.session = MagicMock()
+    http_client.post(encrypted_event())
+    _, kwargs = http_client.session.post.call_args
+    assert kwargs["timeout"] == (http_client.timeout[0], 4.0)
+
+
+def test_post_gzips_large_bodies(pipeline):
+    url = f"http://127.0.0.1:{pipeline.server_port}/events"
+    large = EncryptedEvent(key="key", iv="iv", body="A" * 1000)
+    with HttpClient(API_KEY, PROJECT_ID, url=url, gzip=True) as http_client:
+        http_client.post(encrypted_event())
+        http_client.post(large)
+    assert pipeline.encodings == [None, "gzip"]
+    assert json.loads(json.loads(pipeline.bodies[1])) == large.model_dump(
+        exclude_none=True
+    )
+
+
+def test_post_records_requests_and_bytes(pipeline):
+    url = f"http://127.0.0.1:{pipeline.server_port}/events"
+    metrics = Metrics()
+    with HttpClient(API_KEY, PROJECT_ID, url=url, metrics=metrics) as http_client:
+        http_client.post(encrypted_event())
+    snapshot = metrics.snapshot()
+    assert snapshot["http_requests"] == 1
+    assert snapshot["bytes_sent"] == len(encode_body(encrypted_event()))
+    assert snapshot["http_post_seconds"]["count"] == 1
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        EncryptedEvent(key="a+b/", iv="c=", body="ZGF0YQ=="),
+        EncryptedEvent(key="a", iv="b", body="c", compression="zstd"),
+        # Values that need escaping take the slow path
+        EncryptedEvent(key='a"b', iv="\\", body="Ω\n"),
+    ],
+)
+def test_encode_body_matches_json_encoding_of_the_document(event):
+    assert encode_body(event) == json.dumps(
+        event.model_dump_json(exclude_none=True)
+    ).encode("utf-8")
@@ -0,0 +1,80 @@
+from unittest.mock import MagicMock
+
+from src.telemetree.metrics import (
+    NULL_METRICS,
+    Histogram,
+    Metrics,
+    OpenTelemetrySink,
+)
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_snapshot_includes_counters_histograms_and_gauges():
+    metrics = Metrics()
+    metrics.increment("bytes_sent", 100)
+    metrics.increment("bytes_sent", 50)
+    with metrics.time("aes_seconds"):
+        pass
+    metrics.register_gauge("queue_depth", lambda: 7)
+    snapshot = metrics.snapshot()
+    assert snapshot["bytes_sent"] == 150
+    assert snapshot["aes_seconds"]["count"] == 1
+    assert snapshot["queue_depth"] == 7
+
+
+def test_sinks_receive_each_measurement():
+    sink = MagicMock()
+    metrics = Metrics(sinks=[sink])
+    metrics.increment("http_retries")
+    metrics.observe("rsa_seconds", 0.5)
+    assert [call.args for call in sink.call_args_list] == [
+        ("counter", "http_retries", 1),
+        ("histogram", "rsa_seconds", 0.5),
+    ]
+
+
+def test_failing_sink_does_not_break_recording():
+    metrics = Metrics(sinks=[MagicMock(side_effect=RuntimeError)])
+    metrics.increment("events_tracked")
+    assert metrics.snapshot()["events_tracked"] == 1
+
+
+def test_render_prometheus():
+    metrics = Metrics(buckets=(0.1,))
+    metrics.increment("http_requests", 2)
+    metrics.observe("http_post_seconds", 0.05)
+    metrics.register_gauge("queue_depth", lambda: 3)
+    text = metrics.render_prometheus()
+    assert "# TYPE telemetree_http_requests_total counter" in text
+    assert "telemetree_http_requests_total 2" in text
+    assert 'telemetree_http_post_seconds_bucket{le="0.1"} 1' in text
+    assert 'telemetree_http_post_seconds_bucket{le="+Inf"} 1' in text
+    assert "telemetree_http_post_seconds_count 1" in text
+    assert "telemetree_queue_depth 3" in text
+
+
+def test_open_telemetry_sink_creates_instruments_once():
+    meter = MagicMock()
+    metrics = Metrics(sinks=[OpenTelemetrySink(meter)])
+    metrics.observe("aes_seconds", 0.1)
+    metrics.observe("aes_seconds", 0.2)
+    metrics.increment("bytes_sent", 10)
+    meter.create_histogram.assert_called_once_with("telemetree_aes_seconds", unit="s")
+    assert meter.create_histogram.return_value.record.call_count == 2
+    meter.create_counter.return_value.add.assert_called_once_with(10)
+
+
+def test_null_metrics_records_nothing():
+    with NULL_METRICS.time("aes_seconds"):
+        NULL_METRICS.increment("bytes_sent")
+    assert not NULL_METRICS.enabled
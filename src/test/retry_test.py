@@ -0,0 +1,193 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+import requests
+
+from src.telemetree.http_client import AsyncHttpClient, CircuitOpenError, HttpClient
+from src.telemetree.retry import (
+    CircuitBreaker,
+    CircuitState,
+    RetryPolicy,
+    parse_retry_after,
+)
+from src.telemetree.schemas import EncryptedEvent
+
+
+API_KEY = "a1b2c3d4-e5f6-4a7b-8c9d-0e1f2a3b4c5d"
+PROJECT_ID = "f0e1d2c3-b4a5-4968-8776-655443322110"
+
+
+def make_response(status_code: int, headers: dict = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = json.dumps({"status": status_code}).encode("utf-8")
+    response.url = "https://pipeline.test"
+    return response
+
+
+def make_http_client(outcomes, **kwargs) -> HttpClient:
+    http_client = HttpClient(API_KEY, PROJECT_ID, url="https://pipeline.test", **kwargs)
+    http_client.session = MagicMock()
+    http_client.session.post.side_effect = outcomes
+    return http_client
+
+
+def encrypted_event():
+    return EncryptedEvent(key="key", iv="iv", body="body")
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch("telemetree.http_client.time.sleep") as sleep:
+        yield sleep
+
+
+def test_parse_retry_after_seconds_and_dates():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_backoff_grows_exponentially_up_to_the_cap():
+    policy = RetryPolicy(backoff_base=1.0, backoff_max=5.0, jitter=False)
+    assert [policy.delay(attempt) for attempt in range(4)] == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_jitter_stays_within_the_backoff():
+    policy = RetryPolicy(backoff_base=1.0, backoff_max=5.0)
+    assert all(0 <= policy.delay(2) <= 4.0 for _ in range(50))
+
+
+def test_retry_after_longer_than_the_cap_is_not_retried():
+    policy = RetryPolicy(backoff_max=5.0)
+    assert policy.delay(0, retry_after=3.0) == 3.0
+    assert policy.delay(0, retry_after=60.0) is None
+
+
+def test_post_retries_service_unavailable_honouring_retry_after(no_sleep):
+    http_client = make_http_client(
+        [make_response(503, {"Retry-After": "2"}), make_response(200)]
+    )
+    assert http_client.post(encrypted_event()) == {"status": 200}
+    assert http_client.session.post.call_count == 2
+    no_sleep.assert_called_once_with(2.0)
+
+
+def test_post_retries_connection_errors():
+    http_client = make_http_client(
+        [requests.exceptions.ConnectionError("refused"), make_response(200)]
+    )
+    assert http_client.post(encrypted_event()) == {"status": 200}
+
+
+def test_post_does_not_retry_ambiguous_failures_by_default():
+    http_client = make_http_client([make_response(500), make_response(200)])
+    with pytest.raises(requests.exceptions.HTTPError):
+        http_client.post(encrypted_event())
+    assert http_client.session.post.call_count == 1
+
+    http_client = make_http_client([requests.exceptions.ReadTimeout("slow")])
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        http_client.post(encrypted_event())
+
+
+def test_post_retries_ambiguous_failures_when_allowed():
+    http_client = make_http_client(
+        [make_response(502), make_response(200)],
+        retry_policy=RetryPolicy(retry_ambiguous=True),
+    )
+    assert http_client.post(encrypted_event()) == {"status": 200}
+
+
+def test_post_does_not_retry_client_errors():
+    http_client = make_http_client([make_response(400), make_response(200)])
+    with pytest.raises(requests.exceptions.HTTPError):
+        http_client.post(encrypted_event())
+    assert http_client.session.post.call_count == 1
+
+
+def test_post_gives_up_after_max_retries():
+    http_client = make_http_client(
+        [make_response(503)] * 5, retry_policy=RetryPolicy(max_retries=2)
+    )
+    with pytest.raises(requests.exceptions.HTTPError):
+        http_client.post(encrypted_event())
+    assert http_client.session.post.call_count == 3
+
+
+def test_circuit_opens_and_fails_fast():
+    http_client = make_http_client(
+        [make_response(503)] * 10,
+        retry_policy=RetryPolicy(max_retries=0),
+        circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+    )
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            http_client.post(encrypted_event())
+    with pytest.raises(CircuitOpenError):
+        http_client.post(encrypted_event())
+    assert http_client.session.post.call_count == 2
+
+
+def test_circuit_half_opens_after_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    with patch("telemetree.retry.time.monotonic", return_value=100.0):
+        breaker.record_failure()
+        assert not breaker.allow()
+    with patch("telemetree.retry.time.monotonic", return_value=131.0):
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert breaker.allow()
+        # Only one trial request is let through
+        assert not breaker.allow()
+        breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+
+
+def half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    with patch("telemetree.retry.time.monotonic", return_value=100.0):
+        breaker.record_failure()
+    return breaker
+
+
+def test_failed_trial_reopens_the_circuit_whatever_the_error():
+    breaker = half_open_breaker()
+    http_client = make_http_client(
+        [requests.exceptions.ChunkedEncodingError("broken")], circuit_breaker=breaker
+    )
+    with patch("telemetree.retry.time.monotonic", return_value=131.0):
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            http_client.post(encrypted_event())
+        assert breaker.state is CircuitState.OPEN
+    with patch("telemetree.retry.time.monotonic", return_value=162.0):
+        assert breaker.allow()
+
+
+def test_failed_async_trial_reopens_the_circuit():
+    def handler(request):
+        raise httpx.TooManyRedirects("loop", request=request)
+
+    breaker = half_open_breaker()
+
+    async def scenario():
+        http_client = AsyncHttpClient(
+            API_KEY,
+            PROJECT_ID,
+            url="https://pipeline.test",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            circuit_breaker=breaker,
+        )
+        try:
+            await http_client.post(encrypted_event())
+        finally:
+            await http_client.aclose()
+
+    with patch("telemetree.retry.time.monotonic", return_value=131.0):
+        with pytest.raises(httpx.TooManyRedirects):
+            asyncio.run(scenario())
+        assert breaker.state is CircuitState.OPEN
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.telemetree.sampling import Sampler, SamplingRule, TokenBucket, user_hash
+from src.telemetree.schemas import Event
+
+
+def make_event(event_type: str = "message", telegram_id: int = 1) -> Event:
+    return Event(event_type=event_type, telegram_id=telegram_id)
+
+
+def test_user_hash_is_deterministic_and_uniform():
+    assert user_hash(42) == user_hash(42)
+    values = [user_hash(telegram_id) for telegram_id in range(1, 10_001)]
+    assert all(0 <= value < 1 for value in values)
+    assert 0.45 < sum(value < 0.5 for value in values) / len(values) < 0.55
+
+
+def test_fixed_rate_sampling_annotates_kept_events():
+    sampler = Sampler({"message": SamplingRule(rate=0.25)})
+    with patch("telemetree.sampling.random.random", side_effect=[0.1, 0.9]):
+        kept = make_event()
+        assert sampler.apply(kept)
+        assert not sampler.apply(make_event())
+    assert kept.sample_rate == 0.25
+    assert sampler.dropped["message"] == 1
+
+
+def test_other_event_types_are_kept_unannotated():
+    sampler = Sampler({"message": SamplingRule(rate=0)})
+    event = make_event("purchase")
+    assert sampler.apply(event)
+    assert event.sample_rate is None
+
+
+def test_user_sampling_keeps_all_or_none_of_a_users_events():
+    sampler = Sampler(default=SamplingRule(rate=0.5, by_user=True))
+    for telegram_id in range(1, 50):
+        decisions = {
+            sampler.apply(make_event(event_type, telegram_id))
+            for event_type in ("message", "callback_query")
+        }
+        assert decisions == {user_hash(telegram_id) < 0.5}
+
+
+def test_rate_limits_per_type_and_globally():
+    with patch("telemetree.sampling.time.monotonic", return_value=100.0):
+        sampler = Sampler({"message": SamplingRule(max_per_second=2)}, max_per_second=3)
+        kept = [sampler.apply(make_event()) for _ in range(3)]
+        kept += [sampler.apply(make_event("purchase")) for _ in range(2)]
+    assert kept == [True, True, False, True, False]
+    assert sampler.dropped == {"message": 1, "purchase": 1}
+
+
+def test_token_bucket_refills_over_time():
+    with patch("telemetree.sampling.time.monotonic", return_value=0.0):
+        bucket = TokenBucket(rate=10, burst=1)
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+    with patch("telemetree.sampling.time.monotonic", return_value=0.1):
+        assert bucket.try_acquire()
+
+
+def test_invalid_rate_is_rejected():
+    with pytest.raises(ValueError):
+        SamplingRule(rate=1.5)
@@ -0,0 +1,70 @@
+import json
+import time
+
+import pytest
+
+from src.telemetree.schemas import PROCESS_SESSION_ID, Event, TrustedEvent
+
+
+def test_trusted_event_serializes_like_event():
+    fields = {
+        "event_name": "message",
+        "user_id": 1,
+        "username": "Ärger",
+        "language": "en",
+        "referrer": 7,
+        "datetime": "2024-01-01T00:00:00",
+    }
+    trusted = TrustedEvent.from_dict(fields)
+    validated = Event(**fields)
+    assert trusted.model_dump_json() == validated.model_dump_json()
+    assert json.loads(trusted.model_dump_json()) == validated.model_dump()
+    assert trusted.to_json() == validated.to_json()
+    assert validated.to_json() == validated.model_dump_json().encode()
+
+
+def test_trusted_event_accepts_aliases_and_field_names():
+    when = "2024-01-01T00:00:00"
+    assert TrustedEvent(
+        "message", 1, event_source="bot", datetime=when
+    ) == TrustedEvent.from_dict(
+        {
+            "event_name": "message",
+            "telegram_id": 1,
+            "event_source": "bot",
+            "datetime": when,
+        }
+    )
+
+
+def test_events_are_timestamped_when_created():
+    first = Event(event_type="message", telegram_id=1)
+    time.sleep(0.001)
+    second = TrustedEvent("message", 1)
+    assert first.datetime < second.datetime
+    assert first.session_id == second.session_id == PROCESS_SESSION_ID
+
+
+@pytest.mark.parametrize(
+    "cls", [lambda fields: Event(**fields), TrustedEvent.from_dict]
+)
+def test_events_are_restamped_when_tracked_unless_dated(cls):
+    event = cls({"event_type": "message", "telegram_id": 1})
+    dated = cls({"event_type": "message", "telegram_id": 1, "datetime": "2024-01-01"})
+    created = event.datetime
+    time.sleep(0.001)
+    event.stamp()
+    dated.stamp()
+    assert event.datetime > created
+    assert dated.datetime == "2024-01-01"
+    # A retried event keeps the time it was first tracked
+    tracked = event.datetime
+    event.stamp()
+    assert event.datetime == tracked
+
+
+def test_trusted_event_rejects_unknown_and_missing_fields():
+    with pytest.raises(ValueError):
+        TrustedEvent.from_dict({"event_type": "message", "telegram_id": 1, "x": 1})
+    with pytest.raises(ValueError):
+        TrustedEvent.from_dict({"event_type": "message"})
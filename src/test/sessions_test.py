@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from src.telemetree.sessions import SessionTracker
+from src.test.client_test import make_client
+
+# The events and default session the tracker and client see, which the src
+# path would duplicate
+from telemetree.schemas import PROCESS_SESSION_ID, Event, TrustedEvent
+
+
+def elapse(tracker: SessionTracker, seconds: float) -> None:
+    """Moves the tracker's clock forward."""
+    tracker._epoch -= seconds
+
+
+def assert_consistent(tracker: SessionTracker) -> None:
+    keys = [key for key in tracker._keys if key]
+    assert len(keys) == len(tracker)
+    for key in keys:
+        assert tracker._keys[tracker._find(key)] == key
+
+
+def test_events_of_a_user_share_a_session_until_it_times_out():
+    tracker = SessionTracker(timeout=60)
+    first = tracker.session_id(1, now=1000.0)
+    assert first == 1_000_000
+    elapse(tracker, 30)
+    assert tracker.session_id(1, now=1030.0) == first
+    assert tracker.session_id(2, now=1030.0) == 1_030_000
+
+    # Inactivity is measured from the last event, not the session start
+    elapse(tracker, 45)
+    assert tracker.session_id(1, now=1075.0) == first
+    elapse(tracker, 61)
+    assert tracker.session_id(1, now=1136.0) == 1_136_000
+    assert len(tracker) == 2
+
+
+def test_apply_keeps_explicit_session_ids():
+    tracker = SessionTracker()
+    event = Event(event_type="message", telegram_id=1)
+    tracker.apply(event)
+    assert event.session_id != PROCESS_SESSION_ID
+
+    trusted = TrustedEvent("message", 1)
+    tracker.apply(trusted)
+    assert trusted.session_id == event.session_id
+
+    explicit = TrustedEvent("message", 1, session_id=42)
+    tracker.apply(explicit)
+    assert explicit.session_id == 42
+
+
+def test_table_grows_and_finds_every_user():
+    tracker = SessionTracker()
+    sessions = {
+        telegram_id: tracker.session_id(telegram_id) for telegram_id in range(1, 5001)
+    }
+    assert len(tracker) == 5000
+    assert len(tracker._keys) >= 5000 / 0.75
+    for telegram_id, session_id in sessions.items():
+        assert tracker.session_id(telegram_id) == session_id
+    assert_consistent(tracker)
+
+
+def test_table_is_bounded_and_evicts_ended_sessions_first():
+    tracker = SessionTracker(timeout=60, max_users=100)
+    for telegram_id in range(1, 101):
+        tracker.session_id(telegram_id)
+    elapse(tracker, 120)
+    recent = [tracker.session_id(telegram_id) for telegram_id in range(1, 51)]
+
+    for telegram_id in range(1000, 1020):
+        tracker.session_id(telegram_id)
+    assert len(tracker) == 100
+    assert tracker.evicted == 20
+    # The users seen after the pause are all still in their session
+    assert [tracker.session_id(telegram_id) for telegram_id in range(1, 51)] == recent
+    assert_consistent(tracker)
+
+
+def test_eviction_keeps_the_table_consistent():
+    tracker = SessionTracker(max_users=300)
+    rng = random.Random(7)
+    for _ in range(20_000):
+        tracker.session_id(rng.randrange(1, 2_000))
+    assert len(tracker) == 300
+    assert_consistent(tracker)
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        SessionTracker(timeout=0)
+    with pytest.raises(ValueError):
+        SessionTracker(max_users=0)
+
+
+def test_client_assigns_sessions_per_user():
+    client = make_client()
+    sent = []
+    client._send = sent.append
+    client.track({"event_type": "message", "telegram_id": 1})
+    client.track({"event_type": "message", "telegram_id": 1})
+    client.track_many([{"event_type": "message", "telegram_id": 2}])
+    assert sent[0].session_id == sent[1].session_id != PROCESS_SESSION_ID
+    assert len(client.sessions) == 2
+
+    client = make_client(session_timeout=None)
+    client._send = sent.append
+    client.track({"event_type": "message", "telegram_id": 1})
+    assert sent[-1].session_id == PROCESS_SESSION_ID
@@ -0,0 +1,174 @@
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from src.telemetree.metrics import Metrics
+from src.telemetree.schemas import EncryptedEvent
+from src.telemetree.spool import Spool, SpoolDrainer
+
+
+def make_event(n: int) -> EncryptedEvent:
+    return EncryptedEvent(key=f"key-{n}", iv=f"iv-{n}", body=f"body-{n}")
+
+
+def bodies(records) -> list:
+    return [event.body for event, _ in records]
+
+
+def test_append_and_read_in_order(tmp_path):
+    spool = Spool(str(tmp_path))
+    for n in range(3):
+        spool.append(make_event(n))
+    assert bodies(spool.read(10)) == ["body-0", "body-1", "body-2"]
+    spool.close()
+
+
+def test_read_does_not_consume_until_ack(tmp_path):
+    spool = Spool(str(tmp_path))
+    for n in range(3):
+        spool.append(make_event(n))
+    records = spool.read(2)
+    assert bodies(spool.read(2)) == ["body-0", "body-1"]
+    spool.ack(records[-1][1])
+    assert bodies(spool.read(10)) == ["body-2"]
+    spool.close()
+
+
+def test_unacked_records_replayed_after_restart(tmp_path):
+    spool = Spool(str(tmp_path))
+    for n in range(4):
+        spool.append(make_event(n))
+    spool.ack(spool.read(1)[-1][1])
+    spool.close()
+
+    reopened = Spool(str(tmp_path))
+    reopened.append(make_event(4))
+    assert bodies(reopened.read(10)) == ["body-1", "body-2", "body-3", "body-4"]
+    reopened.close()
+
+
+def test_torn_tail_is_skipped_after_crash(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(make_event(0))
+    spool._writer.write(b'{"key": "tor')
+    spool._writer.flush()
+    # Simulate a crash: the writer is abandoned without close()
+    reopened = Spool(str(tmp_path))
+    reopened.append(make_event(1))
+    assert bodies(reopened.read(10)) == ["body-0", "body-1"]
+    reopened.close()
+
+
+def test_segments_roll_and_acked_segments_are_deleted(tmp_path):
+    spool = Spool(str(tmp_path), segment_max_bytes=100)
+    for n in range(5):
+        spool.append(make_event(n))
+    assert len([f for f in os.listdir(tmp_path) if f.endswith(".log")]) > 1
+    records = spool.read(10)
+    assert bodies(records) == [f"body-{n}" for n in range(5)]
+    spool.ack(records[-1][1])
+    assert len([f for f in os.listdir(tmp_path) if f.endswith(".log")]) == 1
+    spool.close()
+
+
+def test_oldest_segments_evicted_over_size_cap(tmp_path):
+    spool = Spool(str(tmp_path), segment_max_bytes=100, max_bytes=250)
+    for n in range(10):
+        spool.append(make_event(n))
+    assert spool.size_bytes <= 250 + 100
+    assert spool.evicted_segments > 0
+    remaining = bodies(spool.read(100))
+    assert remaining[-1] == "body-9"
+    assert "body-0" not in remaining
+    spool.close()
+
+
+def test_expired_segments_evicted(tmp_path):
+    spool = Spool(str(tmp_path), segment_max_bytes=40, max_age=60)
+    spool.append(make_event(0))
+    spool.append(make_event(1))
+    with patch("telemetree.spool.time.time", return_value=time.time() + 120):
+        assert bodies(spool.read(10)) == ["body-1"]
+    spool.close()
+
+
+def test_fsync_is_batched(tmp_path):
+    spool = Spool(str(tmp_path), fsync_every=3, fsync_interval=3600)
+    with patch("telemetree.spool.os.fsync") as fsync:
+        for n in range(7):
+            spool.append(make_event(n))
+    assert fsync.call_count == 2
+    spool.close()
+
+
+def test_drainer_delivers_and_acks(tmp_path):
+    spool = Spool(str(tmp_path))
+    sent = []
+    drainer = SpoolDrainer(spool, sent.append)
+    for n in range(3):
+        spool.append(make_event(n))
+    drainer.notify()
+    assert drainer.flush(timeout=5)
+    assert [event.body for event in sent] == ["body-0", "body-1", "body-2"]
+    assert spool.read(10) == []
+    drainer.close(timeout=5)
+    spool.close()
+
+
+def test_drainer_keeps_records_on_failure(tmp_path):
+    spool = Spool(str(tmp_path))
+    attempts = []
+
+    def flaky_send(event):
+        attempts.append(event.body)
+        if len(attempts) == 2:
+            raise ConnectionError("down")
+
+    drainer = SpoolDrainer(spool, flaky_send, retry_interval=0.01)
+    for n in range(3):
+        spool.append(make_event(n))
+    assert drainer.flush(timeout=5)
+    assert attempts == ["body-0", "body-1", "body-1", "body-2"]
+    drainer.close(timeout=5)
+    spool.close()
+
+
+def test_drainer_drops_rejected_records(tmp_path):
+    spool = Spool(str(tmp_path))
+    sent = []
+
+    def send(event):
+        if event.body == "body-1":
+            response = requests.Response()
+            response.status_code = 400
+            raise requests.HTTPError("400 Bad Request", response=response)
+        sent.append(event.body)
+
+    metrics = Metrics()
+    drainer = SpoolDrainer(spool, send, retry_interval=60, metrics=metrics)
+    for n in range(3):
+        spool.append(make_event(n))
+    assert drainer.flush(timeout=5)
+    assert sent == ["body-0", "body-2"]
+    assert drainer.rejected == 1
+    assert metrics.snapshot()["spool_rejected"] == 1
+    drainer.close(timeout=5)
+    spool.close()
+
+
+def test_eviction_is_not_checked_on_every_append(tmp_path):
+    spool = Spool(str(tmp_path))
+    with patch.object(spool, "_evict") as evict:
+        for n in range(10):
+            spool.append(make_event(n))
+    # Once, when the first segment was started
+    assert evict.call_count == 1
+    spool.close()
+
+
+def test_invalid_limits_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        Spool(str(tmp_path), max_bytes=0)
@@ -0,0 +1,65 @@
+import pytest
+
+from src.telemetree.client import Telemetree
+from src.telemetree.testing import MockPipeline
+from src.test.client_test import API_KEY, PROJECT_ID
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    with MockPipeline(key_bits=512) as pipeline:
+        yield pipeline
+
+
+@pytest.fixture(autouse=True)
+def reset(pipeline):
+    pipeline.reset()
+    pipeline.statuses.clear()
+
+
+def make_client(pipeline, **kwargs):
+    return Telemetree(
+        API_KEY,
+        PROJECT_ID,
+        config_url=pipeline.config_url,
+        config_cache=None,
+        **kwargs,
+    )
+
+
+def test_tracked_events_reach_the_pipeline(pipeline):
+    with make_client(pipeline) as client:
+        client.track({"event_type": "message", "telegram_id": 1})
+        client.track_many(
+            [
+                {"event_type": "/start", "telegram_id": telegram_id}
+                for telegram_id in (2, 3)
+            ]
+        )
+
+    events = pipeline.events()
+    assert [(e["event_type"], e["telegram_id"]) for e in events] == [
+        ("message", 1),
+        ("/start", 2),
+        ("/start", 3),
+    ]
+    assert pipeline.requests[0]["headers"]["x-api-key"] == API_KEY
+
+
+def test_gzipped_and_compressed_posts_are_decoded(pipeline):
+    with make_client(pipeline, gzip_requests=True) as client:
+        client.http_client.gzip_min_bytes = 0
+        client.track({"event_type": "message", "telegram_id": 1, "username": "a" * 500})
+
+    assert pipeline.requests[0]["headers"]["Content-Encoding"] == "gzip"
+    assert pipeline.events()[0]["username"] == "a" * 500
+
+
+def test_statuses_answer_the_first_posts(pipeline):
+    pipeline.statuses.extend([400])
+    with make_client(pipeline) as client:
+        with pytest.raises(Exception):
+            client.track({"event_type": "message", "telegram_id": 1})
+        client.track({"event_type": "message", "telegram_id": 2})
+
+    assert [e["telegram_id"] for e in pipeline.events()] == [1, 2]
@@ -0,0 +1,104 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.telemetree.client import Telemetree
+from src.telemetree.http_client import HttpClient
+from src.telemetree.schemas import EncryptedEvent
+from src.telemetree.testing import MockPipeline
+from src.telemetree.transport import (
+    HTTPStatusError,
+    MemoryConnectionError,
+    MemoryTransport,
+    RequestsTransport,
+    create_transport,
+)
+from src.test.client_test import API_KEY, PROJECT_ID, config_response, decrypt_payload
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch("telemetree.http_client.time.sleep"):
+        yield
+
+
+def encrypted_event():
+    return EncryptedEvent(key="key", iv="iv", body="body")
+
+
+def test_create_transport_by_kind():
+    assert isinstance(create_transport("requests"), RequestsTransport)
+    assert isinstance(create_transport("memory"), MemoryTransport)
+    transport = MemoryTransport()
+    assert create_transport(transport) is transport
+    with pytest.raises(ValueError):
+        create_transport("carrier-pigeon")
+
+
+def test_memory_transport_records_requests():
+    transport = MemoryTransport()
+    http_client = HttpClient(
+        API_KEY, PROJECT_ID, url="https://pipeline.test", transport=transport
+    )
+    assert http_client.post(encrypted_event()) == {"status": "ok"}
+    (request,) = transport.requests
+    assert request.method == "POST"
+    assert request.headers["x-api-key"] == API_KEY
+    assert json.loads(json.loads(request.body))["key"] == "key"
+
+
+def test_memory_transport_errors_are_retried_like_http_errors():
+    outcomes = [MemoryConnectionError("refused"), (503, {}), (200, {"status": "ok"})]
+
+    def handler(request):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    transport = MemoryTransport(handler)
+    http_client = HttpClient(
+        API_KEY, PROJECT_ID, url="https://pipeline.test", transport=transport
+    )
+    assert http_client.post(encrypted_event()) == {"status": "ok"}
+    assert len(transport.requests) == 3
+
+    http_client.transport.handler = lambda request: (400, {"error": "bad"})
+    with pytest.raises(HTTPStatusError):
+        http_client.post(encrypted_event())
+
+
+def test_client_sends_through_the_memory_transport():
+    def handler(request):
+        if request.method == "GET":
+            return 200, config_response
+        return 200, {"status": "ok"}
+
+    transport = MemoryTransport(handler)
+    client = Telemetree(API_KEY, PROJECT_ID, transport=transport, config_cache=None)
+    assert client.track({"event_type": "message", "telegram_id": 1}) == {"status": "ok"}
+
+    get, post = transport.requests
+    assert get.url.startswith(client.config.CONFIG_URL)
+    assert post.url == config_response["host"]
+    event = decrypt_payload(EncryptedEvent(**json.loads(json.loads(post.body))))
+    assert event["telegram_id"] == 1
+
+
+def test_http2_transport_sends_events():
+    pytest.importorskip("h2")
+    with MockPipeline(key_bits=512) as pipeline:
+        client = Telemetree(
+            API_KEY,
+            PROJECT_ID,
+            transport="http2",
+            config_url=pipeline.config_url,
+            config_cache=None,
+        )
+        with client:
+            assert type(client.http_client.transport).__name__ == "Http2Transport"
+            client.track_many(
+                [{"event_type": "message", "telegram_id": i} for i in (1, 2)]
+            )
+        assert [event["telegram_id"] for event in pipeline.events()] == [1, 2]
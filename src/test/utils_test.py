@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from src.telemetree.utils import chunk_payloads, serialize_batch, validate_uuid
+
+
+def test_validate_uuid_rejects_invalid_keys():
+    with pytest.raises(ValueError):
+        validate_uuid("not-a-uuid")
+
+
+def test_chunk_payloads_by_count():
+    payloads = [json.dumps({"n": n}) for n in range(5)]
+    chunks = list(chunk_payloads(payloads, max_events=2, max_bytes=1024))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+def test_chunk_payloads_by_size():
+    payloads = ['"' + "a" * 8 + '"'] * 4  # 10 bytes each
+    chunks = list(chunk_payloads(payloads, max_events=100, max_bytes=25))
+    assert [len(chunk) for chunk in chunks] == [2, 2]
+    for chunk in chunks:
+        assert len(serialize_batch(chunk)) <= 25
+
+
+def test_oversized_payload_gets_its_own_chunk():
+    payloads = ['"small"', '"' + "a" * 100 + '"', '"small"']
+    chunks = list(chunk_payloads(payloads, max_events=100, max_bytes=50))
+    assert [len(chunk) for chunk in chunks] == [1, 1, 1]
+
+
+def test_serialize_batch_produces_json_array():
+    assert json.loads(serialize_batch(['{"a":1}', '{"b":2}'])) == [{"a": 1}, {"b": 2}]
+
+
+def test_chunk_and_serialize_bytes_payloads():
+    payloads = [b'{"a":1}', '{"b":"\u03a9"}'.encode()]
+    (chunk,) = chunk_payloads(payloads, max_events=10, max_bytes=1024)
+    assert json.loads(serialize_batch(chunk)) == [{"a": 1}, {"b": "\u03a9"}]